@@ -0,0 +1,172 @@
+"""
+SeferTakip - Async Scraping Engine
+ThreadPoolExecutor yerine asyncio + aiohttp ile scraping
+
+Thread başına bir bağlantı yerine tek event loop üzerinde semaphore ile
+sınırlandırılmış çok sayıda istek aynı anda beklemede olabilir.
+Backoff asyncio.sleep ile yapılır, worker bloklanmaz. Rate control (circuit breaker,
+AIMD eşzamanlılık, retry bütçesi) thread engine ile aynı ScrapingBeeMonitor üzerinden.
+Üretilen route sonuçları thread engine ile aynıdır (handle_scraped_journeys).
+"""
+
+import asyncio
+import json
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class BufferedResponse:
+    """ScrapingBeeMonitor için requests.Response benzeri minimal cevap"""
+
+    def __init__(self, status_code, content):
+        self.status_code = status_code
+        self.content = content
+
+    def json(self):
+        return json.loads(self.content)
+
+
+class AsyncScrapeEngine:
+    """
+    ObiletScraper için async scraping motoru
+    on_result(route, date_str, result) her iş birimi bittiğinde executor thread'inde çağrılır,
+    bloklayabilir (ör. dolu sync kuyruğu) - event loop etkilenmez
+    """
+
+    def __init__(self, scraper, api_url, concurrency=50, connect_timeout=10, read_timeout=70):
+        self.scraper = scraper
+        self.api_url = api_url
+        self.concurrency = concurrency
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+
+    async def acquire_slot(self):
+        """ScrapingBeeMonitor slotu - event loop bloklanmadan bekler (False = shed / run deadline)"""
+        deadline = self.scraper.run_budget.deadline
+        while True:
+            wait = self.scraper.ban_monitor.try_acquire()
+            if wait is None:
+                return False
+            if wait <= 0:
+                return True
+            if deadline is not None and time.monotonic() + wait > deadline:
+                return False
+            await asyncio.sleep(min(wait, 1.0))
+
+    async def fetch_journeys(self, session, route, date_str):
+        """Tek istek - thread engine'deki get_obilet_journeys karşılığı"""
+        import aiohttp
+
+        url = self.scraper.get_journeys_url(route.origin_obilet_id, route.destination_obilet_id, date_str)
+        cached = self.scraper.get_cached_response(url)
+        if cached is not None:
+            return self.scraper.read_journeys_response(url, cached.body, date_str, cached)
+
+        params, headers = self.scraper.build_scrapingbee_request(
+            route.origin_obilet_id, route.destination_obilet_id, date_str
+        )
+        # aiohttp bool kabul etmiyor - requests ile aynı şekilde string'e çevir
+        params = {k: str(v) if isinstance(v, bool) else v for k, v in params.items()}
+
+        # Circuit breaker açıksa bekler, shed ediyorsa istek hiç atılmaz
+        if not await self.acquire_slot():
+            return None
+
+        try:
+            async with session.post(self.api_url, params=params, headers=headers) as resp:
+                response = BufferedResponse(resp.status, await resp.read())
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            self.scraper.ban_monitor.record_error()
+            logger.error(f"❌ Request error: {e!r}")
+            return None
+        finally:
+            self.scraper.ban_monitor.release()
+
+        self.scraper.ban_monitor.record_request(response)
+
+        if response.status_code != 200:
+            logger.error(f"❌ ScrapingBee error: {response.status_code}")
+            logger.error(f"❌ ScrapingBee error: {response.content}")
+            return None
+
+        try:
+            return self.scraper.read_journeys_response(url, response.content, date_str)
+        except json.JSONDecodeError as e:
+            logger.error(f"❌ JSON parse error: {e}")
+            return None
+
+    async def scrape_route_with_retry(self, session, route, date_str):
+        """Thread engine'deki scrape_route_with_retry'ın async karşılığı"""
+        scraper = self.scraper
+        route_name = scraper.get_route_display_name(route, date_str)
+
+        scraper.ban_monitor.begin_unit()
+
+        for attempt in range(scraper.max_retries):
+            try:
+                journeys = await self.fetch_journeys(session, route, date_str)
+
+                if journeys is None:
+                    delay, stop_reason = scraper.get_retry_delay(attempt)
+                    if delay is None:
+                        if stop_reason == 'deadline':
+                            return scraper.defer_unit(route, date_str, reason=f"{scraper.run_budget.stop_reason} (retry)")
+                        error = f"API failed after {attempt + 1} attempts{f' ({stop_reason})' if stop_reason else ''}"
+                        logger.error(f"❌ {route_name}: {error}")
+                        scraper.record_route_failure()
+                        return {'success': False, 'api_error': True, 'error': error}
+
+                    logger.warning(f"⚠️  {route_name}: API error, retrying in {delay:.1f}s... (attempt {attempt + 1}/{scraper.max_retries})")
+                    await asyncio.sleep(delay)
+                    continue
+
+                return scraper.handle_scraped_journeys(route, journeys, date_str)
+
+            except Exception as e:
+                delay, stop_reason = scraper.get_retry_delay(attempt)
+                if delay is None:
+                    if stop_reason == 'deadline':
+                        return scraper.defer_unit(route, date_str, reason=f"{scraper.run_budget.stop_reason} (retry)")
+                    logger.error(f"❌ {route_name} failed after {attempt + 1} attempts{f' ({stop_reason})' if stop_reason else ''}: {e}")
+                    scraper.record_route_failure()
+                    return {'success': False, 'error': str(e)}
+
+                logger.warning(f"⟳ {route_name} attempt {attempt + 1}/{scraper.max_retries} failed, retrying in {delay:.1f}s...")
+                await asyncio.sleep(delay)
+
+    async def run_async(self, work, on_result):
+        """work: (route, date_str) iş birimleri listesi"""
+        import aiohttp
+
+        loop = asyncio.get_running_loop()
+        semaphore = asyncio.Semaphore(self.concurrency)
+        connector = aiohttp.TCPConnector(limit=self.concurrency, keepalive_timeout=60)
+        timeout = aiohttp.ClientTimeout(sock_connect=self.connect_timeout, sock_read=self.read_timeout)
+
+        async with aiohttp.ClientSession(connector=connector, timeout=timeout) as session:
+            async def process(route, date_str):
+                started = None
+                result = None
+                try:
+                    async with semaphore:
+                        # Deadline'a yetişmeyecek / başka worker'daki birim başlamaz (on_result çağrılmaz) - claim DB'de
+                        if not await loop.run_in_executor(None, self.scraper.start_unit, route, date_str):
+                            return
+                        started = time.perf_counter()
+                        result = await self.scrape_route_with_retry(session, route, date_str)
+                finally:
+                    if started is not None:
+                        ended = time.perf_counter()
+                        self.scraper.scrape_stats.record(started, ended, bool(result and result['success']))
+                        self.scraper.run_budget.record_unit(ended - started)
+                await loop.run_in_executor(None, on_result, route, date_str, result)
+
+            tasks = [process(route, date_str) for route, date_str in work]
+            for outcome in await asyncio.gather(*tasks, return_exceptions=True):
+                if isinstance(outcome, Exception):
+                    logger.error(f"❌ Async scrape error: {outcome}")
+
+    def run(self, work, on_result):
+        return asyncio.run(self.run_async(work, on_result))
@@ -0,0 +1,593 @@
+"""
+SeferTakip - Benchmark'lar
+Lokal HTTP stub / fixture payload'lar üzerinde ölçüm (ScrapingBee credit harcamaz)
+
+Kullanım:
+    python bench.py engines --routes 200 --delay 0.5 --workers 10 --concurrency 100
+    BREAKER_COOLDOWN_SECONDS=2 python bench.py ratecontrol --routes 200 --ban-seconds 5
+    DATABASE_URL=... python bench.py history --rows 50000
+    python bench.py schedule --routes 100 --horizon 7 --hours 168 --budget 300
+    python bench.py parse --journeys 2000 [--fixture kayitli_cevap.json]
+    python bench.py records --routes 200 --journeys 300
+    python bench.py datetimes --routes 200 --journeys 300
+    DATABASE_URL=... python bench.py schedule --source db --days 7
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import logging
+import random
+import threading
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from types import SimpleNamespace
+
+
+# ============================================
+# FIXTURES
+# ============================================
+
+def make_fixture_payload(journey_count=300, date_str=None):
+    """Obilet /json/journeys cevabı formatında sentetik payload"""
+    day = datetime.strptime(date_str, '%Y-%m-%d') if date_str else datetime.combine(date.today(), datetime.min.time())
+    journeys = []
+    for i in range(journey_count):
+        departure = day + timedelta(minutes=(i * 7) % (24 * 60 + 180))  # Bir kısmı ertesi güne taşar
+        journeys.append({
+            'id': 100000 + i,
+            'partner-id': i % 40,
+            'partner-name': f"Firma {i % 40}",
+            'bus-type': '2+1',
+            'total-seats': 41,
+            'available-seats': i % 41,
+            'partner-rating': 4.2,
+            'partner-route-rating': 4.0,
+            'journey': {
+                'origin': 'İstanbul Otogarı',
+                'destination': 'Ankara AŞTİ',
+                'departure': departure.strftime('%Y-%m-%dT%H:%M:%S'),
+                'arrival': (departure + timedelta(hours=6)).strftime('%Y-%m-%dT%H:%M:%S'),
+                'original-price': 750.0,
+                'internet-price': 600.0 + (i % 13) * 10,
+                'currency': 'TRY',
+                'bus-name': 'Travego',
+                'peron-no': str(i % 30),
+                'stops': [
+                    {'name': f"Durak {k}", 'time': departure.strftime('%Y-%m-%dT%H:%M:%S'),
+                     'is-origin': k == 0, 'is-destination': k == 5}
+                    for k in range(6)
+                ],
+            },
+        })
+    return json.dumps({'journeys': journeys}).encode('utf-8')
+
+
+def make_change_timeline(route_count, horizon_days, hours, seed=0):
+    """
+    Sentetik (route, tarih) değişim timeline'ı (scheduler.load_change_timeline formatı)
+    Her route'un saatlik değişim olasılığı sabit, kalkışa yaklaştıkça artar
+    """
+    rng = random.Random(seed)
+    start = datetime.combine(date.today(), datetime.min.time())
+    timeline = {}
+    for route_id in range(1, route_count + 1):
+        rate = rng.choice([0.01, 0.03, 0.1, 0.3, 0.6])
+        for offset in range(horizon_days + hours // 24 + 1):
+            departure_date = start.date() + timedelta(days=offset)
+            pair = {'hours': [], 'changes': set()}
+            for h in range(hours):
+                hour = start + timedelta(hours=h)
+                days_left = (departure_date - hour.date()).days
+                if not 0 <= days_left <= horizon_days:
+                    continue
+                pair['hours'].append(hour)
+                if rng.random() < min(1.0, rate * (1 + 2 / (days_left + 1))):
+                    pair['changes'].add(hour)
+            if pair['hours']:
+                timeline[(route_id, departure_date)] = pair
+    return timeline
+
+
+def load_fixture(path):
+    with open(path, 'rb') as f:
+        return f.read()
+
+
+# ============================================
+# HTTP STUB
+# ============================================
+
+def start_stub_server(payload, delay, ban=None):
+    """
+    ScrapingBee yerine geçen lokal HTTP stub (her istek delay saniye bekler)
+    ban=(başlangıç, bitiş): server açıldıktan sonraki bu saniye aralığında 429 döner
+    """
+    started = time.monotonic()
+    counts = {'requests': 0, 'blocked': 0}
+    counts_lock = threading.Lock()
+
+    class StubHandler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def do_POST(self):
+            length = int(self.headers.get('Content-Length') or 0)
+            if length:
+                self.rfile.read(length)
+            time.sleep(delay)
+            elapsed = time.monotonic() - started
+            banned = ban is not None and ban[0] <= elapsed < ban[1]
+            with counts_lock:
+                counts['requests'] += 1
+                counts['blocked'] += banned
+            body = b'{"error": "rate limit"}' if banned else payload
+            self.send_response(429 if banned else 200)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StubHandler)
+    server.daemon_threads = True
+    server.counts = counts
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def make_routes(count):
+    return [
+        SimpleNamespace(
+            id=i + 1,
+            route_name=f"Bench {i + 1}",
+            origin_city_name='İstanbul',
+            destination_city_name='Ankara',
+            origin_obilet_id=1000 + i,
+            destination_obilet_id=2000 + i,
+        )
+        for i in range(count)
+    ]
+
+
+@contextlib.contextmanager
+def quiet():
+    """Scraper log / print çıktısını bastır"""
+    logging.disable(logging.CRITICAL)
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            yield
+    finally:
+        logging.disable(logging.NOTSET)
+
+
+# ============================================
+# BENCHMARKS
+# ============================================
+
+def bench_engines(args):
+    """Thread pool vs async engine - sadece scrape aşaması (DB yok)"""
+    import main
+    from async_engine import AsyncScrapeEngine
+
+    payload = load_fixture(args.fixture) if args.fixture else make_fixture_payload(args.journeys)
+    server = start_stub_server(payload, args.delay)
+    main.SCRAPINGBEE_API_URL = f"http://127.0.0.1:{server.server_port}/api/v1/"
+
+    routes = make_routes(args.routes)
+    date_str = date.today().strftime('%Y-%m-%d')
+    results = {}
+
+    with quiet():
+        scraper = main.ObiletScraper(max_workers=args.workers, max_retries=1)
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=args.workers) as executor:
+            list(executor.map(lambda r: scraper.scrape_route_with_retry(r, date_str), routes))
+        results['thread'] = (time.perf_counter() - started, scraper.completed_routes)
+
+        scraper = main.ObiletScraper(max_workers=args.workers, max_retries=1,
+                                     engine='async', async_concurrency=args.concurrency)
+        engine = AsyncScrapeEngine(scraper, api_url=main.SCRAPINGBEE_API_URL, concurrency=args.concurrency)
+        started = time.perf_counter()
+        engine.run([(r, date_str) for r in routes], on_result=lambda route, date_str, result: None)
+        results['async'] = (time.perf_counter() - started, scraper.completed_routes)
+
+    server.shutdown()
+
+    print(f"routes={args.routes} delay={args.delay}s workers={args.workers} concurrency={args.concurrency}")
+    for name, (elapsed, completed) in results.items():
+        print(f"  {name:<8} {elapsed:8.2f}s  {completed / elapsed:8.1f} routes/s  ({completed} ok)")
+
+
+def bench_ratecontrol(args):
+    """Ban dönemi (stub 429) boyunca rate control: atılan istek, bekleme, başarısız birim (DB yok)"""
+    import main
+    from async_engine import AsyncScrapeEngine
+
+    routes = make_routes(args.routes)
+    date_str = date.today().strftime('%Y-%m-%d')
+    results = {}
+
+    for name in ('thread', 'async'):
+        payload = make_fixture_payload(args.journeys)
+        server = start_stub_server(payload, args.delay, ban=(args.ban_start, args.ban_start + args.ban_seconds))
+        main.SCRAPINGBEE_API_URL = f"http://127.0.0.1:{server.server_port}/api/v1/"
+
+        with quiet():
+            scraper = main.ObiletScraper(max_workers=args.workers, max_retries=args.retries,
+                                         engine=name, async_concurrency=args.workers)
+            scraper.response_cache = None
+            started = time.perf_counter()
+            if name == 'thread':
+                with ThreadPoolExecutor(max_workers=args.workers) as executor:
+                    list(executor.map(lambda r: scraper.scrape_route_with_retry(r, date_str), routes))
+            else:
+                engine = AsyncScrapeEngine(scraper, api_url=main.SCRAPINGBEE_API_URL, concurrency=args.workers)
+                engine.run([(r, date_str) for r in routes], on_result=lambda route, date_str, result: None)
+            elapsed = time.perf_counter() - started
+
+        server.shutdown()
+        results[name] = (elapsed, dict(server.counts), scraper.completed_routes, scraper.failed_routes,
+                         scraper.ban_monitor.get_stats())
+
+    print(f"routes={args.routes} workers={args.workers} delay={args.delay}s "
+          f"ban={args.ban_start}s..{args.ban_start + args.ban_seconds}s retries={args.retries}")
+    for name, (elapsed, counts, completed, failed, rate) in results.items():
+        print(f"  {name:<7} {elapsed:7.1f}s  {counts['requests']:5d} requests ({counts['blocked']} blocked)  "
+              f"{completed} ok / {failed} failed  breaker trips={rate['breaker_trips']} shed={rate['shed']}  "
+              f"concurrency min={rate['concurrency_min']}  retries={rate['retries']} denied={rate['retries_denied']}")
+
+
+def bench_history(args):
+    """PriceHistory yazma: ORM bulk_save_objects vs executemany vs COPY (rows/s)"""
+    from models_standalone import Base, Route, PriceHistory, get_db_engine, get_session
+    from history_writer import PRICE_HISTORY_COLUMNS, PriceHistoryWriter, supports_copy
+
+    engine = get_db_engine()
+    Base.metadata.create_all(engine)
+
+    # Bench'e özel route (sonunda silinir)
+    session = get_session()
+    route = Route(origin_city_name='Bench', origin_obilet_id=-1,
+                  destination_city_name='Bench', destination_obilet_id=-2, route_name='Bench')
+    session.add(route)
+    session.commit()
+    route_id = route.id
+    session.close()
+
+    today = date.today()
+    now = datetime.utcnow()
+    rows = [
+        (route_id, f"Firma {i % 40}", i % 40, 600.0 + (i % 13) * 10, 'TRY', today, 0, i % 41, 41,
+         round(((41 - i % 41) / 41) * 100, 2), now, datetime.combine(today, datetime.min.time()) + timedelta(minutes=i % 1440))
+        for i in range(args.rows)
+    ]
+
+    def run_orm():
+        session = get_session()
+        session.bulk_save_objects([PriceHistory(**dict(zip(PRICE_HISTORY_COLUMNS, row))) for row in rows])
+        session.commit()
+        session.close()
+
+    methods = [('orm', run_orm),
+               ('executemany', lambda: PriceHistoryWriter(engine, method='executemany').write_executemany(rows))]
+    if supports_copy(engine):
+        methods.append(('copy', lambda: PriceHistoryWriter(engine, method='copy').write_copy(rows)))
+
+    print(f"rows={args.rows} dialect={engine.dialect.name}")
+    try:
+        for name, func in methods:
+            started = time.perf_counter()
+            func()
+            elapsed = time.perf_counter() - started
+            print(f"  {name:<12} {elapsed:8.2f}s  {args.rows / elapsed:10.0f} rows/s")
+    finally:
+        session = get_session()
+        session.query(PriceHistory).filter(PriceHistory.route_id == route_id).delete()
+        session.query(Route).filter(Route.id == route_id).delete()
+        session.commit()
+        session.close()
+
+
+def bench_parse(args):
+    """Obilet JSON: json.loads + parse_journeys_payload + tarih filtresi vs stream parser (süre + peak memory)"""
+    import main
+    from obilet_parser import parse_journeys_stream
+
+    payload = load_fixture(args.fixture) if args.fixture else make_fixture_payload(args.journeys)
+    target_date = date.fromisoformat(args.date) if args.date else date.today()
+    scraper = main.ObiletScraper.__new__(main.ObiletScraper)  # Sadece parse metodları (HTTP / DB yok)
+
+    def run_full():
+        journeys = scraper.parse_journeys_payload(json.loads(payload))
+        return scraper.filter_journeys_by_date(journeys, target_date)
+
+    def run_stream():
+        return parse_journeys_stream(payload, target_date)
+
+    results = {}
+    with quiet():
+        for name, func in (('full', run_full), ('stream', run_stream)):
+            started = time.perf_counter()
+            for _ in range(args.repeat):
+                kept = func()
+            elapsed = (time.perf_counter() - started) / args.repeat
+
+            tracemalloc.start()
+            kept = func()
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            results[name] = (elapsed, peak, len(kept))
+
+    print(f"payload={len(payload) / 1024:.0f} KB date={target_date} repeat={args.repeat}")
+    for name, (elapsed, peak, kept) in results.items():
+        print(f"  {name:<8} {elapsed * 1000:8.1f} ms  peak {peak / 1024:9.0f} KB  ({kept} journeys kept)")
+
+
+def legacy_journey_dicts(data, route_id, date_str):
+    """Eski format: journey başına ~20 anahtarlı dict + duraklar + buffer'da eklenen route bilgisi"""
+    scraped_at = datetime.utcnow().isoformat()
+    journeys = []
+    for j in data.get('journeys', []):
+        journey = j.get('journey', {})
+        journeys.append({
+            'id': j.get('id'),
+            'partner_id': j.get('partner-id'),
+            'partner_name': j.get('partner-name'),
+            'bus_type': j.get('bus-type'),
+            'total_seats': j.get('total-seats'),
+            'available_seats': j.get('available-seats'),
+            'origin': journey.get('origin'),
+            'destination': journey.get('destination'),
+            'departure': journey.get('departure'),
+            'arrival': journey.get('arrival'),
+            'duration': 0,
+            'original_price': journey.get('original-price'),
+            'internet_price': journey.get('internet-price'),
+            'currency': journey.get('currency'),
+            'bus_name': journey.get('bus-name'),
+            'peron_no': journey.get('peron-no'),
+            'features': [],
+            'stops': [
+                {'name': stop.get('name'), 'time': stop.get('time'),
+                 'is_origin': stop.get('is-origin'), 'is_destination': stop.get('is-destination')}
+                for stop in journey.get('stops', [])
+            ],
+            'partner_rating': j.get('partner-rating'),
+            'partner_route_rating': j.get('partner-route-rating'),
+            'route_id': route_id,
+            'route_name': f"Route {route_id}",
+            'scraped_date': date_str,
+            'scraped_at': scraped_at,
+        })
+    return journeys
+
+
+def legacy_downstream(journeys, parse_datetime):
+    """Eski sync + price history yolu: kalkış / varış her tüketicide yeniden parse edilir"""
+    rows = 0
+    for data in journeys:
+        parse_datetime(data.get('departure'))  # filter_journeys_by_date
+        parse_datetime(data.get('departure'))  # get_unique_key
+        parse_datetime(data.get('departure'))  # build_journey_values
+        parse_datetime(data.get('arrival'))
+        if data.get('total_seats') and data['total_seats'] > 0:
+            round(((data['total_seats'] - data.get('available_seats', 0)) / data['total_seats']) * 100, 2)
+        parse_datetime(data.get('departure'))  # insert_price_history_for_route
+        rows += 1
+    return rows
+
+
+def record_downstream(records):
+    """Yeni yol: alanlar ingest'te parse edildi, tüketiciler sadece okur"""
+    rows = 0
+    for record in records:
+        record.departure_time.date()
+        record.departure_time.isoformat()
+        record.arrival_time
+        record.occupancy_rate
+        record.departure_time.replace(tzinfo=None)
+        rows += 1
+    return rows
+
+
+def bench_records(args):
+    """Run boyunca buffer'da tutulan journey'ler: eski dict'ler vs JourneyRecord (retained memory + süre)"""
+    from obilet_parser import project_journey
+
+    date_str = args.date or date.today().isoformat()
+    payloads = [json.loads(make_fixture_payload(args.journeys, date_str)) for _ in range(min(args.routes, 4))]
+
+    def run_dicts():
+        buffer = {}
+        for route_id in range(args.routes):
+            journeys = legacy_journey_dicts(payloads[route_id % len(payloads)], route_id, date_str)
+            legacy_downstream(journeys, legacy_parse_datetime)
+            buffer[(route_id, date_str)] = journeys
+        return buffer
+
+    def run_records():
+        buffer = {}
+        for route_id in range(args.routes):
+            records = [project_journey(j) for j in payloads[route_id % len(payloads)]['journeys']]
+            record_downstream(records)
+            buffer[(route_id, date_str)] = records
+        return buffer
+
+    results = {}
+    with quiet():
+        for name, func in (('dicts', run_dicts), ('records', run_records)):
+            started = time.perf_counter()
+            func()
+            elapsed = time.perf_counter() - started
+
+            tracemalloc.start()
+            buffer = func()
+            retained, _ = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            del buffer
+            results[name] = (elapsed, retained)
+
+    total = args.routes * args.journeys
+    print(f"routes={args.routes} journeys/route={args.journeys} total={total}")
+    for name, (elapsed, retained) in results.items():
+        print(f"  {name:<8} {elapsed * 1000:8.1f} ms  retained {retained / 1024 / 1024:7.1f} MB  "
+              f"({retained / total:6.0f} B/journey)")
+
+
+def legacy_parse_datetime(datetime_str):
+    """Eski parse_datetime_safe: her çağrıda fromisoformat + fonksiyon içi import, cache yok"""
+    if not datetime_str:
+        return None
+    try:
+        dt = datetime.fromisoformat(datetime_str.replace('Z', '+00:00'))
+        if dt.tzinfo is None:
+            from datetime import timezone
+            dt = dt.replace(tzinfo=timezone.utc)
+        return dt
+    except Exception:
+        try:
+            dt = datetime.strptime(datetime_str, '%Y-%m-%dT%H:%M:%S')
+            from datetime import timezone
+            return dt.replace(tzinfo=timezone.utc)
+        except Exception:
+            return None
+
+
+def bench_datetimes(args):
+    """Journey başına kalkış / varış parse: eski yol (tüketici başına 5 parse) vs ingest'te tek memoize parse"""
+    from obilet_parser import _parse_datetime_cached, parse_obilet_datetime
+
+    horizon = [(date.today() + timedelta(days=d)).isoformat() for d in range(args.horizon)]
+    items = [
+        (j['journey']['departure'], j['journey']['arrival'])
+        for date_str in horizon
+        for j in json.loads(make_fixture_payload(args.journeys, date_str))['journeys']
+    ]
+    items *= max(1, args.routes // len(horizon))  # Route'lar arasında aynı saatler tekrar eder
+    _parse_datetime_cached.cache_clear()
+
+    def run_legacy():
+        for departure, arrival in items:
+            legacy_parse_datetime(departure)  # filter_journeys_by_date
+            legacy_parse_datetime(departure)  # get_unique_key
+            legacy_parse_datetime(departure)  # create_journey_object
+            legacy_parse_datetime(arrival)
+            legacy_parse_datetime(departure)  # insert_price_history_for_route
+
+    def run_once():
+        for departure, arrival in items:
+            parse_obilet_datetime(departure)
+            parse_obilet_datetime(arrival)
+
+    results = {}
+    for name, func in (('legacy', run_legacy), ('once', run_once)):
+        started = time.perf_counter()
+        func()
+        results[name] = time.perf_counter() - started
+
+    info = _parse_datetime_cached.cache_info()
+    print(f"journeys={len(items)} distinct strings={info.currsize} cache hit rate={info.hits / max(1, info.hits + info.misses) * 100:.1f}%")
+    for name, elapsed in results.items():
+        print(f"  {name:<8} {elapsed * 1000:8.1f} ms  {elapsed / len(items) * 1e9:8.0f} ns/journey")
+
+
+def bench_schedule(args):
+    """Adaptif planlayıcı simülasyonu: credit tasarrufu vs kaçırılan / geç görülen değişim"""
+    from scheduler import RefreshScheduler, load_change_timeline, simulate_refresh
+
+    if args.source == 'db':
+        timeline = load_change_timeline(since=datetime.utcnow() - timedelta(days=args.days))
+    else:
+        timeline = make_change_timeline(args.routes, args.horizon, args.hours, seed=args.seed)
+
+    with quiet():
+        stats = simulate_refresh(
+            RefreshScheduler(max_interval_hours=args.max_interval, hours_per_day=args.hours_per_day,
+                             near_days=args.near_days),
+            timeline,
+            budget=args.budget
+        )
+
+    baseline = stats['baseline_credits']
+    changes = stats['changes']
+    print(f"source={args.source} pairs={stats['pairs']} hours={stats['hours']} changes={changes} budget={args.budget or '-'}")
+    print(f"  {'baseline':<10} {baseline:8d} credits")
+    print(f"  {'adaptive':<10} {stats['credits']:8d} credits  "
+          f"({(1 - stats['credits'] / baseline) * 100 if baseline else 0:5.1f}% saved, {stats['deferred']} deferred by budget)")
+    if changes:
+        print(f"  changes: {stats['on_time'] / changes * 100:5.1f}% seen in the same hour, "
+              f"avg delay {stats['avg_delay_hours']:.2f}h, "
+              f"{stats['overwritten']} overwritten before seen, {stats['undetected']} never seen")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='SeferTakip benchmark')
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    p = sub.add_parser('engines', help='Thread pool vs async engine (lokal stub)')
+    p.add_argument('--routes', type=int, default=200)
+    p.add_argument('--delay', type=float, default=0.5, help='Stub cevap gecikmesi (s)')
+    p.add_argument('--workers', type=int, default=10)
+    p.add_argument('--concurrency', type=int, default=100)
+    p.add_argument('--journeys', type=int, default=300)
+    p.add_argument('--fixture', help='Kayıtlı Obilet JSON payload dosyası')
+    p.set_defaults(func=bench_engines)
+
+    p = sub.add_parser('ratecontrol', help='Ban dönemi boyunca circuit breaker / AIMD / retry bütçesi (lokal stub)')
+    p.add_argument('--routes', type=int, default=200)
+    p.add_argument('--workers', type=int, default=10)
+    p.add_argument('--delay', type=float, default=0.05, help='Stub cevap gecikmesi (s)')
+    p.add_argument('--journeys', type=int, default=50)
+    p.add_argument('--ban-start', type=float, default=0.5, help='Ban başlangıcı (s)')
+    p.add_argument('--ban-seconds', type=float, default=5, help='Ban süresi (s)')
+    p.add_argument('--retries', type=int, default=10)
+    p.set_defaults(func=bench_ratecontrol)
+
+    p = sub.add_parser('history', help='PriceHistory yazma yöntemleri (DATABASE_URL)')
+    p.add_argument('--rows', type=int, default=50000)
+    p.set_defaults(func=bench_history)
+
+    p = sub.add_parser('parse', help='Obilet JSON parse: full vs stream (süre + peak memory)')
+    p.add_argument('--journeys', type=int, default=2000)
+    p.add_argument('--fixture', help='Kayıtlı Obilet JSON payload dosyası')
+    p.add_argument('--date', help='Tarih filtresi (YYYY-MM-DD, varsayılan bugün)')
+    p.add_argument('--repeat', type=int, default=5)
+    p.set_defaults(func=bench_parse)
+
+    p = sub.add_parser('records', help='Buffer\'daki journey\'ler: dict vs JourneyRecord (memory + süre)')
+    p.add_argument('--routes', type=int, default=200)
+    p.add_argument('--journeys', type=int, default=300)
+    p.add_argument('--date', help='Fixture tarihi (YYYY-MM-DD, varsayılan bugün)')
+    p.set_defaults(func=bench_records)
+
+    p = sub.add_parser('datetimes', help='Journey başına datetime parse: eski yol vs tek memoize parse')
+    p.add_argument('--routes', type=int, default=200)
+    p.add_argument('--journeys', type=int, default=300)
+    p.add_argument('--horizon', type=int, default=3, help='Gün sayısı')
+    p.set_defaults(func=bench_datetimes)
+
+    p = sub.add_parser('schedule', help='Adaptif refresh planlayıcı simülasyonu (sentetik ya da price_history)')
+    p.add_argument('--source', choices=('synthetic', 'db'), default='synthetic')
+    p.add_argument('--days', type=int, default=7, help='db: tekrar oynatılacak gün sayısı')
+    p.add_argument('--routes', type=int, default=100)
+    p.add_argument('--horizon', type=int, default=7)
+    p.add_argument('--hours', type=int, default=168)
+    p.add_argument('--seed', type=int, default=0)
+    p.add_argument('--budget', type=int, default=0, help='Run başına credit (0 = sınırsız)')
+    p.add_argument('--max-interval', type=float, default=12)
+    p.add_argument('--hours-per-day', type=float, default=2)
+    p.add_argument('--near-days', type=int, default=2)
+    p.set_defaults(func=bench_schedule)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,242 @@
+"""
+SeferTakip - Daemon Mode
+Saatlik cron yerine resident process: import'lar, DB / HTTP pool'ları, route listesi ve
+cache'ler (parmak izleri, response cache, price history delta) run'lar arası sıcak kalır
+
+- Zamanlama: interval_seconds'lık duvar saati tick'leri (cron gibi) + her run'a [0, jitter] gecikme -
+  instance'lar aynı saniyede başlamaz, run kendi slot'unda kalır (shard run_key'i)
+- Overlap: run'lar tek thread'de sırayla; tick'i aşan run'dan sonra kaçırılan tick'ler atlanır
+  (instance'lar arası overlap'i RUN_LOCK=1 ile run lock engeller)
+- SIGTERM / SIGINT: yeni run başlamaz, süren run drain edilir (başlamamış birimler ertelenir,
+  süren birimler sync edilir, kuyruk kapanır, rapor gider) - ikinci sinyal hemen çıkar
+- Health: GET /health (JSON, sağlıksızsa 503) ve GET /metrics (Prometheus text format)
+"""
+
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from threading import Event, Lock, Thread
+import json
+import logging
+import random
+import signal
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class ScraperDaemon:
+    """ObiletScraper'ı tek process'te periyodik çalıştırır (scraper.run + scraper.drain)"""
+
+    def __init__(self, scraper, interval_seconds=3600, jitter_seconds=30, run_on_start=True, run_kwargs=None,
+                 health_port=0, health_host='0.0.0.0', max_run_seconds=None, max_consecutive_failures=3):
+        self.scraper = scraper
+        self.interval = interval_seconds
+        self.jitter = jitter_seconds
+        self.run_on_start = run_on_start
+        self.run_kwargs = run_kwargs or {}
+        self.health_port = health_port
+        self.health_host = health_host
+        self.max_run_seconds = max_run_seconds or 2 * interval_seconds  # Bundan uzun süren run = takıldı
+        self.max_consecutive_failures = max_consecutive_failures
+
+        self.stopping = Event()
+        self.stop_reason = None
+        self.lock = Lock()
+        self.server = None
+
+        # Durum (health / metrics)
+        self.state = 'starting'  # idle / running / draining / stopped
+        self.started_at = time.time()
+        self.run_started_at = None
+        self.next_run_at = None
+        self.last_run = None  # {started_at, finished_at, elapsed, result, error}
+
+        # Statistics
+        self.runs = 0
+        self.failures = 0  # Exception ile biten run
+        self.consecutive_failures = 0
+        self.skipped_runs = 0  # Lock başka run'da / aktif route yok
+        self.missed_ticks = 0  # Uzun süren run yüzünden atlanan tick'ler
+
+    def next_tick(self, now):
+        """now'dan sonraki ilk tick (duvar saatine hizalı) + jitter"""
+        return (int(now // self.interval) + 1) * self.interval + random.uniform(0, self.jitter)
+
+    def serve(self):
+        """Ana döngü - durdurulana kadar bloklar (signal handler'lar main thread'de kurulur)"""
+        self.install_signal_handlers()
+        self.start_health_server()
+
+        next_at = time.time() if self.run_on_start else self.next_tick(time.time())
+        try:
+            while not self.stopping.is_set():
+                with self.lock:
+                    self.state = 'idle'
+                    self.next_run_at = next_at
+                logger.info(f"⏰ Daemon: next run at {time.strftime('%H:%M:%S', time.localtime(next_at))}")
+                if self.stopping.wait(max(0.0, next_at - time.time())):
+                    break
+                self.run_cycle()
+                next_at = self.next_tick(time.time())
+        finally:
+            with self.lock:
+                self.state = 'stopped'
+                self.next_run_at = None
+            if self.server is not None:
+                self.server.shutdown()
+                self.server.server_close()
+            logger.info(f"👋 Daemon stopped ({self.stop_reason or 'done'}) after {self.runs} runs")
+
+    def run_cycle(self):
+        """Tek run - hata daemon'ı durdurmaz, sonraki tick'te tekrar denenir"""
+        started = time.time()
+        with self.lock:
+            self.state = 'running'
+            self.run_started_at = started
+
+        result, error = None, None
+        try:
+            result = self.scraper.run(**self.run_kwargs)
+        except Exception as e:
+            error = str(e)
+            logger.error(f"❌ Daemon run failed: {e}", exc_info=True)
+
+        finished = time.time()
+        missed = max(0, int(finished // self.interval) - int(started // self.interval))
+        if missed:
+            logger.warning(f"⏭  Run took {finished - started:.0f}s - {missed} tick(s) skipped (no overlapping runs)")
+
+        with self.lock:
+            self.runs += 1
+            self.missed_ticks += missed
+            if error is not None:
+                self.failures += 1
+                self.consecutive_failures += 1
+            else:
+                self.consecutive_failures = 0
+                if result is None:
+                    self.skipped_runs += 1
+            self.run_started_at = None
+            self.state = 'draining' if self.stopping.is_set() else 'idle'
+            self.last_run = {
+                'started_at': started,
+                'finished_at': finished,
+                'elapsed': finished - started,
+                'result': result,
+                'error': error,
+            }
+
+    # ------------------------------------------------------------------
+    # Durdurma
+    # ------------------------------------------------------------------
+
+    def install_signal_handlers(self):
+        for signum in (signal.SIGTERM, signal.SIGINT):
+            signal.signal(signum, self.handle_signal)
+
+    def handle_signal(self, signum, frame):
+        name = signal.Signals(signum).name
+        if self.stopping.is_set():
+            logger.warning(f"🛑 {name} again - exiting without draining")
+            raise SystemExit(1)
+        self.stop(name)
+
+    def stop(self, reason='shutdown'):
+        """Yeni run başlamaz; süren run drain edilir (deadline şimdiye çekilir)"""
+        self.stop_reason = reason
+        self.stopping.set()
+        with self.lock:
+            running = self.state == 'running'
+            if running:
+                self.state = 'draining'
+        self.scraper.drain(reason=f"shutdown ({reason})")
+        logger.warning(f"🛑 {reason}: " + ("draining current run - unstarted units deferred to next run"
+                                            if running else "stopping"))
+
+    # ------------------------------------------------------------------
+    # Health / metrics
+    # ------------------------------------------------------------------
+
+    def get_health(self, now=None):
+        """(sağlıklı mı, durum sözlüğü)"""
+        now = now or time.time()
+        with self.lock:
+            running_for = now - self.run_started_at if self.run_started_at else 0
+            status = {
+                'state': self.state,
+                'uptime': now - self.started_at,
+                'running_for': running_for,
+                'next_run_at': self.next_run_at,
+                'runs': self.runs,
+                'failures': self.failures,
+                'consecutive_failures': self.consecutive_failures,
+                'skipped_runs': self.skipped_runs,
+                'missed_ticks': self.missed_ticks,
+                'last_run': self.last_run,
+            }
+        status['warm'] = self.scraper.get_warm_state()
+
+        problems = []
+        if self.stopping.is_set():
+            problems.append('stopping')
+        if running_for > self.max_run_seconds:
+            problems.append(f"run stuck for {running_for:.0f}s")
+        if status['consecutive_failures'] >= self.max_consecutive_failures:
+            problems.append(f"{status['consecutive_failures']} consecutive failed runs")
+        status['problems'] = problems
+        return not problems, status
+
+    def get_metrics(self):
+        """Prometheus text format"""
+        healthy, status = self.get_health()
+        last = status['last_run'] or {}
+        result = last.get('result') or {}
+        lines = [
+            ('scraper_daemon_healthy', int(healthy)),
+            ('scraper_daemon_running', int(status['state'] in ('running', 'draining'))),
+            ('scraper_daemon_uptime_seconds', round(status['uptime'], 1)),
+            ('scraper_runs_total', status['runs']),
+            ('scraper_run_failures_total', status['failures']),
+            ('scraper_runs_skipped_total', status['skipped_runs']),
+            ('scraper_ticks_missed_total', status['missed_ticks']),
+            ('scraper_next_run_timestamp_seconds', round(status['next_run_at'] or 0, 1)),
+            ('scraper_last_run_timestamp_seconds', round(last.get('finished_at', 0), 1)),
+            ('scraper_last_run_duration_seconds', round(last.get('elapsed', 0), 1)),
+        ]
+        for field in ('completed_routes', 'failed_routes', 'deferred_units', 'unchanged_routes', 'total_journeys',
+                      'inserted', 'updated', 'deleted', 'price_changes'):
+            lines.append((f"scraper_last_run_{field}", result.get(field, 0)))
+        for field, value in status['warm'].items():
+            lines.append((f"scraper_warm_{field}", value))
+        return ''.join(f"{name} {value}\n" for name, value in lines)
+
+    def start_health_server(self):
+        if not self.health_port:
+            return
+        daemon = self
+
+        class HealthHandler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                path = self.path.split('?', 1)[0]
+                if path in ('/', '/health'):
+                    healthy, status = daemon.get_health()
+                    self.respond(200 if healthy else 503, json.dumps(status, default=str).encode('utf-8'),
+                                 'application/json')
+                elif path == '/metrics':
+                    self.respond(200, daemon.get_metrics().encode('utf-8'), 'text/plain; version=0.0.4')
+                else:
+                    self.respond(404, b'not found', 'text/plain')
+
+            def respond(self, code, body, content_type):
+                self.send_response(code)
+                self.send_header('Content-Type', content_type)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer((self.health_host, self.health_port), HealthHandler)
+        self.server.daemon_threads = True
+        Thread(target=self.server.serve_forever, name='daemon-health', daemon=True).start()
+        logger.info(f"🩺 Health endpoint on :{self.server.server_port} (/health, /metrics)")
@@ -0,0 +1,139 @@
+"""
+SeferTakip - Route Sync Fingerprint
+Scrape edilen seferlerin (id, fiyat, koltuk) parmak izi
+
+Parmak izi son başarılı sync'tekiyle aynıysa o (route, tarih) için sync, alert ve
+price history işi tamamen atlanır. Run başında tek sorguyla yüklenir, run sonunda
+değişenler tek upsert ile yazılır - değişmeyen route başına DB işi yok.
+"""
+
+from datetime import datetime, timedelta
+from threading import Lock
+import hashlib
+import logging
+
+from sqlalchemy import and_, delete, insert, select
+
+from history_writer import normalize_price
+from models_standalone import RouteSyncFingerprint, get_db_engine
+
+logger = logging.getLogger(__name__)
+
+
+def journeys_fingerprint(journeys):
+    """Sıradan bağımsız, stabil hash: (journey id, internet_price, available_seats)"""
+    items = sorted(
+        f"{record.id}|{normalize_price(record.internet_price)}|{record.available_seats}"
+        for record in journeys
+    )
+    return hashlib.blake2b('\n'.join(items).encode('utf-8'), digest_size=16).hexdigest()
+
+
+class FingerprintStore:
+    """
+    (route_id, departure_date) -> son sync edilen parmak izi (thread-safe)
+    resync_hours'tan eski parmak izleri eşleşme sayılmaz (periyodik tam sync)
+    """
+
+    def __init__(self, resync_hours=6):
+        self.resync = timedelta(hours=resync_hours)
+        self.fingerprints = {}  # (route_id, departure_date) -> (fingerprint, journey_count, synced_at)
+        self.dirty = set()
+        self.loaded_dates = set()
+        self.lock = Lock()
+
+        # Statistics
+        self.skipped = 0
+
+    def load(self, engine=None, dates=()):
+        """Verilen günlerin parmak izlerini yükle (her gün bir kez)"""
+        engine = engine or get_db_engine()
+        dates = [d for d in dates if d not in self.loaded_dates]
+        if not dates:
+            return
+
+        table = RouteSyncFingerprint.__table__
+        with engine.connect() as conn:
+            rows = conn.execute(select(table).where(table.c.departure_date.in_(dates))).all()
+
+        with self.lock:
+            for row in rows:
+                self.fingerprints.setdefault(
+                    (row.route_id, row.departure_date),
+                    (row.fingerprint, row.journey_count, row.synced_at)
+                )
+            self.loaded_dates.update(dates)
+
+        logger.info(f"🔏 Sync fingerprints: {len(rows)} loaded for {len(dates)} date(s)")
+
+    def matches(self, route_id, departure_date, fingerprint, now=None):
+        """Parmak izi son sync ile aynı mı - aynıysa skip sayacı artar"""
+        now = now or datetime.utcnow()
+        with self.lock:
+            last = self.fingerprints.get((route_id, departure_date))
+            matched = last is not None and last[0] == fingerprint and now - last[2] < self.resync
+            if matched:
+                self.skipped += 1
+        return matched
+
+    def remember(self, route_id, departure_date, fingerprint, journey_count):
+        """Başarılı sync sonrası parmak izini güncelle"""
+        with self.lock:
+            key = (route_id, departure_date)
+            self.fingerprints[key] = (fingerprint, journey_count, datetime.utcnow())
+            self.dirty.add(key)
+
+    def forget(self, route_id, departure_date):
+        """Sync başarısız - bir sonraki run tam sync yapsın"""
+        with self.lock:
+            key = (route_id, departure_date)
+            if self.fingerprints.pop(key, None) is not None:
+                self.dirty.add(key)
+
+    def prune(self, before_date):
+        with self.lock:
+            self.fingerprints = {k: v for k, v in self.fingerprints.items() if k[1] >= before_date}
+            self.dirty = {k for k in self.dirty if k[1] >= before_date}
+            self.loaded_dates = {d for d in self.loaded_dates if d >= before_date}
+
+    def save(self, engine=None, before_date=None):
+        """Değişen parmak izlerini yaz (delete + insert, tek transaction)"""
+        engine = engine or get_db_engine()
+        table = RouteSyncFingerprint.__table__
+
+        with self.lock:
+            dirty, self.dirty = self.dirty, set()
+            rows = [
+                {'route_id': route_id, 'departure_date': departure_date, 'fingerprint': value[0],
+                 'journey_count': value[1], 'synced_at': value[2]}
+                for route_id, departure_date in dirty
+                for value in [self.fingerprints.get((route_id, departure_date))]
+                if value is not None
+            ]
+
+        try:
+            with engine.begin() as conn:
+                for departure_date in {d for _, d in dirty}:
+                    route_ids = [route_id for route_id, d in dirty if d == departure_date]
+                    conn.execute(delete(table).where(and_(
+                        table.c.departure_date == departure_date,
+                        table.c.route_id.in_(route_ids)
+                    )))
+                if rows:
+                    conn.execute(insert(table), rows)
+                if before_date is not None:
+                    conn.execute(delete(table).where(table.c.departure_date < before_date))
+        except Exception:
+            with self.lock:
+                self.dirty |= dirty
+            raise
+
+        logger.info(f"🔏 Sync fingerprints: {len(rows)} saved")
+
+    def reset_stats(self):
+        with self.lock:
+            self.skipped = 0
+
+    def get_stats(self):
+        with self.lock:
+            return {'skipped': self.skipped, 'tracked': len(self.fingerprints)}
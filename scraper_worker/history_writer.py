@@ -0,0 +1,368 @@
+"""
+SeferTakip - PriceHistory Writer
+price_history için buffer'lı yüksek throughput yazıcı
+
+- PostgreSQL (psycopg2): COPY price_history FROM STDIN (in-memory buffer)
+- Diğerleri (ör. SQLite): executemany INSERT
+Satırlar route'lar arasında biriktirilir, flush_rows'a ulaşınca ya da run sonunda yazılır.
+Satırlarla birlikte verilen iş birimleri (route_id, departure_date) yazım bitince on_written
+callback'ine yazıldı / yazılamadı olarak bildirilir (kuyruk checkpoint'i yazımdan sonra).
+
+Delta modunda (PriceHistoryDeltaFilter) sadece fiyat / koltuk değişen seriler yazılır,
+okuyucular expand_price_history ile saatlik seriyi geri oluşturur.
+"""
+
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from threading import Lock
+import io
+import logging
+import time
+
+from sqlalchemy import func, insert, select
+
+from models_standalone import PriceHistory, get_db_engine
+
+logger = logging.getLogger(__name__)
+
+
+PRICE_HISTORY_COLUMNS = (
+    'route_id',
+    'company_name',
+    'obilet_partner_id',
+    'price',
+    'currency',
+    'departure_date',
+    'days_before_departure',
+    'available_seats',
+    'total_seats',
+    'occupancy_rate',
+    'recorded_at',
+    'departure_time',
+)
+
+# Delta filtre için kolon index'leri
+_ROUTE_ID, _COMPANY, _PARTNER_ID, _PRICE = 0, 1, 2, 3
+_DEPARTURE_DATE, _AVAILABLE, _TOTAL, _RECORDED_AT, _DEPARTURE_TIME = 5, 7, 8, 10, 11
+
+_COPY_ESCAPES = str.maketrans({'\\': '\\\\', '\t': '\\t', '\n': '\\n', '\r': '\\r'})
+
+
+def format_copy_value(value):
+    """COPY text formatı için tek değer"""
+    if value is None:
+        return '\\N'
+    if isinstance(value, bool):
+        return 't' if value else 'f'
+    if isinstance(value, (int, float, Decimal)):
+        return str(value)
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return str(value).translate(_COPY_ESCAPES)
+
+
+def supports_copy(engine):
+    """COPY FROM STDIN kullanılabilir mi? (psycopg2 driver)"""
+    return engine.dialect.name == 'postgresql' and engine.dialect.driver == 'psycopg2'
+
+
+def normalize_price(value):
+    """DB Numeric(10, 2) ile karşılaştırılabilir fiyat"""
+    if value is None:
+        return None
+    return Decimal(str(value)).quantize(Decimal('0.01'))
+
+
+class PriceHistoryDeltaFilter:
+    """
+    Change-only kayıt: (route, firma, kalkış) serisinin son kaydedilen noktasıyla
+    price / available_seats / total_seats aynıysa satır yazılmaz.
+    heartbeat_hours > 0 ise değişiklik olmasa da her N saatte bir nokta yazılır.
+    Son değerler memory'de tutulur, ilk kullanımda DB'den yüklenir (warm).
+    """
+
+    def __init__(self, heartbeat_hours=0):
+        self.heartbeat = timedelta(hours=heartbeat_hours) if heartbeat_hours else None
+        self.last_points = {}  # series_key -> (price, available_seats, total_seats, recorded_at)
+        self.warmed_dates = set()
+        self.lock = Lock()
+
+        # Statistics
+        self.rows_seen = 0
+        self.rows_skipped = 0
+
+    @staticmethod
+    def series_key(route_id, partner_id, company_name, departure_time):
+        return (route_id, partner_id, company_name, departure_time)
+
+    def warm(self, engine, departure_dates):
+        """Verilen kalkış günleri için her serinin son noktasını DB'den yükle"""
+        dates = [d for d in departure_dates if d not in self.warmed_dates]
+        if not dates:
+            return
+
+        ph = PriceHistory.__table__
+        ranked = select(
+            ph.c.route_id, ph.c.obilet_partner_id, ph.c.company_name, ph.c.departure_time,
+            ph.c.price, ph.c.available_seats, ph.c.total_seats, ph.c.recorded_at,
+            func.row_number().over(
+                partition_by=(ph.c.route_id, ph.c.obilet_partner_id, ph.c.company_name, ph.c.departure_time),
+                order_by=ph.c.recorded_at.desc()
+            ).label('rn')
+        ).where(
+            ph.c.departure_date.in_(dates),
+            ph.c.departure_time.isnot(None)
+        ).subquery()
+
+        with engine.connect() as conn:
+            rows = conn.execute(select(ranked).where(ranked.c.rn == 1)).all()
+
+        with self.lock:
+            for row in rows:
+                key = self.series_key(row.route_id, row.obilet_partner_id, row.company_name, row.departure_time)
+                current = self.last_points.get(key)
+                if current is None or current[3] < row.recorded_at:
+                    self.last_points[key] = (normalize_price(row.price), row.available_seats,
+                                             row.total_seats, row.recorded_at)
+            self.warmed_dates.update(dates)
+
+        logger.info(f"📈 Price History delta cache: {len(rows)} series loaded for {len(dates)} date(s)")
+
+    def filter_rows(self, rows):
+        """Sadece değişen (ya da heartbeat zamanı gelen) satırları döndür"""
+        kept = []
+        with self.lock:
+            for row in rows:
+                key = self.series_key(row[_ROUTE_ID], row[_PARTNER_ID], row[_COMPANY], row[_DEPARTURE_TIME])
+                values = (normalize_price(row[_PRICE]), row[_AVAILABLE], row[_TOTAL])
+                recorded_at = row[_RECORDED_AT]
+
+                last = self.last_points.get(key) if row[_DEPARTURE_TIME] is not None else None
+                if (last is not None and last[:3] == values and
+                        (self.heartbeat is None or recorded_at - last[3] < self.heartbeat)):
+                    continue
+
+                if row[_DEPARTURE_TIME] is not None:
+                    self.last_points[key] = values + (recorded_at,)
+                kept.append(row)
+
+            self.rows_seen += len(rows)
+            self.rows_skipped += len(rows) - len(kept)
+        return kept
+
+    def forget(self, rows):
+        """Yazılamayan satırların cache kaydını sil (sonraki run tekrar yazsın)"""
+        with self.lock:
+            for row in rows:
+                key = self.series_key(row[_ROUTE_ID], row[_PARTNER_ID], row[_COMPANY], row[_DEPARTURE_TIME])
+                last = self.last_points.get(key)
+                if last is not None and last[3] == row[_RECORDED_AT]:
+                    del self.last_points[key]
+
+    def reset_stats(self):
+        with self.lock:
+            self.rows_seen = 0
+            self.rows_skipped = 0
+
+    def prune(self, before_date):
+        """Geçmiş kalkış günlerine ait serileri memory'den at"""
+        with self.lock:
+            self.last_points = {
+                key: value for key, value in self.last_points.items()
+                if key[3] is None or key[3].date() >= before_date
+            }
+            self.warmed_dates = {d for d in self.warmed_dates if d >= before_date}
+
+
+class PriceHistoryWriter:
+    """
+    Thread-safe, buffer'lı price_history yazıcı
+    method: 'auto' (COPY varsa COPY), 'copy' ya da 'executemany'
+    delta: PriceHistoryDeltaFilter verilirse sadece değişen satırlar yazılır
+    on_written: on_written(written_units, failed_units) - add_rows'a verilen birimlerin sonucu
+    (yazan thread'de çağrılır)
+    """
+
+    def __init__(self, engine=None, flush_rows=5000, method='auto', delta=None, on_written=None):
+        self.engine = engine
+        self.flush_rows = flush_rows
+        self.method = method
+        self.delta = delta
+        self.on_written = on_written
+
+        self.buffer = []
+        self.buffer_units = []  # Satırları buffer'da bekleyen birimler
+        self.lock = Lock()
+
+        # Statistics
+        self.rows_written = 0
+        self.rows_failed = 0
+        self.flushes = 0
+        self.write_time = 0.0
+
+    def get_engine(self):
+        if self.engine is None:
+            self.engine = get_db_engine()
+        return self.engine
+
+    def resolve_method(self):
+        if self.method == 'auto':
+            return 'copy' if supports_copy(self.get_engine()) else 'executemany'
+        return self.method
+
+    def add_rows(self, rows, units=()):
+        """
+        Satırları buffer'a ekle (PRICE_HISTORY_COLUMNS sırasıyla tuple'lar)
+        units: satırları eklenen (route_id, departure_date) birimleri - buffer'da satırı kalmayanlar
+        (boş / delta'da elenen) hemen, diğerleri satırları yazılınca on_written'a bildirilir
+        Buffer flush_rows'u geçerse bu thread yazar
+        """
+        if self.delta is not None:
+            rows = self.delta.filter_rows(rows)
+        buffered = {(row[_ROUTE_ID], row[_DEPARTURE_DATE]) for row in rows}
+        ready = [unit for unit in units if unit not in buffered]
+        if ready:
+            self.notify_written(ready, set())
+        if not rows:
+            return
+
+        to_write = None
+        with self.lock:
+            self.buffer.extend(rows)
+            self.buffer_units.extend(unit for unit in units if unit in buffered)
+            if len(self.buffer) >= self.flush_rows:
+                to_write, self.buffer = self.buffer, []
+                to_write_units, self.buffer_units = self.buffer_units, []
+
+        if to_write:
+            self.write(to_write, to_write_units)
+
+    def flush(self):
+        """Buffer'da kalanları yaz - dönen küme: yazılamayan (route_id, departure_date) birimleri"""
+        with self.lock:
+            to_write, self.buffer = self.buffer, []
+            to_write_units, self.buffer_units = self.buffer_units, []
+        if to_write:
+            return self.write(to_write, to_write_units)
+        return set()
+
+    def write(self, rows, units=()):
+        """
+        Satırları yaz - dönen küme: yazılamayan (route_id, departure_date) birimleri
+        COPY hata verirse bir kez executemany ile denenir; o da olmazsa her (route, gün) kendi
+        transaction'ında yazılır, sadece hata veren birimin satırları düşer (delta cache'ten de silinir)
+        """
+        method = self.resolve_method()
+        started = time.perf_counter()
+
+        try:
+            if method == 'copy':
+                self.write_copy(rows)
+            else:
+                self.write_executemany(rows)
+        except Exception as e:
+            logger.warning(f"⚠️  Price History {method} failed ({len(rows)} rows): {e} - retrying "
+                           + ("with executemany" if method == 'copy' else "per route"))
+            failed = self.write_fallback(rows, retry_all=method == 'copy')
+        else:
+            failed = set()
+            logger.info(f"    💾 Price History: {len(rows)} records added ({method})")
+
+        failed_rows = [row for row in rows if (row[_ROUTE_ID], row[_DEPARTURE_DATE]) in failed]
+        with self.lock:
+            self.rows_written += len(rows) - len(failed_rows)
+            self.rows_failed += len(failed_rows)
+            self.flushes += 1
+            self.write_time += time.perf_counter() - started
+
+        if failed_rows and self.delta is not None:
+            self.delta.forget(failed_rows)
+        if units:
+            self.notify_written(units, failed)
+        return failed
+
+    def notify_written(self, units, failed):
+        """Birimlerin yazım sonucunu on_written'a bildir (callback hatası yazımı etkilemez)"""
+        if self.on_written is None:
+            return
+        try:
+            self.on_written([unit for unit in units if unit not in failed],
+                            [unit for unit in units if unit in failed])
+        except Exception as e:
+            logger.error(f"❌ Price History on_written callback error ({len(units)} units): {e}")
+
+    def write_fallback(self, rows, retry_all=True):
+        """Toplu yazım hata verdi: (retry_all ise) tek executemany, sonra (route, gün) başına ayrı yazım"""
+        if retry_all:
+            try:
+                self.write_executemany(rows)
+                logger.info(f"    💾 Price History: {len(rows)} records added (executemany retry)")
+                return set()
+            except Exception as e:
+                logger.warning(f"⚠️  Price History executemany retry failed: {e} - writing per route")
+
+        groups = {}
+        for row in rows:
+            groups.setdefault((row[_ROUTE_ID], row[_DEPARTURE_DATE]), []).append(row)
+
+        failed = set()
+        for key, group in groups.items():
+            try:
+                self.write_executemany(group)
+            except Exception as e:
+                failed.add(key)
+                logger.error(f"❌ Price History error for route {key[0]} ({key[1]}, {len(group)} rows): {e}")
+        logger.info(f"    💾 Price History: {len(groups) - len(failed)}/{len(groups)} routes written one by one")
+        return failed
+
+    def write_copy(self, rows):
+        """COPY FROM STDIN - in-memory text buffer üzerinden"""
+        buffer = io.StringIO()
+        for row in rows:
+            buffer.write('\t'.join(format_copy_value(value) for value in row))
+            buffer.write('\n')
+        buffer.seek(0)
+
+        raw = self.get_engine().raw_connection()
+        try:
+            cursor = raw.cursor()
+            cursor.copy_expert(
+                f"COPY {PriceHistory.__tablename__} ({', '.join(PRICE_HISTORY_COLUMNS)}) FROM STDIN",
+                buffer
+            )
+            cursor.close()
+            raw.commit()
+        except Exception:
+            raw.rollback()
+            raise
+        finally:
+            raw.close()
+
+    def write_executemany(self, rows):
+        """executemany INSERT (COPY olmayan DB'ler için fallback)"""
+        with self.get_engine().begin() as conn:
+            conn.execute(
+                insert(PriceHistory.__table__),
+                [dict(zip(PRICE_HISTORY_COLUMNS, row)) for row in rows]
+            )
+
+    def reset_stats(self):
+        """Run sayaçları (buffer ve delta cache korunur)"""
+        with self.lock:
+            self.rows_written = 0
+            self.rows_failed = 0
+            self.flushes = 0
+            self.write_time = 0.0
+        if self.delta is not None:
+            self.delta.reset_stats()
+
+    def get_stats(self):
+        with self.lock:
+            return {
+                'rows_skipped': self.delta.rows_skipped if self.delta is not None else 0,
+                'rows_written': self.rows_written,
+                'rows_failed': self.rows_failed,
+                'flushes': self.flushes,
+                'write_time': round(self.write_time, 3),
+                'rows_per_sec': round(self.rows_written / self.write_time, 1) if self.write_time else 0.0,
+            }
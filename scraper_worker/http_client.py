@@ -0,0 +1,162 @@
+"""
+SeferTakip - Paylaşılan HTTP Client
+Host başına keep-alive connection pool (ScrapingBee, Telegram)
+
+Her requests.post çağrısı yeni TLS bağlantısı açıyordu; burada host başına
+tek bir requests.Session tutulur ve bağlantılar worker'lar arasında paylaşılır.
+"""
+
+from urllib.parse import urlsplit
+from threading import Lock
+import requests
+from requests.adapters import HTTPAdapter
+
+
+DEFAULT_POOL_SIZE = 10
+DEFAULT_CONNECT_TIMEOUT = 10
+DEFAULT_READ_TIMEOUT = 30
+
+
+class HttpClient:
+    """Host başına pool'lu, thread-safe HTTP client"""
+
+    def __init__(self, pool_size=DEFAULT_POOL_SIZE,
+                 connect_timeout=DEFAULT_CONNECT_TIMEOUT,
+                 read_timeout=DEFAULT_READ_TIMEOUT):
+        self.pool_size = pool_size
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+
+        self.sessions = {}  # host -> requests.Session
+        self.request_counts = {}  # host -> request sayısı
+        self.connection_base = {}  # host -> reset_stats anındaki bağlantı sayısı
+        self.lock = Lock()
+
+    def _create_session(self):
+        session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=1,
+            pool_maxsize=self.pool_size,
+            pool_block=True,  # Pool doluysa yeni bağlantı açma, bekle
+            max_retries=0  # Retry mantığı çağıran tarafta
+        )
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+        return session
+
+    def get_session(self, url):
+        """URL'in host'u için paylaşılan session"""
+        host = urlsplit(url).netloc
+        with self.lock:
+            session = self.sessions.get(host)
+            if session is None:
+                session = self._create_session()
+                self.sessions[host] = session
+                self.request_counts[host] = 0
+            self.request_counts[host] += 1
+        return session
+
+    def request(self, method, url, timeout=None, **kwargs):
+        """
+        HTTP isteği gönder
+        timeout: (connect, read) tuple'ı ya da tek değer (read timeout)
+        """
+        if timeout is None:
+            timeout = (self.connect_timeout, self.read_timeout)
+        elif not isinstance(timeout, tuple):
+            timeout = (self.connect_timeout, timeout)
+
+        return self.get_session(url).request(method, url, timeout=timeout, **kwargs)
+
+    def get(self, url, **kwargs):
+        return self.request('GET', url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self.request('POST', url, **kwargs)
+
+    @staticmethod
+    def count_connections(session):
+        """Session'ın açtığı toplam bağlantı sayısı"""
+        connections = 0
+        for adapter in set(session.adapters.values()):
+            pools = adapter.poolmanager.pools
+            for key in list(pools.keys()):
+                pool = pools.get(key)
+                if pool is not None:
+                    connections += pool.num_connections
+        return connections
+
+    def reset_stats(self):
+        """Run sayaçları - session'lar (açık bağlantılar) korunur, sonraki istatistikler bu andan itibaren"""
+        with self.lock:
+            items = list(self.sessions.items())
+            self.request_counts = {host: 0 for host in self.request_counts}
+        base = {host: self.count_connections(session) for host, session in items}
+        with self.lock:
+            self.connection_base = base
+
+    def get_stats(self):
+        """
+        Host başına bağlantı tekrar kullanım istatistikleri (son reset_stats'tan beri)
+        reused = request sayısı - açılan yeni bağlantı sayısı
+        """
+        stats = {}
+        with self.lock:
+            items = list(self.sessions.items())
+            counts = dict(self.request_counts)
+            base = dict(self.connection_base)
+
+        for host, session in items:
+            connections = max(self.count_connections(session) - base.get(host, 0), 0)
+            requests_count = counts.get(host, 0)
+            stats[host] = {
+                'requests': requests_count,
+                'connections': connections,
+                'reused': max(requests_count - connections, 0),
+            }
+        return stats
+
+    def close(self):
+        """Tüm session'ları kapat"""
+        with self.lock:
+            for session in self.sessions.values():
+                session.close()
+            self.sessions = {}
+            self.request_counts = {}
+            self.connection_base = {}
+
+
+# Process genelinde tek client
+_client = None
+_client_lock = Lock()
+
+
+def configure_http_client(pool_size=DEFAULT_POOL_SIZE, connect_timeout=DEFAULT_CONNECT_TIMEOUT,
+                          read_timeout=DEFAULT_READ_TIMEOUT):
+    """Paylaşılan client'ı verilen ayarlarla (yeniden) oluştur"""
+    global _client
+    with _client_lock:
+        if _client is not None:
+            _client.close()
+        _client = HttpClient(pool_size=pool_size, connect_timeout=connect_timeout,
+                             read_timeout=read_timeout)
+        return _client
+
+
+def get_http_client():
+    """Paylaşılan HTTP client"""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = HttpClient()
+    return _client
+
+
+def close_http_client():
+    """Paylaşılan client'ı kapat (process kapanırken)"""
+    global _client
+    with _client_lock:
+        if _client is not None:
+            _client.close()
+        _client = None
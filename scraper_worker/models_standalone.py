@@ -7,10 +7,16 @@ NOT: Bu dosya models.py'nin kopyasıdır.
 Her migration'dan sonra models.py'den sync edilmelidir.
 """
 
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, Numeric, Text, Date, ForeignKey, JSON, CheckConstraint, UniqueConstraint, BigInteger
+from sqlalchemy import Column, Integer, String, Boolean, DateTime, Numeric, Text, Date, ForeignKey, JSON, CheckConstraint, UniqueConstraint, BigInteger, Index
+from sqlalchemy import create_engine, event
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import relationship
-from datetime import datetime
+from sqlalchemy.orm import relationship, sessionmaker
+from sqlalchemy.pool import QueuePool
+from datetime import datetime, timedelta
+import os
+import re
+import threading
+import time
 from werkzeug.security import generate_password_hash, check_password_hash
 import uuid
 
@@ -229,6 +235,10 @@ class PriceHistory(Base):
     Fiyat Geçmişi (Time Series Data)
     """
     __tablename__ = 'price_history'
+    __table_args__ = (
+        # Delta cache warm + saatlik seri okuma: (route, gün) içinde kalkışa göre
+        Index('ix_price_history_series', 'route_id', 'departure_date', 'departure_time'),
+    )
     
     id = Column(Integer, primary_key=True)
     route_id = Column(Integer, ForeignKey('routes.id', ondelete='CASCADE'), nullable=False)
@@ -243,6 +253,7 @@ class PriceHistory(Base):
     
     # Context
     departure_date = Column(Date, nullable=False, index=True)
+    departure_time = Column(DateTime)  # Seri anahtarı (route, firma, kalkış) - delta kayıt için
     days_before_departure = Column(Integer)
     
     # Availability
@@ -256,6 +267,10 @@ class PriceHistory(Base):
     # Relationships
     route = relationship('Route', back_populates='price_history')
     
+    def series_key(self):
+        """Zaman serisi anahtarı: (route, firma, kalkış)"""
+        return (self.route_id, self.obilet_partner_id, self.company_name, self.departure_time)
+    
     def __repr__(self):
         return f'<PriceHistory {self.company_name} {self.price} {self.departure_date}>'
 
@@ -381,6 +396,7 @@ class PriceAlert(Base):
     is_read = Column(Boolean, default=False, nullable=False)
     is_sent = Column(Boolean, default=False)
     sent_at = Column(DateTime)
+    send_error = Column(String(200))  # Kalıcı Telegram hatası (400 / 403) - is_sent=True, sent_at boş
     priority = Column(String(20), default='medium')  # 'low', 'medium', 'high', 'urgent'
     created_at = Column(DateTime, default=datetime.utcnow, nullable=False, index=True)
     
@@ -423,34 +439,639 @@ class Notification(Base):
     def __repr__(self):
         return f'<Notification {self.title} for User:{self.user_id}>'
 
+
+class RouteRefreshState(Base):
+    """
+    Adaptif scrape planlayıcı durumu - (route, kalkış günü) başına
+    Cron run'ları arasında saklanır (scheduler.RefreshScheduler)
+    """
+    __tablename__ = 'route_refresh_states'
+    __table_args__ = (
+        UniqueConstraint('route_id', 'departure_date', name='uq_route_refresh_state'),
+    )
+
+    id = Column(Integer, primary_key=True)
+    route_id = Column(Integer, ForeignKey('routes.id', ondelete='CASCADE'), nullable=False)
+    departure_date = Column(Date, nullable=False, index=True)
+
+    # Değişim sıklığı (EWMA, 0-1: scrape'lerin ne kadarında değişiklik bulundu)
+    volatility = Column(Numeric(5, 4), nullable=False, default=1)
+    interval_hours = Column(Numeric(6, 2), nullable=False, default=1)
+
+    # Counters
+    scrape_count = Column(Integer, nullable=False, default=0)
+    change_count = Column(Integer, nullable=False, default=0)
+
+    last_scraped_at = Column(DateTime)
+    last_changed_at = Column(DateTime)
+    updated_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+    def __repr__(self):
+        return f'<RouteRefreshState {self.route_id} {self.departure_date} every {self.interval_hours}h>'
+
+
+class RouteSyncFingerprint(Base):
+    """
+    Son sync edilen seferlerin parmak izi - (route, kalkış günü) başına
+    Scrape edilen (id, fiyat, koltuk) aynıysa sync atlanır (fingerprint.FingerprintStore)
+    """
+    __tablename__ = 'route_sync_fingerprints'
+
+    route_id = Column(Integer, ForeignKey('routes.id', ondelete='CASCADE'), primary_key=True)
+    departure_date = Column(Date, primary_key=True)
+    fingerprint = Column(String(32), nullable=False)
+    journey_count = Column(Integer, nullable=False, default=0)
+    synced_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+    def __repr__(self):
+        return f'<RouteSyncFingerprint {self.route_id} {self.departure_date} {self.fingerprint}>'
+
+
+class ScrapeWorkUnit(Base):
+    """
+    Kalıcı iş kuyruğu: scrape iş birimi (route, kalkış günü) - work_queue.WorkQueue
+    status: pending → claimed → done / failed / deferred (run deadline'ı)
+    run_key: birimi son kuyruğa alan run slot'u - aynı slot'ta yeniden başlayan run 'done' olanları atlar,
+    sonraki run bitmemiş (pending / claimed / failed / deferred) birimleri önce alır
+    """
+    __tablename__ = 'scrape_work_units'
+
+    route_id = Column(Integer, ForeignKey('routes.id', ondelete='CASCADE'), primary_key=True)
+    departure_date = Column(Date, primary_key=True)
+    run_key = Column(String(30), index=True)
+    status = Column(String(20), nullable=False, default='pending', index=True)
+    attempt = Column(Integer, nullable=False, default=0)  # Art arda bitmeyen claim sayısı ('done' olunca sıfırlanır)
+    reason = Column(String(50))  # Erteleme sebebi
+    last_error = Column(String(200))
+    fingerprint = Column(String(32))  # Son başarılı sync'in parmak izi
+    claimed_by = Column(String(100))
+    claimed_at = Column(DateTime)
+    updated_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+    def __repr__(self):
+        return f'<ScrapeWorkUnit {self.route_id} {self.departure_date} {self.status}>'
+
+
+class ScrapeRunLock(Base):
+    """
+    Lease lock - aynı isimle aynı anda tek sahip (run_lock.LeaseLock)
+    Sahibi heartbeat ile expires_at'i uzatır; süresi dolan lock (çöken run) devralınabilir
+    """
+    __tablename__ = 'scrape_run_locks'
+
+    name = Column(String(100), primary_key=True)
+    owner = Column(String(100), nullable=False)
+    acquired_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    expires_at = Column(DateTime, nullable=False)
+
+    def __repr__(self):
+        return f'<ScrapeRunLock {self.name} by {self.owner} until {self.expires_at}>'
+
+
+class ScrapeShardRun(Base):
+    """
+    Sharding modunda bir run'daki shard (sharding.ShardCoordinator)
+    members: join penceresinde kayıt olan shard'lar (JSON) - route dağılımı bunlara göre
+    summary: shard bitince run özeti (JSON) - son biten shard birleşik raporu gönderir
+    """
+    __tablename__ = 'scrape_shard_runs'
+
+    run_key = Column(String(30), primary_key=True)  # UTC run slot, ör. '2026-10-18T02:00'
+    shard_index = Column(Integer, primary_key=True)
+    owner = Column(String(100), nullable=False)
+    members = Column(Text)
+    started_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    finished_at = Column(DateTime)
+    reported_at = Column(DateTime)
+    summary = Column(Text)
+
+    def __repr__(self):
+        return f'<ScrapeShardRun {self.run_key} #{self.shard_index} by {self.owner}>'
+
 # models_standalone.py dosyasının EN SONUNA ekle:
 
 # ============================================
 # DATABASE UTILITIES
 # ============================================
 
-def get_db_engine():
-    """Database engine oluştur"""
-    import os
+# Havuz ayarları - basic-xxs (512MB RAM) instance + managed Postgres
+# bağlantı limitine göre küçük tutuldu, env üzerinden değiştirilebilir
+DB_POOL_SIZE = int(os.getenv('DB_POOL_SIZE', '5'))
+DB_MAX_OVERFLOW = int(os.getenv('DB_MAX_OVERFLOW', '5'))
+DB_POOL_TIMEOUT = int(os.getenv('DB_POOL_TIMEOUT', '30'))
+DB_POOL_RECYCLE = int(os.getenv('DB_POOL_RECYCLE', '1800'))
+
+# Process genelinde tek engine / session factory
+_engine = None
+_session_factory = None
+_engine_lock = threading.Lock()
+
+
+class PoolStats:
+    """Connection pool sayaçları (thread-safe)"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        self.engines_created = 0
+        self.connects = 0
+        self.checkouts = 0
+        self.checkins = 0
+        self.wait_time_total = 0.0
+        self.wait_time_max = 0.0
+
+    def record(self, counter):
+        with self.lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def record_wait(self, seconds):
+        with self.lock:
+            self.wait_time_total += seconds
+            self.wait_time_max = max(self.wait_time_max, seconds)
+
+    def as_dict(self):
+        with self.lock:
+            return {
+                'engines_created': self.engines_created,
+                'connects': self.connects,
+                'checkouts': self.checkouts,
+                'checkins': self.checkins,
+                'wait_time_total': round(self.wait_time_total, 3),
+                'wait_time_max': round(self.wait_time_max, 3),
+            }
+
+
+pool_stats = PoolStats()
+
+
+class InstrumentedQueuePool(QueuePool):
+    """Checkout bekleme süresini ölçen QueuePool"""
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            pool_stats.record_wait(time.perf_counter() - start)
+
+
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv('SQLITE_BUSY_TIMEOUT_MS', '30000'))
+# Aynı SQLite dosyasına yazan birden fazla process (lokal shard testi): transaction'lar BEGIN IMMEDIATE
+# ile başlar - okumadan yazmaya geçişte anında 'database is locked' yerine busy_timeout kadar beklenir
+SQLITE_BEGIN_IMMEDIATE = os.getenv('SQLITE_BEGIN_IMMEDIATE', '0') == '1'
+
+
+def _configure_sqlite_connection(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    cursor.execute('PRAGMA journal_mode=WAL')
+    cursor.execute(f'PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT_MS}')
+    cursor.close()
+    if SQLITE_BEGIN_IMMEDIATE:
+        dbapi_connection.isolation_level = None  # BEGIN'i pysqlite değil _begin_sqlite_immediate atar
+
+
+def _begin_sqlite_immediate(conn):
+    conn.exec_driver_sql('BEGIN IMMEDIATE')
+
+
+def _create_engine():
     DATABASE_URL = os.getenv('DATABASE_URL')
     if not DATABASE_URL:
         raise ValueError("DATABASE_URL environment variable is not set!")
-    
-    from sqlalchemy import create_engine
-    return create_engine(
-        DATABASE_URL,
-        pool_size=20,
-        max_overflow=30,
-        pool_pre_ping=True,
-        echo=False
-    )
+
+    if DATABASE_URL.startswith('sqlite'):
+        # SQLite (lokal test) - pool ayarları uygulanmaz
+        engine = create_engine(DATABASE_URL, echo=False)
+        # Birden fazla process (lokal shard testi): WAL + lock'ta bekleme
+        event.listen(engine, 'connect', _configure_sqlite_connection)
+        if SQLITE_BEGIN_IMMEDIATE:
+            event.listen(engine, 'begin', _begin_sqlite_immediate)
+    else:
+        engine = create_engine(
+            DATABASE_URL,
+            poolclass=InstrumentedQueuePool,
+            pool_size=DB_POOL_SIZE,
+            max_overflow=DB_MAX_OVERFLOW,
+            pool_timeout=DB_POOL_TIMEOUT,
+            pool_recycle=DB_POOL_RECYCLE,
+            pool_pre_ping=True,
+            echo=False
+        )
+
+    event.listen(engine, 'connect', lambda *args: pool_stats.record('connects'))
+    event.listen(engine, 'checkout', lambda *args: pool_stats.record('checkouts'))
+    event.listen(engine, 'checkin', lambda *args: pool_stats.record('checkins'))
+    pool_stats.record('engines_created')
+    return engine
+
+
+def get_db_engine():
+    """Paylaşılan database engine'i döndür (ilk çağrıda oluşturulur)"""
+    global _engine
+    if _engine is None:
+        with _engine_lock:
+            if _engine is None:
+                _engine = _create_engine()
+    return _engine
+
+
+def _get_session_factory():
+    global _session_factory
+    if _session_factory is None:
+        engine = get_db_engine()
+        with _engine_lock:
+            if _session_factory is None:
+                _session_factory = sessionmaker(bind=engine)
+    return _session_factory
+
 
 def get_session():
-    """Database session oluştur"""
-    from sqlalchemy.orm import sessionmaker
-    engine = get_db_engine()
-    Session = sessionmaker(bind=engine)
-    return Session()
+    """Database session oluştur (paylaşılan engine üzerinden)"""
+    return _get_session_factory()()
+
+
+def get_pool_stats():
+    """Connection pool istatistikleri"""
+    stats = pool_stats.as_dict()
+    if _engine is not None and hasattr(_engine.pool, 'checkedout'):
+        stats['checked_out'] = _engine.pool.checkedout()
+    return stats
+
+
+def dispose_db_engine():
+    """Engine'i ve tüm bağlantıları kapat (process kapanırken)"""
+    global _engine, _session_factory
+    with _engine_lock:
+        if _engine is not None:
+            _engine.dispose()
+        _engine = None
+        _session_factory = None
+
+
+# ============================================
+# WORKER SCHEMA MIGRATION
+# ============================================
+# Worker'ın sonradan eklediği tablo / kolon / index'ler runtime'da değil açık migration ile gelir
+# (python main.py --migrate, models.py migration'ı çalışmış DB'lerde no-op).
+# Run başında sadece okunur kontrol yapılır (get_missing_worker_schema).
+
+# scrape_work_units'a ilk sürümden (sadece deferred kayıtları tutan tablo) sonra eklenen kuyruk kolonları
+WORK_UNIT_COLUMNS = (
+    ('run_key', 'VARCHAR(30)'),
+    ('attempt', 'INTEGER NOT NULL DEFAULT 0'),
+    ('last_error', 'VARCHAR(200)'),
+    ('fingerprint', 'VARCHAR(32)'),
+    ('claimed_by', 'VARCHAR(100)'),
+    ('claimed_at', 'TIMESTAMP'),
+)
+
+# Sadece worker'ın kullandığı, kolonu sonradan değişmeyen tablolar - yoksa --migrate oluşturur
+WORKER_TABLES = (RouteRefreshState, RouteSyncFingerprint, ScrapeRunLock, ScrapeShardRun)
+
+
+def get_missing_worker_schema(engine=None):
+    """Migration bekleyen tablo / kolonlar (boş liste = şema hazır) - DDL çalıştırmaz"""
+    from sqlalchemy import inspect
+    engine = engine or get_db_engine()
+    inspector = inspect(engine)
+    
+    columns = {c['name'] for c in inspector.get_columns(PriceHistory.__tablename__)}
+    missing = [f"{PriceHistory.__tablename__}.{name}" for name in ('departure_time',) if name not in columns]
+    
+    columns = {c['name'] for c in inspector.get_columns(PriceAlert.__tablename__)}
+    missing.extend(f"{PriceAlert.__tablename__}.{name}" for name in ('send_error',) if name not in columns)
+    
+    work_units = ScrapeWorkUnit.__tablename__
+    if not inspector.has_table(work_units):
+        missing.append(work_units)
+    else:
+        columns = {c['name'] for c in inspector.get_columns(work_units)}
+        missing.extend(f"{work_units}.{name}" for name, _ in WORK_UNIT_COLUMNS if name not in columns)
+    
+    missing.extend(model.__tablename__ for model in WORKER_TABLES if not inspector.has_table(model.__tablename__))
+    return missing
+
+
+def migrate_worker_schema(engine=None):
+    """
+    price_history.departure_time (delta kayıt seri anahtarı) + seri index'i,
+    price_alerts.send_error (kalıcı Telegram hatası - eklenirken eski alert'ler gönderilmiş işaretlenir),
+    scrape_work_units tablosu + kuyruk kolonları, WORKER_TABLES (idempotent)
+    Partition'lı tabloda parent'a eklenir, partition'lara PostgreSQL yayar
+    """
+    from sqlalchemy import inspect, or_, text, update
+    engine = engine or get_db_engine()
+    table = PriceHistory.__tablename__
+    work_units = ScrapeWorkUnit.__tablename__
+    
+    applied = []
+    inspector = inspect(engine)
+    columns = {c['name'] for c in inspector.get_columns(table)}
+    indexes = {i['name'] for i in inspector.get_indexes(table)}
+    alert_columns = {c['name'] for c in inspector.get_columns(PriceAlert.__tablename__)}
+    has_work_units = inspector.has_table(work_units)
+    work_unit_columns = {c['name'] for c in inspector.get_columns(work_units)} if has_work_units else set()
+    missing_tables = [model for model in WORKER_TABLES if not inspector.has_table(model.__tablename__)]
+    with engine.begin() as conn:
+        if 'departure_time' not in columns:
+            conn.execute(text(f"ALTER TABLE {table} ADD COLUMN departure_time TIMESTAMP"))
+            applied.append(f"{table}.departure_time")
+        if 'ix_price_history_series' not in indexes:
+            conn.execute(text(
+                f"CREATE INDEX IF NOT EXISTS ix_price_history_series ON {table} (route_id, departure_date, departure_time)"
+            ))
+            applied.append('ix_price_history_series')
+        if 'send_error' not in alert_columns:
+            conn.execute(text(f"ALTER TABLE {PriceAlert.__tablename__} ADD COLUMN send_error VARCHAR(200)"))
+            applied.append(f"{PriceAlert.__tablename__}.send_error")
+            # Outbox'a geçiş: eski worker alert'leri yazarken senkron gönderiyordu ve is_sent'i hiç
+            # işaretlemiyordu - dispatcher bunları tekrar göndermesin
+            alerts = PriceAlert.__table__
+            delivered = conn.execute(
+                update(alerts)
+                .where(or_(alerts.c.is_sent == False, alerts.c.is_sent.is_(None)))
+                .values(is_sent=True, sent_at=alerts.c.created_at)
+            ).rowcount
+            if delivered:
+                print(f"📨 {delivered} alerts sent by the previous worker marked as sent")
+        
+        if not has_work_units:
+            ScrapeWorkUnit.__table__.create(conn)
+            applied.append(work_units)
+        else:
+            for name, ddl in WORK_UNIT_COLUMNS:
+                if name not in work_unit_columns:
+                    conn.execute(text(f"ALTER TABLE {work_units} ADD COLUMN {name} {ddl}"))
+                    applied.append(f"{work_units}.{name}")
+            work_unit_indexes = {i['name'] for i in inspector.get_indexes(work_units)}
+            for index in ScrapeWorkUnit.__table__.indexes:
+                if index.name not in work_unit_indexes:
+                    index.create(conn)
+                    applied.append(index.name)
+        
+        for model in missing_tables:
+            model.__table__.create(conn)
+            applied.append(model.__tablename__)
+    
+    print(f"✅ Worker schema migrated: {', '.join(applied)}" if applied else "✅ Worker schema up to date")
+    return applied
+
+
+def expand_price_history(points, start=None, end=None, step=timedelta(hours=1)):
+    """
+    Change-only (delta) kayıtları düzenli seriye aç - son bilinen değer ileri taşınır
+    points: tek bir seriye ait PriceHistory satırları
+    Dönen liste: (zaman, PriceHistory) - zaman step aralıklı
+    """
+    points = sorted(points, key=lambda p: p.recorded_at)
+    if not points:
+        return []
+    
+    # Saat başına hizala
+    current = (start or points[0].recorded_at).replace(minute=0, second=0, microsecond=0)
+    end = end or datetime.utcnow()
+    departure_time = points[0].departure_time
+    if departure_time and departure_time < end:
+        end = departure_time  # Kalkıştan sonra veri yok
+    
+    series = []
+    index = -1
+    while current <= end:
+        while index + 1 < len(points) and points[index + 1].recorded_at < current + step:
+            index += 1
+        if index >= 0:
+            series.append((current, points[index]))
+        current += step
+    return series
+
+
+def get_hourly_price_series(session, route_id, departure_date, start=None, end=None):
+    """
+    Bir route + kalkış günü için tüm serileri saatlik olarak döndür
+    {(route_id, partner_id, firma, kalkış): [(saat, PriceHistory), ...]}
+    """
+    rows = session.query(PriceHistory).filter(
+        PriceHistory.route_id == route_id,
+        PriceHistory.departure_date == departure_date
+    ).order_by(PriceHistory.recorded_at).all()
+    
+    by_series = {}
+    for row in rows:
+        by_series.setdefault(row.series_key(), []).append(row)
+    
+    return {
+        key: expand_price_history(points, start=start, end=end)
+        for key, points in by_series.items()
+    }
+
+
+
+# ============================================
+# PRICE HISTORY PARTITIONING (PostgreSQL)
+# ============================================
+# price_history recorded_at üzerinden RANGE partition'lı olabilir (aylık / günlük).
+# Retention satır silmek yerine eski partition'ları DROP eder,
+# recorded_at filtreli sorgular partition pruning'den faydalanır.
+
+PRICE_HISTORY_PARTITION = os.getenv('PRICE_HISTORY_PARTITION', 'month')  # 'month' | 'day'
+PRICE_HISTORY_PARTITIONS_AHEAD = int(os.getenv('PRICE_HISTORY_PARTITIONS_AHEAD', '2'))
+
+_PARTITION_BOUND_RE = re.compile(r"FROM \('([^']+)'\) TO \('([^']+)'\)")
+
+
+def partition_range(moment, interval=PRICE_HISTORY_PARTITION):
+    """moment'i içeren partition aralığı: (başlangıç, bitiş, tablo adı)"""
+    if interval == 'day':
+        start = datetime(moment.year, moment.month, moment.day)
+        end = start + timedelta(days=1)
+        suffix = start.strftime('%Y%m%d')
+    elif interval == 'month':
+        start = datetime(moment.year, moment.month, 1)
+        end = datetime(start.year + start.month // 12, start.month % 12 + 1, 1)
+        suffix = start.strftime('%Y%m')
+    else:
+        raise ValueError(f"Unknown partition interval: {interval}")
+    return start, end, f"{PriceHistory.__tablename__}_p{suffix}"
+
+
+def is_price_history_partitioned(engine=None):
+    """price_history partition'lı (PostgreSQL declarative partitioning) mı?"""
+    from sqlalchemy import text
+    engine = engine or get_db_engine()
+    if engine.dialect.name != 'postgresql':
+        return False
+
+    with engine.connect() as conn:
+        return conn.execute(text(
+            "SELECT EXISTS (SELECT 1 FROM pg_partitioned_table pt "
+            "JOIN pg_class c ON c.oid = pt.partrelid "
+            "WHERE c.relname = :table AND c.relnamespace = to_regnamespace(current_schema()))"
+        ), {'table': PriceHistory.__tablename__}).scalar()
+
+
+def get_price_history_partitions(conn):
+    """Mevcut partition'lar: [(tablo adı, başlangıç, bitiş)] - başlangıca göre sıralı"""
+    from sqlalchemy import text
+    rows = conn.execute(text(
+        "SELECT c.relname, pg_get_expr(c.relpartbound, c.oid) "
+        "FROM pg_inherits i "
+        "JOIN pg_class c ON c.oid = i.inhrelid "
+        "JOIN pg_class p ON p.oid = i.inhparent "
+        "WHERE p.relname = :table AND p.relnamespace = to_regnamespace(current_schema())"
+    ), {'table': PriceHistory.__tablename__}).all()
+
+    partitions = []
+    for name, bound in rows:
+        match = _PARTITION_BOUND_RE.search(bound or '')
+        if match:  # DEFAULT partition atlanır
+            partitions.append((name, datetime.fromisoformat(match.group(1)), datetime.fromisoformat(match.group(2))))
+    return sorted(partitions, key=lambda p: p[1])
+
+
+def ensure_price_history_partitions(engine=None, start=None, ahead=PRICE_HISTORY_PARTITIONS_AHEAD,
+                                    interval=PRICE_HISTORY_PARTITION):
+    """
+    start'tan (default: şimdi) itibaren ahead aralık sonrasına kadar partition'ları oluştur
+    Var olan partition'larla çakışan aralıklar atlanır (idempotent)
+    """
+    from sqlalchemy import text
+    engine = engine or get_db_engine()
+    now = datetime.utcnow()
+    current = start or now
+
+    # Şimdiki aralık + ahead kadar ileri
+    _, last_end, _ = partition_range(now, interval)
+    for _ in range(ahead):
+        _, last_end, _ = partition_range(last_end, interval)
+
+    created = []
+    with engine.begin() as conn:
+        existing = get_price_history_partitions(conn)
+        while current < last_end:
+            part_start, part_end, name = partition_range(current, interval)
+            overlaps = any(s < part_end and part_start < e for _, s, e in existing)
+            if not overlaps:
+                conn.execute(text(
+                    f"CREATE TABLE IF NOT EXISTS {name} PARTITION OF {PriceHistory.__tablename__} "
+                    f"FOR VALUES FROM ('{part_start.isoformat()}') TO ('{part_end.isoformat()}')"
+                ))
+                existing.append((name, part_start, part_end))
+                created.append(name)
+            current = part_end
+
+    if created:
+        print(f"✅ price_history partitions created: {', '.join(created)}")
+    return created
+
+
+def drop_expired_price_history_partitions(cutoff, engine=None):
+    """
+    Tamamen cutoff'tan eski (bitişi <= cutoff) partition'ları DROP et
+    Satır satır DELETE yerine O(1) retention - sınırdaki partition süresi dolunca düşer
+    """
+    from sqlalchemy import text
+    engine = engine or get_db_engine()
+
+    dropped = []
+    with engine.begin() as conn:
+        for name, _, part_end in get_price_history_partitions(conn):
+            if part_end <= cutoff:
+                conn.execute(text(f"DROP TABLE IF EXISTS {name}"))
+                dropped.append(name)
+    return dropped
+
+
+def migrate_price_history_to_partitioned(engine=None, interval=PRICE_HISTORY_PARTITION, drop_legacy=False):
+    """
+    Mevcut price_history tablosunu partition'lı tabloya taşı (PostgreSQL, idempotent)
+    1. Eski tablo price_history_legacy olarak yeniden adlandırılır, aynı kolonlarla
+       recorded_at üzerinden RANGE partition'lı price_history oluşturulur
+       (PK: (id, recorded_at) - partition key PK'de olmak zorunda)
+    2. Eski veriyi kapsayan partition'lar oluşturulur
+    3. Veri partition partition kopyalanır (her aralık ayrı transaction)
+    Worker'lar 1. adımdan itibaren yeni tabloya yazar, kopyalama sırasında durdurulmaları gerekmez.
+    """
+    from sqlalchemy import text
+    engine = engine or get_db_engine()
+    table = PriceHistory.__tablename__
+    legacy = f"{table}_legacy"
+
+    if engine.dialect.name != 'postgresql':
+        raise ValueError("price_history partitioning requires PostgreSQL")
+
+    # Yeni tablo eski tablonun kolonlarıyla (LIKE) oluşur - worker kolonları önce
+    migrate_worker_schema(engine)
+
+    if not is_price_history_partitioned(engine):
+        with engine.begin() as conn:
+            sequence = conn.execute(text("SELECT pg_get_serial_sequence(:table, 'id')"), {'table': table}).scalar()
+
+            conn.execute(text(f"ALTER TABLE {table} RENAME TO {legacy}"))
+            # Index / PK isimleri yeni tabloda kullanılacak
+            for (index_name,) in conn.execute(text(
+                    "SELECT indexname FROM pg_indexes WHERE tablename = :legacy AND schemaname = current_schema()"
+            ), {'legacy': legacy}).all():
+                if table in index_name:
+                    conn.execute(text(f"ALTER INDEX {index_name} RENAME TO {index_name.replace(table, legacy, 1)}"))
+
+            conn.execute(text(
+                f"CREATE TABLE {table} (LIKE {legacy} INCLUDING DEFAULTS) PARTITION BY RANGE (recorded_at)"
+            ))
+            conn.execute(text(f"ALTER TABLE {table} ADD PRIMARY KEY (id, recorded_at)"))
+            conn.execute(text(
+                f"ALTER TABLE {table} ADD FOREIGN KEY (route_id) REFERENCES routes (id) ON DELETE CASCADE"
+            ))
+            conn.execute(text(f"CREATE INDEX ix_{table}_departure_date ON {table} (departure_date)"))
+            conn.execute(text(f"CREATE INDEX ix_{table}_recorded_at ON {table} (recorded_at)"))
+            conn.execute(text(f"CREATE INDEX ix_{table}_route_departure ON {table} (route_id, departure_date)"))
+
+            # id sequence'i legacy tablo düşürülünce silinmesin
+            if sequence:
+                conn.execute(text(f"ALTER SEQUENCE {sequence} OWNED BY {table}.id"))
+        print(f"✅ {table} is now partitioned by recorded_at ({interval}), old table: {legacy}")
+        migrate_worker_schema(engine)  # Seri index'i partition'lı tabloda
+
+    with engine.connect() as conn:
+        legacy_exists = conn.execute(text("SELECT to_regclass(:legacy) IS NOT NULL"), {'legacy': legacy}).scalar()
+        if not legacy_exists:
+            ensure_price_history_partitions(engine, interval=interval)
+            return 0
+        oldest, newest = conn.execute(text(f"SELECT min(recorded_at), max(recorded_at) FROM {legacy}")).one()
+
+    ensure_price_history_partitions(engine, start=oldest, interval=interval)
+
+    # Partition aralıkları üzerinden kopyala - uzun tek transaction yok
+    # Daha önce kopyalanmış satırlar atlanır (yarıda kalan migration tekrar çalıştırılabilir)
+    # Kolonlar isimle (ALTER ile eklenen kolon iki tabloda farklı sırada olabilir)
+    copied = 0
+    if oldest is not None:
+        with engine.connect() as conn:
+            partitions = get_price_history_partitions(conn)
+            columns = [row[0] for row in conn.execute(text(
+                "SELECT column_name FROM information_schema.columns "
+                "WHERE table_name = :table AND table_schema = current_schema() ORDER BY ordinal_position"
+            ), {'table': table}).all()]
+        for name, part_start, part_end in partitions:
+            if part_end <= oldest or part_start > newest:
+                continue
+            with engine.begin() as conn:
+                result = conn.execute(text(
+                    f"INSERT INTO {table} ({', '.join(columns)}) SELECT {', '.join(f'l.{c}' for c in columns)} FROM {legacy} l "
+                    f"WHERE l.recorded_at >= :start AND l.recorded_at < :end "
+                    f"AND NOT EXISTS (SELECT 1 FROM {table} t WHERE t.id = l.id AND t.recorded_at = l.recorded_at)"
+                ), {'start': part_start, 'end': part_end})
+                copied += result.rowcount
+            print(f"   {name}: {result.rowcount} rows copied")
+
+    if drop_legacy:
+        with engine.begin() as conn:
+            conn.execute(text(f"DROP TABLE {legacy}"))
+        print(f"🗑️  {legacy} dropped")
+    else:
+        print(f"ℹ️  {legacy} kept - verify and drop it manually (or run with drop_legacy=True)")
+    return copied
 
 def init_db():
     """Tüm tabloları oluştur (ilk kurulumda)"""
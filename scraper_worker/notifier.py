@@ -0,0 +1,515 @@
+"""
+SeferTakip - Telegram Notification Dispatcher
+price_alerts tablosu outbox olarak kullanılır: alert'ler is_sent=False ile yazılır,
+arka plandaki worker'lar gönderip is_sent / sent_at işaretler.
+Kalıcı hatalar (400 / 403 - chat yok, bot engellendi) send_error ile outbox'tan çıkar;
+sadece 429 / 5xx / bağlantı hataları sonraki run'larda tekrar denenir.
+
+- Scrape / sync akışı Telegram'ı beklemez
+- Telegram limitleri: global (~30 mesaj/s) ve chat başına (~1 mesaj/s) token bucket
+- 429 cevabında retry_after kadar o chat beklenir, mesaj tekrar kuyruğa girer
+
+digest=True: run boyunca gönderim yapılmaz, run sonunda kullanıcı (chat) başına tüm
+alert'ler tek özet mesajda toplanır (4096 karakterde bölünür).
+"""
+
+from datetime import datetime, timedelta
+from queue import Empty, PriorityQueue
+from threading import Event, Lock, Thread
+import html
+import itertools
+import logging
+import time
+
+from sqlalchemy import bindparam, select, update
+
+from models_standalone import PriceAlert, User, get_db_engine
+from http_client import get_http_client
+
+logger = logging.getLogger(__name__)
+
+TELEGRAM_API_URL = 'https://api.telegram.org'
+TELEGRAM_MESSAGE_LIMIT = 4096
+
+
+class TokenBucket:
+    """rate token/s, en fazla capacity birikir (thread-safe)"""
+
+    def __init__(self, rate, capacity=1):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+        self.lock = Lock()
+
+    def reserve(self):
+        """Token varsa al ve 0 döndür, yoksa kaç saniye sonra olacağını döndür"""
+        with self.lock:
+            now = time.monotonic()
+            if now < self.blocked_until:
+                return self.blocked_until - now
+
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return 0.0
+            return (1 - self.tokens) / self.rate
+
+    def acquire(self):
+        """Token alınana kadar bekle"""
+        while True:
+            wait = self.reserve()
+            if wait <= 0:
+                return
+            time.sleep(wait)
+
+    def pause(self, seconds):
+        """429 retry_after - seconds boyunca token verme"""
+        with self.lock:
+            self.blocked_until = max(self.blocked_until, time.monotonic() + seconds)
+            self.tokens = 0
+
+
+def format_price(value):
+    return f"{float(value):.2f}" if value is not None else 'N/A'
+
+
+def format_alert_message(alert):
+    """PriceAlert satırından Telegram (HTML) mesajı"""
+    route_name = html.escape(alert.route_info or f"Route {alert.route_id}", quote=False)
+    company = html.escape(alert.competitor_name or '', quote=False)
+    departure_date = alert.departure_date.strftime('%d.%m.%Y') if alert.departure_date else 'N/A'
+
+    if alert.alert_type == 'new_journey':
+        lowest_badge = "\n🏆 <b>EN DÜŞÜK FİYAT!</b>" if alert.priority == 'high' else ""
+        return f"""
+🆕 <b>Yeni Sefer Eklendi!</b>
+
+🚌 <b>Firma:</b> {company}
+🛣 <b>Güzergah:</b> {route_name}
+📅 <b>Tarih:</b> {departure_date}
+ℹ️ {html.escape(alert.message, quote=False)}
+💰 <b>Fiyat:</b> {format_price(alert.new_price)} TRY{lowest_badge}
+""".strip()
+
+    if alert.alert_type in ('price_drop', 'price_increase'):
+        emoji, title = ("📉", "Fiyat Düştü!") if alert.alert_type == 'price_drop' else ("📈", "Fiyat Arttı!")
+        change_pct = float(alert.price_change_percentage or 0)
+        return f"""
+{emoji} <b>{title}</b>
+
+🚌 <b>Firma:</b> {company}
+🛣 <b>Güzergah:</b> {route_name}
+📅 <b>Tarih:</b> {departure_date}
+ℹ️ {html.escape(alert.message, quote=False)}
+
+💰 <b>Eski Fiyat:</b> {format_price(alert.old_price)} TRY
+💰 <b>Yeni Fiyat:</b> {format_price(alert.new_price)} TRY
+📊 <b>Değişim:</b> {change_pct:+.1f}%
+""".strip()
+
+    return f"🔔 <b>{html.escape(alert.title, quote=False)}</b>\n\n{html.escape(alert.message, quote=False)}"
+
+
+def format_digest_line(alert):
+    """Özet mesajında tek alert satırı"""
+    if alert.alert_type == 'price_drop':
+        emoji = "📉"
+    elif alert.alert_type == 'price_increase':
+        emoji = "📈"
+    elif alert.alert_type == 'new_journey':
+        emoji = "🏆" if alert.priority == 'high' else "🆕"
+    else:
+        emoji = "🔔"
+    return f"{emoji} {html.escape(alert.message, quote=False)}"
+
+
+def build_digest_messages(alerts, limit=TELEGRAM_MESSAGE_LIMIT):
+    """
+    Bir kullanıcının alert'lerini route / tarih başlıklarıyla özet mesajlara böl
+    Döner: [(mesaj, [alert_id, ...])] - her mesaj limit karakteri geçmez
+    """
+    header = f"📊 <b>Fiyat Özeti</b> - {datetime.now().strftime('%d.%m.%Y %H:%M')}"
+    continued = "📊 <b>Fiyat Özeti</b> (devam)"
+
+    groups = {}
+    for alert in sorted(alerts, key=lambda a: (a.route_info or '', a.departure_date or datetime.min.date(), a.id)):
+        groups.setdefault((alert.route_info or f"Route {alert.route_id}", alert.departure_date), []).append(alert)
+
+    messages = []
+    lines, ids, size = [header], [], len(header)
+
+    def flush():
+        nonlocal lines, ids, size
+        if ids:
+            messages.append(('\n'.join(lines), ids))
+        lines, ids, size = [continued], [], len(continued)
+
+    for (route_name, departure_date), group in groups.items():
+        group_header = f"\n🛣 <b>{html.escape(route_name, quote=False)}</b>" + (
+            f" ({departure_date.strftime('%d.%m.%Y')})" if departure_date else ""
+        )
+        header_pending = True
+        for alert in group:
+            line = format_digest_line(alert)
+            needed = len(line) + 1 + ((len(group_header) + 1) if header_pending else 0)
+            if size + needed > limit:
+                flush()
+                header_pending = True
+                needed = len(line) + 1 + len(group_header) + 1
+            if header_pending:
+                lines.append(group_header)
+                header_pending = False
+            lines.append(line)
+            ids.append(alert.id)
+            size += needed
+
+    flush()
+    return messages
+
+
+class TelegramDispatcher:
+    """
+    Outbox (price_alerts.is_sent=False) → Telegram
+    Poller thread'i yeni alert'leri çeker, worker thread'leri rate limit'e uyarak gönderir,
+    gönderilenler toplu olarak is_sent=True / sent_at ile işaretlenir.
+    """
+
+    def __init__(self, bot_token, workers=4, global_rate=25, per_chat_rate=1, poll_interval=2.0,
+                 batch_size=500, max_attempts=5, max_age_hours=24, connect_timeout=5, read_timeout=10,
+                 digest=False):
+        self.bot_token = bot_token
+        self.digest = digest
+        self.num_workers = max(1, workers)
+        self.poll_interval = poll_interval
+        self.batch_size = batch_size
+        self.max_attempts = max_attempts
+        self.max_age = timedelta(hours=max_age_hours)
+        self.timeout = (connect_timeout, read_timeout)
+
+        self.global_bucket = TokenBucket(global_rate, capacity=global_rate)
+        self.per_chat_rate = per_chat_rate
+        self.chat_buckets = {}  # chat_id -> TokenBucket
+
+        # (ready_at, seq, message) - ready_at'ten önce gönderilmez
+        self.queue = PriorityQueue()
+        self.sequence = itertools.count()
+        self.pending = 0  # Kuyrukta / gönderimde olan mesaj sayısı
+        self.inflight = set()  # Kuyrukta / gönderimde / işaretlenmeyi bekleyen alert id'leri
+        self.sending = {}  # id(message) -> message - şu an bir worker'da gönderilen mesajlar
+        self.sent_marks = []  # (alert_id, sent_at, send_error) - DB'de işaretlenecek
+
+        self.lock = Lock()
+        self.poll_lock = Lock()
+        self.wakeup = Event()
+        self.stopping = Event()
+        self.threads = []
+
+        # Statistics
+        self.sent = 0  # Mesaj
+        self.alerts_sent = 0  # Mesajların kapsadığı alert
+        self.failed = 0
+        self.rejected = 0  # failed'in kalıcı hata (400 / 403) olanları - tekrar denenmez
+        self.rate_limited = 0
+
+    # ---------- lifecycle ----------
+
+    def start(self):
+        if self.threads:
+            return self
+        # Her start'ın kendi stop event'i - drain'de join'e yetişmeyen eski worker yeni run'da çalışmaya devam etmez
+        self.stopping = Event()
+        if not self.digest:  # Digest modunda gönderim drain'de
+            self.threads.append(Thread(target=self._poll_loop, args=(self.stopping,), name='telegram-poller', daemon=True))
+        for i in range(self.num_workers):
+            self.threads.append(Thread(target=self._worker_loop, args=(self.stopping,),
+                                       name=f"telegram-worker-{i}", daemon=True))
+        for thread in self.threads:
+            thread.start()
+        return self
+
+    def notify(self):
+        """Yeni alert commit edildi - poller'ı beklemeden uyandır"""
+        self.wakeup.set()
+
+    def drain(self, timeout=120, join_timeout=5):
+        """Outbox'ta kalanları gönder (timeout'a kadar) ve thread'leri durdur (thread başına join_timeout)"""
+        deadline = time.monotonic() + timeout
+        if self.digest:
+            self.poll_digests()
+        else:
+            self.poll()
+        while time.monotonic() < deadline:
+            with self.lock:
+                if self.pending == 0:
+                    break
+            time.sleep(0.1)
+
+        self.stopping.set()
+        self.wakeup.set()
+        for thread in self.threads:
+            thread.join(timeout=join_timeout)
+        stragglers = [thread for thread in self.threads if thread.is_alive()]
+        self.threads = []
+
+        # Kuyruktakiler bırakılır (DB'de is_sent=False kalır - sonraki start'ta baştan poll edilir);
+        # join'e yetişmeyen worker'ın elindeki mesaj pending / inflight'ta kalır, sonucu geç gelen
+        # sent_marks'a düşer ve sonraki flush'ta (poll / drain) yazılır
+        with self.lock:
+            dropped = self.pending - len(self.sending)
+            if dropped:
+                logger.warning(f"⚠️ Telegram: {dropped} messages still pending, will be retried next run")
+            if stragglers:
+                logger.warning(f"⚠️ Telegram: {len(stragglers)} workers still sending after drain timeout")
+            self.pending = len(self.sending)
+            self.inflight = {alert_id for message in self.sending.values() for alert_id in message['alert_ids']}
+            self.inflight.update(alert_id for alert_id, _, _ in self.sent_marks)
+            self.queue = PriorityQueue()
+        self.flush_sent_marks()
+
+    # ---------- outbox ----------
+
+    def poll(self):
+        """Gönderilmemiş alert'leri (telegram_id'li kullanıcılar) kuyruğa al"""
+        with self.poll_lock:
+            return self._poll()
+
+    def _poll(self):
+        since = datetime.utcnow() - self.max_age
+        query = (
+            select(PriceAlert.__table__, User.telegram_id)
+            .join(User, User.id == PriceAlert.user_id)
+            .where(
+                PriceAlert.is_sent == False,
+                PriceAlert.created_at >= since,
+                User.telegram_id.isnot(None)
+            )
+            .order_by(PriceAlert.id)
+            .limit(self.batch_size + len(self.inflight))
+        )
+
+        with get_db_engine().connect() as conn:
+            rows = conn.execute(query).all()
+
+        # id sırası commit sırası değil (paralel writer'lar) - high-water mark yerine in-flight set
+        with self.lock:
+            rows = [row for row in rows if row.id not in self.inflight]
+            self.inflight.update(row.id for row in rows)
+
+        for row in rows:
+            self.enqueue({
+                'alert_ids': [row.id],
+                'chat_id': str(row.telegram_id),
+                'text': format_alert_message(row),
+                'attempts': 0,
+            })
+
+        return len(rows)
+
+    def poll_digests(self):
+        """Gönderilmemiş tüm alert'leri chat başına özet mesajlara çevirip kuyruğa al"""
+        with self.poll_lock:
+            since = datetime.utcnow() - self.max_age
+            query = (
+                select(PriceAlert.__table__, User.telegram_id)
+                .join(User, User.id == PriceAlert.user_id)
+                .where(
+                    PriceAlert.is_sent == False,
+                    PriceAlert.created_at >= since,
+                    User.telegram_id.isnot(None)
+                )
+                .order_by(PriceAlert.id)
+            )
+
+            with get_db_engine().connect() as conn:
+                rows = conn.execute(query).all()
+
+            by_chat = {}
+            with self.lock:
+                for row in rows:
+                    if row.id not in self.inflight:
+                        by_chat.setdefault(str(row.telegram_id), []).append(row)
+                        self.inflight.add(row.id)
+
+        count = 0
+        for chat_id, alerts in by_chat.items():
+            for text, alert_ids in build_digest_messages(alerts):
+                self.enqueue({'alert_ids': alert_ids, 'chat_id': chat_id, 'text': text, 'attempts': 0})
+                count += 1
+        return count
+
+    def enqueue(self, message, delay=0.0):
+        with self.lock:
+            self.pending += 1
+        self.queue.put((time.monotonic() + delay, next(self.sequence), message))
+
+    def flush_sent_marks(self):
+        """Gönderilenleri toplu is_sent=True / sent_at, kalıcı hatalıları is_sent=True / send_error işaretle"""
+        with self.poll_lock:  # poll ile aynı anda değil - işaretlenen alert tekrar kuyruğa girmesin
+            self._flush_sent_marks()
+
+    def _flush_sent_marks(self):
+        with self.lock:
+            marks, self.sent_marks = self.sent_marks, []
+        if not marks:
+            return
+
+        try:
+            with get_db_engine().begin() as conn:
+                conn.execute(
+                    update(PriceAlert.__table__)
+                    .where(PriceAlert.__table__.c.id == bindparam('alert_id'))
+                    .values(is_sent=True, sent_at=bindparam('sent_at'), send_error=bindparam('send_error')),
+                    [{'alert_id': alert_id, 'sent_at': sent_at, 'send_error': send_error}
+                     for alert_id, sent_at, send_error in marks]
+                )
+        except Exception as e:
+            logger.error(f"❌ Telegram outbox update error: {e}")
+            with self.lock:
+                self.sent_marks.extend(marks)
+            return
+
+        with self.lock:
+            self.inflight.difference_update(alert_id for alert_id, _, _ in marks)
+
+    def _poll_loop(self, stopping):
+        while not stopping.is_set():
+            self.wakeup.wait(self.poll_interval)
+            self.wakeup.clear()
+            if stopping.is_set():
+                break
+            try:
+                self.poll()
+                self.flush_sent_marks()
+            except Exception as e:
+                logger.error(f"❌ Telegram outbox poll error: {e}")
+
+    # ---------- delivery ----------
+
+    def get_chat_bucket(self, chat_id):
+        with self.lock:
+            bucket = self.chat_buckets.get(chat_id)
+            if bucket is None:
+                bucket = TokenBucket(self.per_chat_rate)
+                self.chat_buckets[chat_id] = bucket
+            return bucket
+
+    def _worker_loop(self, stopping):
+        while not stopping.is_set():
+            try:
+                ready_at, seq, message = self.queue.get(timeout=0.5)
+            except Empty:
+                continue
+
+            # Zamanı gelmemiş mesaj - geri koy
+            wait = ready_at - time.monotonic()
+            if wait > 0:
+                self._requeue(stopping, (ready_at, seq, message))
+                time.sleep(min(wait, 0.2))
+                continue
+
+            # Chat limiti dolu - bloklamadan sonraya ertele
+            wait = self.get_chat_bucket(message['chat_id']).reserve()
+            if wait > 0:
+                self._requeue(stopping, (time.monotonic() + wait, seq, message))
+                continue
+
+            self.global_bucket.acquire()
+            with self.lock:
+                if stopping.is_set():
+                    continue  # drain başladı - mesaj bırakılır (pending'den drain düşer)
+                self.sending[id(message)] = message
+            try:
+                self.deliver(message)
+            except Exception as e:
+                logger.error(f"❌ Telegram worker error: {e}")
+                self._finish(message, success=False)
+
+    def _requeue(self, stopping, item):
+        """Gönderilmeyen mesajı kuyruğa geri koy - drain başladıysa bırak (drain kuyruğu / pending'i sıfırlar)"""
+        with self.lock:
+            if not stopping.is_set():
+                self.queue.put(item)
+
+    def deliver(self, message):
+        message['attempts'] += 1
+        url = f"{TELEGRAM_API_URL}/bot{self.bot_token}/sendMessage"
+        payload = {'chat_id': message['chat_id'], 'text': message['text'], 'parse_mode': 'HTML'}
+
+        try:
+            response = get_http_client().post(url, json=payload, timeout=self.timeout)
+        except Exception as e:
+            logger.warning(f"⚠️ Telegram request error ({message['chat_id']}): {e}")
+            return self._retry(message, 2 ** message['attempts'])
+
+        if response.status_code == 200:
+            return self._finish(message, success=True)
+
+        if response.status_code == 429:
+            try:
+                retry_after = response.json().get('parameters', {}).get('retry_after', 1)
+            except ValueError:
+                retry_after = 1
+            with self.lock:
+                self.rate_limited += 1
+            logger.warning(f"⚠️ Telegram 429 for {message['chat_id']}, retry after {retry_after}s")
+            self.get_chat_bucket(message['chat_id']).pause(retry_after)
+            return self._retry(message, retry_after, count_attempt=False)
+
+        if response.status_code >= 500:
+            return self._retry(message, 2 ** message['attempts'])
+
+        # 400 / 403 (chat yok, bot engellendi) - tekrar denemenin anlamı yok, outbox'tan çıkar
+        logger.error(f"❌ Telegram API error: {response.status_code} - {response.text}")
+        self._finish(message, success=False, error=f"{response.status_code}: {response.text}"[:200])
+
+    def _retry(self, message, delay, count_attempt=True):
+        if not count_attempt:
+            message['attempts'] -= 1
+        if message['attempts'] >= self.max_attempts:
+            logger.error(f"❌ Telegram message ({len(message['alert_ids'])} alerts) to {message['chat_id']} failed after {message['attempts']} attempts")
+            return self._finish(message, success=False)
+        with self.lock:  # drain'in kuyruk / pending sıfırlamasıyla aynı anda değil
+            self.sending.pop(id(message), None)
+            self.queue.put((time.monotonic() + delay, next(self.sequence), message))
+
+    def _finish(self, message, success, error=None):
+        """
+        error: kalıcı hata - alert'ler is_sent=True / send_error ile işaretlenir (tekrar denenmez)
+        error'sız başarısızlık (retry'lar tükendi) is_sent=False kalır, sonraki run'da tekrar denenir
+        """
+        with self.lock:
+            self.pending -= 1
+            self.sending.pop(id(message), None)
+            if success:
+                sent_at = datetime.utcnow()
+                self.sent += 1
+                self.alerts_sent += len(message['alert_ids'])
+                self.sent_marks.extend((alert_id, sent_at, None) for alert_id in message['alert_ids'])
+            else:
+                self.failed += 1
+                if error is not None:
+                    self.rejected += 1
+                    self.sent_marks.extend((alert_id, None, error) for alert_id in message['alert_ids'])
+
+    def reset_stats(self):
+        """Run sayaçları (kuyruk / pending korunur)"""
+        with self.lock:
+            self.sent = 0
+            self.alerts_sent = 0
+            self.failed = 0
+            self.rejected = 0
+            self.rate_limited = 0
+
+    def get_stats(self):
+        with self.lock:
+            return {
+                'sent': self.sent,
+                'alerts_sent': self.alerts_sent,
+                'failed': self.failed,
+                'rejected': self.rejected,
+                'rate_limited': self.rate_limited,
+                'pending': self.pending,
+            }
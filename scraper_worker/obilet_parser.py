@@ -0,0 +1,202 @@
+"""
+SeferTakip - Obilet Journey Stream Parser
+Obilet /json/journeys cevabını tek seferde json.loads yerine eleman eleman parse eder.
+
+- Sadece "journeys" dizisi taranır, her eleman decode edilip hemen kompakt kayda çevrilir
+  (duraklar, puanlar vb. kullanılmayan alanlar tutulmaz) - tam JSON ağacı hiç oluşmaz
+- target_date verilirse başka güne ait seferler parse sırasında elenir
+- Kayıtlar JourneyRecord: datetime / Decimal alanlar ingest'te bir kez parse edilir (memoize),
+  tekrar eden firma / otobüs tipi / para birimi string'leri intern edilir
+- Bozuk / eksik payload'da json.JSONDecodeError (tam parse ile aynı hata davranışı)
+"""
+
+from datetime import datetime, timezone
+from decimal import Decimal, InvalidOperation
+from functools import lru_cache
+import json
+import logging
+import re
+import sys
+
+logger = logging.getLogger(__name__)
+
+_WHITESPACE = re.compile(r'[ \t\n\r]*')
+_DECODER = json.JSONDecoder()
+
+
+@lru_cache(maxsize=16384)
+def _parse_datetime_cached(value):
+    """
+    Obilet 'YYYY-MM-DDTHH:MM:SS' (timezone'suz) → tek fromisoformat, diğer ISO biçimleri + 'Z' de desteklenir
+    Aynı kalkış / varış saati route'lar ve tarihler arasında çok tekrar eder - sonuç memoize edilir
+    (datetime immutable, paylaşmak güvenli)
+    """
+    try:
+        dt = datetime.fromisoformat(value[:-1] + '+00:00' if value.endswith('Z') else value)
+    except ValueError:
+        try:
+            dt = datetime.strptime(value, '%Y-%m-%dT%H:%M:%S')
+        except ValueError:
+            logger.warning(f"⚠️  Could not parse datetime: {value}")
+            return None
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return dt
+
+
+def parse_obilet_datetime(value):
+    """ISO datetime string → timezone'lu datetime (timezone yoksa UTC), parse edilemezse None"""
+    if not value:
+        return None
+    if not isinstance(value, str):
+        logger.warning(f"⚠️  Could not parse datetime: {value!r}")
+        return None
+    return _parse_datetime_cached(value)
+
+
+def to_decimal(value):
+    """JSON fiyatı → Decimal (float yuvarlama hatası olmadan), yoksa None"""
+    if value is None:
+        return None
+    try:
+        return Decimal(str(value))
+    except (InvalidOperation, ValueError):
+        return None
+
+
+def _intern(value):
+    return sys.intern(value) if isinstance(value, str) else value
+
+
+class JourneyRecord:
+    """
+    Tek sefer - sync / price history / alert'in kullandığı alanlar
+    Route / tarih bilgisi kayıtta tutulmaz (buffer anahtarında bir kez)
+    """
+
+    __slots__ = (
+        'id', 'partner_id', 'partner_name', 'bus_type', 'total_seats', 'available_seats',
+        'departure_time', 'arrival_time', 'original_price', 'internet_price', 'currency',
+    )
+
+    # Obilet cevabında süre / özellik bilgisi yok - tüm kayıtlar için sabit
+    duration = 0
+    features = ()
+
+    def __init__(self, id, partner_id, partner_name, bus_type, total_seats, available_seats,
+                 departure_time, arrival_time, original_price, internet_price, currency):
+        self.id = id
+        self.partner_id = partner_id
+        self.partner_name = partner_name
+        self.bus_type = bus_type
+        self.total_seats = total_seats
+        self.available_seats = available_seats
+        self.departure_time = departure_time
+        self.arrival_time = arrival_time
+        self.original_price = original_price
+        self.internet_price = internet_price
+        self.currency = currency
+
+    @property
+    def occupancy_rate(self):
+        """Doluluk yüzdesi (toplam koltuk bilinmiyorsa None)"""
+        if not self.total_seats or self.total_seats <= 0:
+            return None
+        occupied = self.total_seats - (self.available_seats or 0)
+        return round((occupied / self.total_seats) * 100, 2)
+
+    def __repr__(self):
+        return f"JourneyRecord(id={self.id!r}, partner={self.partner_name!r}, departure={self.departure_time})"
+
+
+class ParsedJourneys(list):
+    """Stream parse sonucu: (varsa) tarih filtresinden geçen journey'ler + payload'daki toplam sefer sayısı"""
+
+    __slots__ = ('total', 'target_date')
+
+    def __init__(self, journeys=(), total=0, target_date=None):
+        super().__init__(journeys)
+        self.total = total
+        self.target_date = target_date
+
+
+def project_journey(item):
+    """Obilet journey elemanı → JourneyRecord"""
+    journey = item.get('journey') or {}
+    journey_id = item.get('id')
+    return JourneyRecord(
+        id=str(journey_id) if journey_id is not None else None,
+        partner_id=item.get('partner-id'),
+        partner_name=_intern(item.get('partner-name')),
+        bus_type=_intern(item.get('bus-type')),
+        total_seats=item.get('total-seats'),
+        available_seats=item.get('available-seats'),
+        departure_time=parse_obilet_datetime(journey.get('departure')),
+        arrival_time=parse_obilet_datetime(journey.get('arrival')),
+        original_price=to_decimal(journey.get('original-price')),
+        internet_price=to_decimal(journey.get('internet-price')),
+        currency=_intern(journey.get('currency')),
+    )
+
+
+def _skip(text, index):
+    return _WHITESPACE.match(text, index).end()
+
+
+def _expect(text, index, char, message):
+    if text[index:index + 1] != char:
+        raise json.JSONDecodeError(message, text, index)
+    return _skip(text, index + 1)
+
+
+def iter_journey_items(text):
+    """Top-level {"journeys": [...]} dizisinin elemanlarını sırayla decode et"""
+    index = _expect(text, _skip(text, 0), '{', 'Expecting object')
+    if text[index:index + 1] == '}':
+        return
+
+    while True:
+        key, index = _DECODER.raw_decode(text, index)
+        index = _expect(text, _skip(text, index), ':', "Expecting ':' delimiter")
+
+        if key == 'journeys':
+            index = _expect(text, index, '[', "Expecting 'journeys' array")
+            if text[index:index + 1] == ']':
+                return
+            while True:
+                item, index = _DECODER.raw_decode(text, index)
+                yield item
+                index = _skip(text, index)
+                if text[index:index + 1] == ']':
+                    return  # Dizinin sonrası kullanılmıyor
+                index = _expect(text, index, ',', "Expecting ',' delimiter")
+
+        # Diğer top-level alanlar atlanır
+        _, index = _DECODER.raw_decode(text, index)
+        index = _skip(text, index)
+        if text[index:index + 1] == '}':
+            return
+        index = _expect(text, index, ',', "Expecting ',' delimiter")
+
+
+def parse_journeys_stream(body, target_date=None):
+    """
+    Ham cevap (bytes / str) → ParsedJourneys
+    target_date verilirse sadece o gün kalkan seferler - ISO 'YYYY-MM-DD...' prefix karşılaştırması,
+    başka güne ait elemanlar için kayıt hiç oluşturulmaz
+    """
+    text = body.decode('utf-8') if isinstance(body, (bytes, bytearray)) else body
+    day = target_date.isoformat() if target_date is not None else None
+
+    journeys = ParsedJourneys(target_date=target_date)
+    for item in iter_journey_items(text):
+        journeys.total += 1
+        if day is not None:
+            departure = (item.get('journey') or {}).get('departure')
+            if not isinstance(departure, str) or departure[:10] != day:
+                continue
+        record = project_journey(item)
+        if day is not None and record.departure_time is None:
+            continue  # Prefix tutsa da parse edilemeyen kalkış (tam parse filtresiyle aynı)
+        journeys.append(record)
+    return journeys
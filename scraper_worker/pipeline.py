@@ -0,0 +1,161 @@
+"""
+SeferTakip - Scrape → Sync Pipeline
+Scraper worker'ları sonuçları bounded kuyruğa koyar, DB writer thread'leri boşaltır.
+Kuyruk doluysa scraper bekler (backpressure), böylece memory sınırlı kalır.
+"""
+
+from queue import Empty, Queue
+from threading import Lock, Thread
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+_STOP = object()  # Writer'ları durdurma sinyali
+
+
+class StageStats:
+    """Pipeline aşaması için latency / throughput sayaçları (thread-safe)"""
+
+    def __init__(self, name):
+        self.name = name
+        self.lock = Lock()
+        self.count = 0
+        self.errors = 0
+        self.total_time = 0.0
+        self.max_time = 0.0
+        self.first_start = None
+        self.last_end = None
+
+    def record(self, started, ended, success=True, items=1):
+        with self.lock:
+            elapsed = ended - started
+            self.count += items
+            if not success:
+                self.errors += items
+            self.total_time += elapsed
+            self.max_time = max(self.max_time, elapsed)
+            if self.first_start is None or started < self.first_start:
+                self.first_start = started
+            if self.last_end is None or ended > self.last_end:
+                self.last_end = ended
+
+    def as_dict(self):
+        with self.lock:
+            wall_time = (self.last_end - self.first_start) if self.count else 0.0
+            return {
+                'name': self.name,
+                'count': self.count,
+                'errors': self.errors,
+                'avg_latency': (self.total_time / self.count) if self.count else 0.0,
+                'max_latency': self.max_time,
+                'wall_time': wall_time,
+                'throughput': (self.count / wall_time) if wall_time > 0 else 0.0,
+            }
+
+    def log_summary(self):
+        stats = self.as_dict()
+        logger.info(
+            f"      {stats['name']}: {stats['count']} items ({stats['errors']} errors), "
+            f"avg {stats['avg_latency']:.2f}s, max {stats['max_latency']:.2f}s, "
+            f"{stats['throughput']:.2f}/s over {stats['wall_time']:.1f}s"
+        )
+
+
+class SyncPipeline:
+    """
+    Bounded kuyruk + DB writer thread havuzu
+    handler(item) her item için bir writer thread'inde çağrılır, False döndürmesi hata sayılır
+
+    batch_handler verilirse writer kuyrukta bekleyen item'ları toplam ağırlık
+    (batch_weight(item)) max_batch_weight'e ulaşana kadar toplayıp tek seferde işler.
+    Batch için beklenmez - sadece o an kuyrukta olanlar alınır.
+    """
+
+    def __init__(self, handler=None, num_writers=2, queue_size=20, name='sync',
+                 batch_handler=None, batch_weight=None, max_batch_weight=1):
+        self.handler = handler
+        self.batch_handler = batch_handler
+        self.batch_weight = batch_weight or (lambda item: 1)
+        self.max_batch_weight = max_batch_weight
+        self.num_writers = max(1, num_writers)
+        self.queue = Queue(maxsize=max(1, queue_size))
+        self.stats = StageStats(name)
+        self.writers = []
+
+        # Backpressure: kuyruk dolu olduğu için submit'te beklenen süre
+        self.lock = Lock()
+        self.blocked_time = 0.0
+
+    def start(self):
+        for i in range(self.num_writers):
+            writer = Thread(target=self._writer_loop, name=f"{self.stats.name}-writer-{i}", daemon=True)
+            writer.start()
+            self.writers.append(writer)
+        return self
+
+    def submit(self, item):
+        """Item'ı kuyruğa koy - kuyruk doluysa yer açılana kadar bekler"""
+        started = time.perf_counter()
+        self.queue.put(item)
+        waited = time.perf_counter() - started
+        with self.lock:
+            self.blocked_time += waited
+
+    def close(self):
+        """Kuyruğu boşalt ve writer'ları durdur"""
+        for _ in self.writers:
+            self.queue.put(_STOP)
+        for writer in self.writers:
+            writer.join()
+        self.writers = []
+
+    def _next_batch(self):
+        """Kuyruktan bir batch al - (batch, stop) döndürür"""
+        item = self.queue.get()
+        if item is _STOP:
+            return [], True
+
+        batch = [item]
+        if self.batch_handler is None:
+            return batch, False
+
+        weight = self.batch_weight(item)
+        while weight < self.max_batch_weight:
+            try:
+                item = self.queue.get_nowait()
+            except Empty:
+                break
+            if item is _STOP:
+                return batch, True
+            batch.append(item)
+            weight += self.batch_weight(item)
+
+        return batch, False
+
+    def _writer_loop(self):
+        stop = False
+        while not stop:
+            batch, stop = self._next_batch()
+            if not batch:
+                continue
+
+            started = time.perf_counter()
+            success = True
+            try:
+                # handler False döndürürse item hatalı sayılır
+                if self.batch_handler is not None:
+                    success = self.batch_handler(batch) is not False
+                else:
+                    success = self.handler(batch[0]) is not False
+            except Exception as e:
+                success = False
+                logger.error(f"❌ {self.stats.name} writer error: {e}")
+            finally:
+                self.stats.record(started, time.perf_counter(), success, items=len(batch))
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
@@ -0,0 +1,188 @@
+"""
+SeferTakip - ScrapingBee Rate Control
+Run boyunca canlı (thread-safe) istek kontrolü - thread ve async engine ortak kullanır
+
+- SlidingWindow: son window_seconds içindeki istek / block / 429 sayıları
+- CircuitBreaker: pencerede block oranı eşiği geçince istekler durur (open), cooldown sonrası
+  tek deneme isteği (half-open); başarılıysa kapanır. max_trips kez açıldıysa kalan istekler
+  hiç atılmaz (shed) - ban sırasında credit yakmak yerine run erken biter
+- AIMDLimiter: eşzamanlı istek limiti - başarıda +1/limit, block / 429'da limit * decrease_factor
+- RetryBudget: run genelinde retry hakkı (min_retries + ratio * ilk deneme) - kötü bir dönem
+  tüm worker'ları retry sleep'inde kilitleyemez (opsiyonel, ratio=None ise sınırsız)
+"""
+
+from collections import deque
+from threading import Lock
+import logging
+import random
+import time
+
+logger = logging.getLogger(__name__)
+
+
+def backoff_delay(attempt, base=1.0, cap=30.0):
+    """Full jitter exponential backoff: [0, min(cap, base * 2^attempt)] arası rastgele"""
+    return random.uniform(0, min(cap, base * (2 ** attempt)))
+
+
+class SlidingWindow:
+    """Son window_seconds içindeki sonuçlar (lock çağıran tarafta)"""
+
+    def __init__(self, window_seconds=60):
+        self.window = window_seconds
+        self.events = deque()  # (monotonic ts, blocked, rate_limited)
+        self.total = 0
+        self.blocked = 0
+        self.rate_limited = 0
+
+    def _expire(self, now):
+        cutoff = now - self.window
+        while self.events and self.events[0][0] < cutoff:
+            _, blocked, rate_limited = self.events.popleft()
+            self.total -= 1
+            self.blocked -= blocked
+            self.rate_limited -= rate_limited
+
+    def add(self, blocked, rate_limited, now=None):
+        now = time.monotonic() if now is None else now
+        self._expire(now)
+        self.events.append((now, blocked, rate_limited))
+        self.total += 1
+        self.blocked += blocked
+        self.rate_limited += rate_limited
+
+    def block_rate(self, now=None):
+        """Penceredeki block (403 / 422 / 429 / ban mesajı) oranı, 0..1"""
+        self._expire(time.monotonic() if now is None else now)
+        return self.blocked / self.total if self.total else 0.0
+
+    def clear(self):
+        self.events.clear()
+        self.total = self.blocked = self.rate_limited = 0
+
+
+class CircuitBreaker:
+    """closed → open (cooldown) → half_open (tek deneme) → closed / open (lock çağıran tarafta)"""
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, block_rate=0.5, min_requests=10, cooldown_seconds=30, max_cooldown_seconds=300, max_trips=3):
+        self.threshold = block_rate
+        self.min_requests = min_requests
+        self.cooldown = cooldown_seconds
+        self.max_cooldown = max_cooldown_seconds
+        self.max_trips = max_trips  # 0 = hiç shed etme, sadece bekle
+
+        self.state = self.CLOSED
+        self.opened_until = 0.0
+        self.probe_in_flight = False
+        self.trips = 0
+        self.shed = 0
+
+    @property
+    def shedding(self):
+        return self.max_trips > 0 and self.trips >= self.max_trips and self.state != self.CLOSED
+
+    def trip(self, now, reason):
+        self.trips += 1
+        cooldown = min(self.max_cooldown, self.cooldown * (2 ** (self.trips - 1)))
+        self.state = self.OPEN
+        self.opened_until = now + cooldown
+        self.probe_in_flight = False
+        if self.shedding:
+            logger.error(f"🚨 Circuit breaker OPEN ({reason}) - trip {self.trips}/{self.max_trips}, remaining requests will be shed")
+        else:
+            logger.warning(f"🚨 Circuit breaker OPEN ({reason}) - pausing requests for {cooldown:.0f}s (trip {self.trips})")
+
+    def before_request(self, now):
+        """0.0 = istek atılabilir, > 0 = kaç saniye beklenmeli, None = shed (istek atılmayacak)"""
+        if self.state == self.CLOSED:
+            return 0.0
+        if self.shedding:
+            self.shed += 1
+            return None
+        if self.state == self.OPEN:
+            if now < self.opened_until:
+                return self.opened_until - now
+            self.state = self.HALF_OPEN
+            logger.info("🔌 Circuit breaker HALF-OPEN - sending probe request")
+        if self.probe_in_flight:
+            return 1.0
+        self.probe_in_flight = True
+        return 0.0
+
+    def on_result(self, blocked, window, now):
+        """İstek sonucu - half_open'da probe'un sonucu devreyi kapatır / tekrar açar"""
+        if self.state == self.HALF_OPEN:
+            self.probe_in_flight = False
+            if blocked:
+                self.trip(now, 'probe blocked')
+            else:
+                self.state = self.CLOSED
+                window.clear()
+                logger.info("🔌 Circuit breaker CLOSED - probe succeeded")
+            return
+        if (self.state == self.CLOSED and blocked and window.total >= self.min_requests
+                and window.block_rate(now) >= self.threshold):
+            self.trip(now, f"block rate {window.block_rate(now) * 100:.0f}% over last {window.total} requests")
+
+
+class AIMDLimiter:
+    """Additive increase / multiplicative decrease eşzamanlılık limiti (lock çağıran tarafta)"""
+
+    def __init__(self, max_limit, min_limit=1, decrease_factor=0.5, decrease_interval=2.0):
+        self.max_limit = max(1, max_limit)
+        self.min_limit = max(1, min(min_limit, self.max_limit))
+        self.decrease_factor = decrease_factor
+        self.decrease_interval = decrease_interval  # Aynı block dalgası limiti bir kez düşürür
+
+        self.limit = float(self.max_limit)
+        self.in_flight = 0
+        self.last_decrease = float('-inf')
+        self.min_seen = self.limit
+
+    def try_acquire(self):
+        if self.in_flight < int(self.limit):
+            self.in_flight += 1
+            return True
+        return False
+
+    def release(self):
+        self.in_flight = max(0, self.in_flight - 1)
+
+    def on_success(self):
+        self.limit = min(self.max_limit, self.limit + 1.0 / self.limit)
+
+    def on_block(self, now):
+        if now - self.last_decrease < self.decrease_interval:
+            return
+        self.last_decrease = now
+        self.limit = max(self.min_limit, self.limit * self.decrease_factor)
+        self.min_seen = min(self.min_seen, self.limit)
+        logger.warning(f"🐢 Concurrency limit lowered to {int(self.limit)}")
+
+
+class RetryBudget:
+    """
+    Run genelinde retry hakkı: min_retries + ratio * ilk deneme sayısı (lock çağıran tarafta)
+    ratio=None: sınırsız (sadece sayılır) - route başına max_retries yine geçerli
+    """
+
+    def __init__(self, ratio=0.2, min_retries=10):
+        self.ratio = ratio
+        self.min_retries = min_retries
+        self.requests = 0
+        self.retries = 0
+        self.denied = 0
+
+    def on_first_attempt(self):
+        self.requests += 1
+
+    def try_spend(self):
+        if self.ratio is None or self.retries < self.min_retries + self.ratio * self.requests:
+            self.retries += 1
+            return True
+        self.denied += 1
+        return False
@@ -0,0 +1,232 @@
+"""
+SeferTakip - Obilet Response Cache
+Obilet journey JSON cevapları için URL anahtarlı cache (in-memory LRU + opsiyonel disk)
+
+- ttl_seconds içindeki kayıt varsa ScrapingBee'ye gidilmez (credit harcanmaz)
+- Her kaydın içerik hash'i tutulur; son başarılı sync edilen içerikle aynı payload
+  parse / sync edilmeden "değişiklik yok" sayılır
+- resync_hours'tan eski sync işaretleri dikkate alınmaz (DB ile periyodik tam sync)
+- Disk store (cache_dir) cron run'ları arasında kalıcıdır: <key>.gz (gövde) + <key>.json (meta)
+"""
+
+from collections import OrderedDict
+from threading import Lock
+import gzip
+import hashlib
+import json
+import logging
+import os
+import time
+
+logger = logging.getLogger(__name__)
+
+
+def content_digest(body):
+    return hashlib.blake2b(body, digest_size=16).hexdigest()
+
+
+class CacheEntry:
+    """Tek cevap: gövde + içerik hash'i + çekilme zamanı (epoch)"""
+
+    __slots__ = ('url', 'body', 'digest', 'fetched_at')
+
+    def __init__(self, url, body, digest, fetched_at):
+        self.url = url
+        self.body = body
+        self.digest = digest
+        self.fetched_at = fetched_at
+
+
+class ResponseCache:
+    """Thread-safe response cache - max_entries LRU, cache_dir verilirse disk üzerinde de"""
+
+    def __init__(self, max_entries=256, ttl_seconds=3000, cache_dir=None, resync_hours=6):
+        self.max_entries = max_entries
+        self.ttl = ttl_seconds
+        self.cache_dir = cache_dir
+        self.resync_age = resync_hours * 3600
+
+        self.entries = OrderedDict()  # url -> CacheEntry
+        self.latest = {}  # url -> en son kullanılan içeriğin hash'i (LRU'dan düşse de mark_synced için)
+        self.synced = {}  # url -> (digest, synced_at) - son başarılı sync edilen içerik
+        self.lock = Lock()
+
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+
+        # Statistics
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.unchanged = 0
+
+    # ------------------------------------------------------------------
+    # Disk store
+    # ------------------------------------------------------------------
+
+    def _path(self, url, suffix):
+        key = hashlib.blake2b(url.encode('utf-8'), digest_size=16).hexdigest()
+        return os.path.join(self.cache_dir, key + suffix)
+
+    def _read_meta(self, url):
+        try:
+            with open(self._path(url, '.json'), encoding='utf-8') as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            return None
+        return meta if meta.get('url') == url else None
+
+    def _write_meta(self, url, meta):
+        path = self._path(url, '.json')
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(meta, f)
+        os.replace(tmp, path)
+
+    def _load_from_disk(self, url):
+        meta = self._read_meta(url)
+        if meta is None:
+            return None, None
+        synced = (meta['synced_digest'], meta['synced_at']) if meta.get('synced_digest') else None
+        try:
+            with open(self._path(url, '.gz'), 'rb') as f:
+                body = gzip.decompress(f.read())
+        except (OSError, EOFError):
+            return None, synced
+        if content_digest(body) != meta.get('digest'):
+            return None, synced
+        return CacheEntry(url, body, meta['digest'], meta['fetched_at']), synced
+
+    def _store_on_disk(self, entry):
+        path = self._path(entry.url, '.gz')
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, 'wb') as f:
+            f.write(gzip.compress(entry.body, compresslevel=1))
+        os.replace(tmp, path)
+
+        meta = self._read_meta(entry.url) or {}
+        meta.update(url=entry.url, digest=entry.digest, fetched_at=entry.fetched_at)
+        self._write_meta(entry.url, meta)
+
+    def prune_disk(self):
+        """resync_hours'tan eski disk kayıtlarını sil"""
+        if not self.cache_dir:
+            return 0
+        cutoff = time.time() - max(self.ttl, self.resync_age)
+        removed = 0
+        for name in os.listdir(self.cache_dir):
+            path = os.path.join(self.cache_dir, name)
+            try:
+                if os.path.getmtime(path) < cutoff:
+                    os.remove(path)
+                    removed += 1
+            except OSError:
+                continue
+        if removed:
+            logger.info(f"🗄  Response cache: {removed} expired disk files removed")
+        return removed
+
+    # ------------------------------------------------------------------
+    # Cache
+    # ------------------------------------------------------------------
+
+    def _remember(self, entry):
+        """Memory LRU'ya ekle (lock altında çağrılır)"""
+        self.entries[entry.url] = entry
+        self.entries.move_to_end(entry.url)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+    def _load(self, url):
+        """Memory'de yoksa diskten yükle - (entry, disk'ten mi)"""
+        with self.lock:
+            entry = self.entries.get(url)
+            if entry is not None:
+                self.entries.move_to_end(url)
+                return entry, False
+        if not self.cache_dir:
+            return None, False
+
+        entry, synced = self._load_from_disk(url)
+        with self.lock:
+            if synced is not None and url not in self.synced:
+                self.synced[url] = synced
+            if entry is not None:
+                self._remember(entry)
+        return entry, entry is not None
+
+    def get(self, url):
+        """TTL içindeki kayıt (yoksa None)"""
+        entry, from_disk = self._load(url)
+        fresh = entry is not None and time.time() - entry.fetched_at < self.ttl
+        with self.lock:
+            if fresh:
+                self.hits += 1
+                self.disk_hits += from_disk
+                self.latest[url] = entry.digest
+            else:
+                self.misses += 1
+        return entry if fresh else None
+
+    def put(self, url, body):
+        """Yeni çekilen cevabı sakla"""
+        entry = CacheEntry(url, body, content_digest(body), time.time())
+        with self.lock:
+            self._remember(entry)
+            self.latest[url] = entry.digest
+        if self.cache_dir:
+            try:
+                self._store_on_disk(entry)
+            except OSError as e:
+                logger.warning(f"⚠️  Response cache disk write failed: {e}")
+        return entry
+
+    def is_synced(self, entry):
+        """Kaydın içeriği son sync edilenle aynı mı (ve sync işareti resync_hours'tan yeni mi)"""
+        with self.lock:
+            synced = self.synced.get(entry.url)
+        if synced is None and self.cache_dir:
+            meta = self._read_meta(entry.url)
+            if meta and meta.get('synced_digest'):
+                synced = (meta['synced_digest'], meta['synced_at'])
+        unchanged = (synced is not None and synced[0] == entry.digest and
+                     time.time() - synced[1] < self.resync_age)
+        if unchanged:
+            with self.lock:
+                self.unchanged += 1
+        return unchanged
+
+    def mark_synced(self, url):
+        """URL'in güncel kaydı DB'ye başarıyla sync edildi"""
+        with self.lock:
+            digest = self.latest.get(url)
+            if digest is None:
+                return
+            synced = (digest, time.time())
+            self.synced[url] = synced
+        if self.cache_dir:
+            meta = self._read_meta(url)
+            if meta is not None and meta.get('digest') == synced[0]:
+                meta.update(synced_digest=synced[0], synced_at=synced[1])
+                try:
+                    self._write_meta(url, meta)
+                except OSError as e:
+                    logger.warning(f"⚠️  Response cache disk write failed: {e}")
+
+    def reset_stats(self):
+        """Run sayaçları (kayıtlar korunur)"""
+        with self.lock:
+            self.hits = 0
+            self.disk_hits = 0
+            self.misses = 0
+            self.unchanged = 0
+
+    def get_stats(self):
+        with self.lock:
+            return {
+                'hits': self.hits,
+                'disk_hits': self.disk_hits,
+                'misses': self.misses,
+                'unchanged': self.unchanged,
+                'entries': len(self.entries),
+            }
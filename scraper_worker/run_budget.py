@@ -0,0 +1,74 @@
+"""
+SeferTakip - Run Time Budget
+Run genelinde süre bütçesi: saatlik cron bir sonraki tick'le çakışmasın
+
+- İş birimleri öncelik sırasıyla başlar; başlamamış bir birimin tahmini bitişi
+  (şimdi + ortalama birim süresi) deadline'ı geçiyorsa birim ertelenir (deferred)
+- Retry beklemesi deadline'ı geçecekse retry yapılmaz, birim ertelenir
+- Ertelenen birimler iş kuyruğunda (work_queue) bitmemiş kalır, sonraki run önce onları alır
+- margin_seconds: run sonu işleri (flush, state kaydı, Telegram) için ayrılan süre
+- drain(): deadline hemen dolar (daemon SIGTERM) - süren birimler biter, kalanlar ertelenir
+"""
+
+from threading import Lock
+import time
+
+
+class RunBudget:
+    """Deadline + iş birimi süresi tahmini (thread-safe) - seconds=0 ise sınırsız"""
+
+    def __init__(self, seconds=0, margin_seconds=120, alpha=0.2):
+        self.seconds = seconds
+        self.started = time.monotonic()
+        self.deadline = self.started + max(0, seconds - margin_seconds) if seconds else None
+        self.alpha = alpha
+
+        self.unit_seconds = None  # İş birimi süresi (EWMA)
+        self.stop_reason = 'deadline'  # Ertelenen birimlerin sebebi
+        self.deferred = []  # (route, departure_date, reason)
+        self.lock = Lock()
+
+    def remaining(self, now=None):
+        if self.deadline is None:
+            return float('inf')
+        return self.deadline - (time.monotonic() if now is None else now)
+
+    def record_unit(self, elapsed):
+        """Biten birimin scrape süresi - başlatma tahminini günceller"""
+        with self.lock:
+            if self.unit_seconds is None:
+                self.unit_seconds = elapsed
+            else:
+                self.unit_seconds = (1 - self.alpha) * self.unit_seconds + self.alpha * elapsed
+
+    def can_start(self, now=None):
+        """Yeni birim (ya da yeni deneme) deadline'dan önce bitmesi beklenirse True"""
+        if self.deadline is None:
+            return True
+        return self.remaining(now) > (self.unit_seconds or 0)
+
+    def can_wait(self, seconds, now=None):
+        """seconds bekleyip bir deneme daha yapmaya vakit var mı"""
+        if self.deadline is None:
+            return True
+        return self.remaining(now) > seconds + (self.unit_seconds or 0)
+
+    def drain(self, reason='shutdown'):
+        """Deadline'ı şimdiye çek - yeni birim / retry başlamaz"""
+        with self.lock:
+            self.deadline = time.monotonic()
+            self.stop_reason = reason
+
+    def defer(self, route, departure_date, reason='deadline'):
+        with self.lock:
+            self.deferred.append((route, departure_date, reason))
+
+    def get_stats(self):
+        with self.lock:
+            return {
+                'seconds': self.seconds,
+                'elapsed': time.monotonic() - self.started,
+                'unit_seconds': self.unit_seconds or 0,
+                'deferred': len(self.deferred),
+            }
+
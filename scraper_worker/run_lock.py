@@ -0,0 +1,121 @@
+"""
+SeferTakip - Lease Lock
+DB tabanlı lease lock (PostgreSQL + SQLite) - saatlik cron run'ları üst üste binmesin
+
+- acquire(): lock boşsa ya da süresi dolmuşsa (çöken run) alınır, doluysa False
+- Tutulduğu sürece arka plan thread'i expires_at'i ttl/3'te bir uzatır (heartbeat)
+- release(): sadece sahibi siler
+Advisory lock yerine tablo: run boyunca bağlantı tutulmaz, SQLite'ta da çalışır
+"""
+
+from datetime import datetime, timedelta
+from threading import Event, Thread
+import logging
+import os
+import socket
+import uuid
+
+from sqlalchemy import delete, insert, or_, select, update
+from sqlalchemy.exc import IntegrityError
+
+from models_standalone import ScrapeRunLock, get_db_engine
+
+logger = logging.getLogger(__name__)
+
+
+def default_owner():
+    """host:pid:rastgele - aynı process'teki iki lock sahibi de ayırt edilir"""
+    return f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+
+
+class LeaseLock:
+    """İsimli lease lock - expires_at geçmişse başka sahip devralabilir"""
+
+    def __init__(self, name, ttl_seconds=300, owner=None, engine=None):
+        self.name = name
+        self.ttl = timedelta(seconds=ttl_seconds)
+        self.owner = owner or default_owner()
+        self.engine = engine
+
+        self.held = False
+        self.lost = False  # Heartbeat yenileyemedi (başka sahip devraldı)
+        self._stop = Event()
+        self._thread = None
+
+    def get_engine(self):
+        return self.engine or get_db_engine()
+
+    def try_acquire(self):
+        """Tek deneme - lock boş / süresi dolmuş / zaten bizdeyse True"""
+        engine = self.get_engine()
+        table = ScrapeRunLock.__table__
+
+        now = datetime.utcnow()
+        values = {'owner': self.owner, 'acquired_at': now, 'expires_at': now + self.ttl}
+        try:
+            with engine.begin() as conn:
+                taken = conn.execute(
+                    update(table)
+                    .where(table.c.name == self.name, or_(table.c.expires_at < now, table.c.owner == self.owner))
+                    .values(**values)
+                ).rowcount
+                if not taken:
+                    conn.execute(insert(table).values(name=self.name, **values))
+        except IntegrityError:
+            return False  # Satır var ve süresi dolmamış
+
+        self.held = True
+        self.lost = False
+        return True
+
+    def acquire(self):
+        """Lock'u al ve heartbeat'i başlat"""
+        if not self.try_acquire():
+            return False
+        self._stop.clear()
+        self._thread = Thread(target=self._heartbeat_loop, name=f"lease-{self.name}", daemon=True)
+        self._thread.start()
+        return True
+
+    def renew(self):
+        """expires_at'i uzat - satır artık bizim değilse False"""
+        table = ScrapeRunLock.__table__
+        with self.get_engine().begin() as conn:
+            renewed = conn.execute(
+                update(table)
+                .where(table.c.name == self.name, table.c.owner == self.owner)
+                .values(expires_at=datetime.utcnow() + self.ttl)
+            ).rowcount
+        return renewed > 0
+
+    def _heartbeat_loop(self):
+        while not self._stop.wait(self.ttl.total_seconds() / 3):
+            try:
+                if not self.renew():
+                    self.lost = True
+                    logger.error(f"🔒 Lock '{self.name}' lost - taken over by another owner")
+                    return
+            except Exception as e:
+                logger.warning(f"⚠️  Lock '{self.name}' heartbeat failed: {e}")
+
+    def release(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+        if not self.held:
+            return
+        self.held = False
+        table = ScrapeRunLock.__table__
+        try:
+            with self.get_engine().begin() as conn:
+                conn.execute(delete(table).where(table.c.name == self.name, table.c.owner == self.owner))
+        except Exception as e:
+            logger.warning(f"⚠️  Lock '{self.name}' release failed: {e} (expires in {self.ttl})")
+
+    def get_holder(self):
+        """(owner, expires_at) ya da None"""
+        table = ScrapeRunLock.__table__
+        with self.get_engine().connect() as conn:
+            row = conn.execute(select(table.c.owner, table.c.expires_at).where(table.c.name == self.name)).first()
+        return tuple(row) if row else None
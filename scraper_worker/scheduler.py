@@ -0,0 +1,426 @@
+"""
+SeferTakip - Adaptif Refresh Planlayıcı
+Her (route, kalkış günü) çiftine fiyat değişim sıklığına göre yenileme aralığı atar.
+
+- Değişiklik (fiyat değişimi / yeni / silinen sefer) bulunan scrape'ten sonra aralık yarıya
+  iner, bulunmayanda min_interval_hours kadar uzar (max_interval_hours'a kadar)
+- Kalkışa yaklaştıkça aralığın üst sınırı düşer, near_days içindeki günler her run scrape edilir
+- Run bütçesi (credit) aşılırsa vadesi gelenler önceliğe göre seçilir, kalanlar ertelenir
+- Durum route_refresh_states tablosunda saklanır, yeni çiftler price_history'den tahmin edilir
+
+simulate_refresh kayıtlı geçmişi saat saat tekrar oynatıp harcanan credit ile
+kaçırılan / geç görülen değişimleri ölçer (bench.py schedule).
+"""
+
+from collections import namedtuple
+from datetime import datetime, timedelta
+from threading import Lock
+import logging
+
+from sqlalchemy import bindparam, case, delete, func, insert, select, update
+
+from models_standalone import PriceHistory, RouteRefreshState, get_db_engine
+
+logger = logging.getLogger(__name__)
+
+
+class RefreshState:
+    """Tek (route, kalkış günü) çiftinin planlayıcı durumu"""
+
+    __slots__ = ('id', 'volatility', 'interval_hours', 'scrape_count', 'change_count',
+                 'last_scraped_at', 'last_changed_at', 'dirty')
+
+    def __init__(self, volatility=1.0, interval_hours=1.0, scrape_count=0, change_count=0,
+                 last_scraped_at=None, last_changed_at=None, id=None):
+        self.id = id
+        self.volatility = volatility
+        self.interval_hours = interval_hours
+        self.scrape_count = scrape_count
+        self.change_count = change_count
+        self.last_scraped_at = last_scraped_at
+        self.last_changed_at = last_changed_at
+        self.dirty = id is None
+
+
+def hours_between(start, end):
+    return (end - start).total_seconds() / 3600
+
+
+def price_change_runs(since=None, route_ids=None):
+    """
+    price_history'den run başına değişim: (route_id, departure_date, recorded_at, changed)
+    changed = 1: o run'da serilerden en az birinin fiyatı bir önceki kayda göre değişmiş
+    """
+    ph = PriceHistory.__table__
+    series = (ph.c.route_id, ph.c.obilet_partner_id, ph.c.company_name, ph.c.departure_time)
+    previous_price = func.lag(ph.c.price).over(partition_by=series, order_by=ph.c.recorded_at)
+
+    changes = select(
+        ph.c.route_id, ph.c.departure_date, ph.c.recorded_at,
+        case((ph.c.price != previous_price, 1), else_=0).label('changed')
+    ).where(ph.c.departure_time.isnot(None))
+    if since is not None:
+        changes = changes.where(ph.c.recorded_at >= since)
+    if route_ids is not None:
+        changes = changes.where(ph.c.route_id.in_(route_ids))
+    changes = changes.subquery()
+
+    return select(
+        changes.c.route_id, changes.c.departure_date, changes.c.recorded_at,
+        func.max(changes.c.changed).label('changed')
+    ).group_by(changes.c.route_id, changes.c.departure_date, changes.c.recorded_at)
+
+
+class RefreshScheduler:
+    """
+    (route, tarih) iş birimlerini değişim sıklığına göre planlar (thread-safe)
+    plan() run başında, record() her başarılı sync'ten sonra, save() run sonunda çağrılır
+    """
+
+    def __init__(self, min_interval_hours=1.0, max_interval_hours=12.0, hours_per_day=2.0, near_days=2,
+                 alpha=0.3, urgency_weight=3.0, lookback_days=7, tolerance_hours=0.25):
+        self.min_interval = min_interval_hours
+        self.max_interval = max_interval_hours
+        self.hours_per_day = hours_per_day  # Kalkışa kalan gün başına izin verilen aralık
+        self.near_days = near_days
+        self.alpha = alpha  # volatility EWMA ağırlığı
+        self.urgency_weight = urgency_weight
+        self.lookback = timedelta(days=lookback_days)
+        self.tolerance = tolerance_hours  # Cron saatindeki kaymalar için
+
+        self.states = {}  # (route_id, departure_date) -> RefreshState
+        self.route_priors = {}  # route_id -> price_history'den volatility tahmini
+        self.loaded_dates = set()
+        self.planned_at = None
+        self.lock = Lock()
+
+        # Statistics
+        self.last_plan = {'units': 0, 'due': 0, 'selected': 0, 'deferred': 0}
+        self.recorded = 0
+        self.changed = 0
+
+    # ------------------------------------------------------------------
+    # Aralık / öncelik
+    # ------------------------------------------------------------------
+
+    def days_left(self, departure_date, now):
+        return max(0, (departure_date - now.date()).days)
+
+    def max_interval_for(self, departure_date, now):
+        """Kalkışa yaklaştıkça üst sınır düşer - near_days içinde her run"""
+        days_left = self.days_left(departure_date, now)
+        if days_left <= self.near_days:
+            return self.min_interval
+        return min(self.max_interval, max(self.min_interval, days_left * self.hours_per_day))
+
+    def initial_interval(self, volatility):
+        """Her scrape'te değişiyorsa min, hiç değişmiyorsa max aralık"""
+        return min(self.max_interval, max(self.min_interval, self.min_interval / max(volatility, 1e-3)))
+
+    def priority(self, state, departure_date, now, interval):
+        """Ertelenirse kaçırılması beklenen değişim: gecikme oranı × volatility × kalkış yakınlığı"""
+        if state.last_scraped_at is None:
+            elapsed = self.max_interval
+        else:
+            elapsed = hours_between(state.last_scraped_at, now)
+        urgency = 1 + self.urgency_weight / (self.days_left(departure_date, now) + 1)
+        return (elapsed / interval) * (0.1 + state.volatility) * urgency
+
+    def get_state(self, route_id, departure_date):
+        """Çiftin durumu - yoksa route'un price_history tahminiyle yeni durum (lock altında çağrılır)"""
+        key = (route_id, departure_date)
+        state = self.states.get(key)
+        if state is None:
+            volatility = self.route_priors.get(route_id, 1.0)
+            state = RefreshState(volatility=volatility, interval_hours=self.initial_interval(volatility))
+            self.states[key] = state
+        return state
+
+    # ------------------------------------------------------------------
+    # Planlama
+    # ------------------------------------------------------------------
+
+    def plan(self, units, now=None, budget=0):
+        """
+        units: (route, departure_date) listesi (yakın günler önce)
+        Aralığı dolan birimleri döndürür - budget > 0 ve aşılıyorsa önceliği yüksek olanlar
+        Öncelik sırasıyla (run deadline'a yetişemezse düşen birimler en düşük öncelikliler olur)
+        """
+        now = now or datetime.utcnow()
+        due = []
+        with self.lock:
+            self.planned_at = now
+            for index, (route, departure_date) in enumerate(units):
+                state = self.get_state(route.id, departure_date)
+                interval = min(state.interval_hours, self.max_interval_for(departure_date, now))
+                if state.last_scraped_at is not None and hours_between(state.last_scraped_at, now) + self.tolerance < interval:
+                    continue
+                due.append((self.priority(state, departure_date, now, interval), index))
+
+        selected = sorted(due, key=lambda item: (-item[0], item[1]))
+        if budget:
+            selected = selected[:budget]
+
+        self.last_plan = {
+            'units': len(units),
+            'due': len(due),
+            'selected': len(selected),
+            'deferred': len(due) - len(selected),
+        }
+        return [units[index] for _, index in selected]
+
+    def record(self, route_id, departure_date, changes, scraped_at=None):
+        """
+        Başarılı sync sonucu: changes = fiyat değişimi + yeni + silinen sefer sayısı
+        Değişiklik varsa aralık yarıya iner, yoksa min_interval kadar uzar
+        """
+        scraped_at = scraped_at or self.planned_at or datetime.utcnow()
+        changed = changes > 0
+
+        with self.lock:
+            state = self.get_state(route_id, departure_date)
+            state.volatility = (1 - self.alpha) * state.volatility + self.alpha * (1.0 if changed else 0.0)
+            if changed:
+                state.interval_hours = max(self.min_interval, state.interval_hours / 2)
+                state.change_count += 1
+                state.last_changed_at = scraped_at
+            else:
+                state.interval_hours = min(self.max_interval, state.interval_hours + self.min_interval)
+            state.scrape_count += 1
+            state.last_scraped_at = scraped_at
+            state.dirty = True
+
+            self.recorded += 1
+            self.changed += changed
+
+    def prune(self, before_date):
+        """Geçmiş kalkış günlerine ait durumları memory'den at"""
+        with self.lock:
+            self.states = {key: state for key, state in self.states.items() if key[1] >= before_date}
+            self.loaded_dates = {d for d in self.loaded_dates if d >= before_date}
+
+    # ------------------------------------------------------------------
+    # Kalıcı durum
+    # ------------------------------------------------------------------
+
+    def load(self, engine=None, routes=(), dates=(), now=None):
+        """
+        Verilen günlerin durumlarını DB'den yükle (her gün bir kez)
+        Durumu olmayan çiftler price_history'den tahmin edilir (bootstrap)
+        """
+        engine = engine or get_db_engine()
+        dates = [d for d in dates if d not in self.loaded_dates]
+        if dates:
+            table = RouteRefreshState.__table__
+            with engine.connect() as conn:
+                rows = conn.execute(select(table).where(table.c.departure_date.in_(dates))).all()
+
+            with self.lock:
+                for row in rows:
+                    self.states[(row.route_id, row.departure_date)] = RefreshState(
+                        id=row.id,
+                        volatility=float(row.volatility),
+                        interval_hours=float(row.interval_hours),
+                        scrape_count=row.scrape_count,
+                        change_count=row.change_count,
+                        last_scraped_at=row.last_scraped_at,
+                        last_changed_at=row.last_changed_at,
+                    )
+                self.loaded_dates.update(dates)
+            logger.info(f"📆 Refresh scheduler: {len(rows)} states loaded for {len(dates)} date(s)")
+
+        with self.lock:
+            missing = {(route.id, d) for route in routes for d in self.loaded_dates} - self.states.keys()
+        if missing:
+            self.bootstrap(engine, missing, now)
+
+    def bootstrap(self, engine, pairs, now=None):
+        """
+        Durumu olmayan çiftler için son lookback_days'lik price_history'den:
+        - route başına volatility (değişim görülen run / gözlenen run)
+        - çiftin son kaydı → last_scraped_at (yeterli gözlem varsa çiftin kendi volatility'si)
+        """
+        since = (now or datetime.utcnow()) - self.lookback
+        runs = price_change_runs(since, route_ids=sorted({route_id for route_id, _ in pairs})).subquery()
+
+        with engine.connect() as conn:
+            rows = conn.execute(
+                select(
+                    runs.c.route_id, runs.c.departure_date,
+                    func.count().label('runs'),
+                    func.sum(runs.c.changed).label('changed_runs'),
+                    func.max(runs.c.recorded_at).label('last_recorded_at')
+                ).group_by(runs.c.route_id, runs.c.departure_date)
+            ).all()
+
+        route_totals = {}
+        for row in rows:
+            observed, changed = route_totals.get(row.route_id, (0, 0))
+            route_totals[row.route_id] = (observed + max(row.runs - 1, 0), changed + (row.changed_runs or 0))
+
+        seeded = 0
+        with self.lock:
+            for route_id, (observed, changed) in route_totals.items():
+                if observed:
+                    self.route_priors[route_id] = changed / observed
+
+            for row in rows:
+                key = (row.route_id, row.departure_date)
+                if key not in pairs or key in self.states:
+                    continue
+                observations = row.runs - 1
+                if observations >= 3:
+                    volatility = (row.changed_runs or 0) / observations
+                else:
+                    volatility = self.route_priors.get(row.route_id, 1.0)
+                self.states[key] = RefreshState(
+                    volatility=volatility,
+                    interval_hours=self.initial_interval(volatility),
+                    last_scraped_at=row.last_recorded_at
+                )
+                seeded += 1
+
+        logger.info(f"📆 Refresh scheduler bootstrap: {len(self.route_priors)} route priors, "
+                    f"{seeded}/{len(pairs)} new pairs seeded from price_history")
+
+    def save(self, engine=None, before_date=None):
+        """Değişen durumları yaz - before_date'ten önceki günlerin durumlarını sil"""
+        engine = engine or get_db_engine()
+        table = RouteRefreshState.__table__
+        now = datetime.utcnow()
+
+        with self.lock:
+            dirty = [(key, state) for key, state in self.states.items() if state.dirty]
+
+        def values(state):
+            return {
+                'volatility': round(state.volatility, 4),
+                'interval_hours': round(state.interval_hours, 2),
+                'scrape_count': state.scrape_count,
+                'change_count': state.change_count,
+                'last_scraped_at': state.last_scraped_at,
+                'last_changed_at': state.last_changed_at,
+                'updated_at': now,
+            }
+
+        existing = [{'b_id': state.id, **{f"b_{k}": v for k, v in values(state).items()}}
+                    for _, state in dirty if state.id is not None]
+        new = {key: state for key, state in dirty if state.id is None}
+
+        with engine.begin() as conn:
+            if existing:
+                conn.execute(
+                    update(table).where(table.c.id == bindparam('b_id')).values(
+                        {column: bindparam(f"b_{column}") for column in values(dirty[0][1])}
+                    ),
+                    existing
+                )
+            if new:
+                conn.execute(insert(table), [
+                    {'route_id': route_id, 'departure_date': departure_date, **values(state)}
+                    for (route_id, departure_date), state in new.items()
+                ])
+                # Yeni satırların id'leri - sonraki save'ler UPDATE yapsın
+                ids = conn.execute(
+                    select(table.c.id, table.c.route_id, table.c.departure_date)
+                    .where(table.c.departure_date.in_({d for _, d in new}))
+                ).all()
+            if before_date is not None:
+                conn.execute(delete(table).where(table.c.departure_date < before_date))
+
+        with self.lock:
+            for _, state in dirty:
+                state.dirty = False
+            if new:
+                for row in ids:
+                    state = new.get((row.route_id, row.departure_date))
+                    if state is not None:
+                        state.id = row.id
+
+        logger.info(f"📆 Refresh scheduler: {len(existing)} states updated, {len(new)} inserted")
+
+    def get_stats(self):
+        with self.lock:
+            return dict(self.last_plan, recorded=self.recorded, changed=self.changed)
+
+
+# ============================================
+# SIMULATION
+# ============================================
+
+_SimRoute = namedtuple('_SimRoute', 'id')
+
+
+def load_change_timeline(engine=None, since=None, until=None):
+    """
+    price_history'den saatlik timeline: (route_id, departure_date) -> {'hours': [...], 'changes': set(...)}
+    hours: çiftin scrape edildiği saatler, changes: fiyat değişimi görülen saatler
+    """
+    engine = engine or get_db_engine()
+    runs = price_change_runs(since).subquery()
+    query = select(runs)
+    if until is not None:
+        query = query.where(runs.c.recorded_at < until)
+
+    timeline = {}
+    with engine.connect() as conn:
+        for row in conn.execute(query):
+            hour = row.recorded_at.replace(minute=0, second=0, microsecond=0)
+            pair = timeline.setdefault((row.route_id, row.departure_date), {'hours': set(), 'changes': set()})
+            pair['hours'].add(hour)
+            if row.changed:
+                pair['changes'].add(hour)
+
+    for pair in timeline.values():
+        pair['hours'] = sorted(pair['hours'])
+    return timeline
+
+
+def simulate_refresh(scheduler, timeline, budget=0):
+    """
+    Timeline'ı saat saat tekrar oynat: her saatte çiftin ilk-son gözlemi arasındaysa birim aktif,
+    scheduler.plan seçtiklerini "scrape eder" ve o ana kadar biriken değişimleri görür.
+
+    Baseline: her aktif birim her saat scrape edilir (her değişim aynı saatte görülür)
+    - on_time: değişim gerçekleştiği saatte görüldü
+    - overwritten: bir sonraki scrape'e kadar üstüne yeni değişim geldi (ara fiyat hiç görülmedi)
+    - undetected: çift timeline'dan çıkana kadar hiç scrape edilmedi
+    """
+    hours = sorted({hour for pair in timeline.values() for hour in pair['hours']})
+    spans = {key: (pair['hours'][0], pair['hours'][-1]) for key, pair in timeline.items() if pair['hours']}
+    pending = {key: sorted(pair['changes']) for key, pair in timeline.items()}
+    routes = {}
+
+    stats = {'pairs': len(timeline), 'hours': len(hours), 'baseline_credits': 0, 'credits': 0,
+             'changes': sum(len(pair['changes']) for pair in timeline.values()),
+             'on_time': 0, 'overwritten': 0, 'undetected': 0, 'delay_hours': 0.0, 'deferred': 0}
+
+    for hour in hours:
+        units = []
+        for key, (first, last) in spans.items():
+            if first <= hour <= last:
+                route = routes.setdefault(key[0], _SimRoute(key[0]))
+                units.append((route, key[1]))
+        units.sort(key=lambda unit: unit[1])
+        stats['baseline_credits'] += len(units)
+
+        selected = scheduler.plan(units, now=hour, budget=budget)
+        stats['credits'] += len(selected)
+        stats['deferred'] += scheduler.last_plan['deferred']
+
+        for route, departure_date in selected:
+            key = (route.id, departure_date)
+            seen = [change for change in pending[key] if change <= hour]
+            pending[key] = pending[key][len(seen):]
+            for change in seen:
+                delay = hours_between(change, hour)
+                stats['delay_hours'] += delay
+                if delay == 0:
+                    stats['on_time'] += 1
+            stats['overwritten'] += max(0, len(seen) - 1)
+            scheduler.record(route.id, departure_date, len(seen), scraped_at=hour)
+
+    stats['undetected'] = sum(len(changes) for changes in pending.values())
+    detected = stats['changes'] - stats['undetected']
+    stats['avg_delay_hours'] = stats['delay_hours'] / detected if detected else 0.0
+    return stats
@@ -0,0 +1,202 @@
+"""
+SeferTakip - Route Sharding
+Route'ları birden fazla worker instance'ına dağıtma (SHARD_COUNT / SHARD_INDEX)
+
+- Dağılım: route.id üzerinde rendezvous (highest random weight) hashing - bir shard düşünce
+  sadece onun route'ları diğerlerine geçer, kalan route'lar yerinde kalır
+- Join: her shard run slot'u (run_key) için scrape_shard_runs'a kayıt olur, join penceresi
+  boyunca diğerlerini bekler - pencerede gelmeyen shard'ın route'ları baştan dağıtılır
+- Takeover: bitmemiş shard'ın lease lock'u (heartbeat) düşmüşse bitiren shard lock'u devralır
+  ve o shard'ın route'larını scrape eder
+- Rapor: her shard özetini yazar, hepsi bitince son biten birleşik Telegram raporunu gönderir
+"""
+
+from datetime import datetime, timedelta
+import hashlib
+import json
+import logging
+import time
+
+from sqlalchemy import delete, insert, select, update
+
+from models_standalone import ScrapeShardRun, get_db_engine
+from run_lock import LeaseLock
+
+logger = logging.getLogger(__name__)
+
+# Özetlerde toplanan sayaçlar
+SUMMED_FIELDS = (
+    'total_routes', 'completed_routes', 'failed_routes', 'deferred_units', 'unchanged_routes',
+    'total_journeys', 'inserted', 'updated', 'deleted', 'price_changes',
+    'total_requests', 'blocked_requests', 'breaker_trips', 'breaker_shed',
+    'refresh_selected', 'refresh_units',
+)
+LISTED_FIELDS = ('failed_list', 'deferred_list')
+
+
+def shard_weight(member, key):
+    return int.from_bytes(hashlib.blake2b(f"{member}:{key}".encode('utf-8'), digest_size=8).digest(), 'big')
+
+
+def shard_owner(key, members):
+    """key için en yüksek ağırlıklı üye (rendezvous hashing)"""
+    return max(members, key=lambda member: shard_weight(member, key))
+
+
+def select_shard_routes(routes, index, members):
+    """members arasında index'e düşen route'lar"""
+    return [route for route in routes if shard_owner(route.id, members) == index]
+
+
+def current_run_key(now=None, slot_minutes=60):
+    """UTC run slot'u - aynı cron tick'inde başlayan shard'lar aynı anahtarı üretir"""
+    now = now or datetime.utcnow()
+    minutes = (now.hour * 60 + now.minute) // slot_minutes * slot_minutes
+    return now.replace(hour=minutes // 60, minute=minutes % 60, second=0, microsecond=0).strftime('%Y-%m-%dT%H:%M')
+
+
+def shard_lock_name(base, index):
+    return f"{base}:shard-{index}"
+
+
+def merge_run_reports(reports):
+    """Shard özetlerini tek rapora topla (sayaçlar toplanır, listeler birleşir)"""
+    merged = {field: sum(report.get(field, 0) for report in reports) for field in SUMMED_FIELDS}
+    for field in LISTED_FIELDS:
+        merged[field] = [item for report in reports for item in report.get(field, [])]
+    merged['elapsed'] = max((report.get('elapsed', 0) for report in reports), default=0)
+    merged['started_at'] = min((report['started_at'] for report in reports if report.get('started_at')), default=None)
+    merged['target'] = next((report['target'] for report in reports if report.get('target')), '')
+    merged['refresh_enabled'] = any(report.get('refresh_enabled') for report in reports)
+    merged['shards'] = reports
+    return merged
+
+
+class ShardCoordinator:
+    """Bir run slot'undaki shard kaydı, route dağılımı, takeover ve rapor sahipliği"""
+
+    def __init__(self, index, count, run_key, owner, lock_name='scraper-run', lock_ttl_seconds=300,
+                 join_seconds=30, poll_seconds=2.0, keep_days=7, engine=None):
+        if not 0 <= index < count:
+            raise ValueError(f"SHARD_INDEX must be in [0, {count}), got {index}")
+        self.index = index
+        self.count = count
+        self.run_key = run_key
+        self.owner = owner
+        self.lock_name = lock_name
+        self.lock_ttl = lock_ttl_seconds
+        self.join_seconds = join_seconds
+        self.poll_seconds = poll_seconds
+        self.keep_days = keep_days
+        self.engine = engine
+
+        self.members = [index]
+        self.taken_over = []  # Devralınan shard index'leri
+
+    def get_engine(self):
+        return self.engine or get_db_engine()
+
+    def get_rows(self, conn):
+        table = ScrapeShardRun.__table__
+        return conn.execute(select(table).where(table.c.run_key == self.run_key)).all()
+
+    def join(self):
+        """Kayıt ol, join penceresinde diğer shard'ları bekle - members'ı belirle ve kaydet"""
+        engine = self.get_engine()
+        table = ScrapeShardRun.__table__
+
+        now = datetime.utcnow()
+        with engine.begin() as conn:
+            conn.execute(delete(table).where(table.c.started_at < now - timedelta(days=self.keep_days)))
+            # Aynı slot'ta yeniden başlayan shard (ör. çöküp tekrar çalışan) kaydını sıfırlar
+            conn.execute(delete(table).where(table.c.run_key == self.run_key, table.c.shard_index == self.index))
+            conn.execute(insert(table).values(
+                run_key=self.run_key, shard_index=self.index, owner=self.owner, started_at=now
+            ))
+
+        deadline = time.monotonic() + self.join_seconds
+        while True:
+            with engine.connect() as conn:
+                rows = self.get_rows(conn)
+            joined = sorted(row.shard_index for row in rows if row.shard_index < self.count)
+            if len(joined) >= self.count or time.monotonic() >= deadline:
+                break
+            time.sleep(self.poll_seconds)
+
+        self.members = joined
+        with engine.begin() as conn:
+            conn.execute(
+                update(table)
+                .where(table.c.run_key == self.run_key, table.c.shard_index == self.index)
+                .values(members=json.dumps(self.members))
+            )
+
+        missing = sorted(set(range(self.count)) - set(self.members))
+        logger.info(f"🧩 Shard {self.index}/{self.count} joined run {self.run_key}: members {self.members}"
+                    + (f", missing {missing} (their routes redistributed)" if missing else ""))
+        return self.members
+
+    def select_routes(self, routes):
+        return select_shard_routes(routes, self.index, self.members)
+
+    def finish(self, summary, index=None):
+        """Shard özetini yaz (index: devralınan shard için)"""
+        index = self.index if index is None else index
+        table = ScrapeShardRun.__table__
+        with self.get_engine().begin() as conn:
+            conn.execute(
+                update(table)
+                .where(table.c.run_key == self.run_key, table.c.shard_index == index)
+                .values(finished_at=datetime.utcnow(), summary=json.dumps(summary, default=str))
+            )
+
+    def wait_for_orphan(self, can_wait):
+        """
+        Bitmemiş shard'lar varken bekle; lease lock'u düşen ilk shard'ı devral
+        (shard_index, members, lock) ya da None (hepsi bitti / beklemeye vakit yok)
+        """
+        while True:
+            with self.get_engine().connect() as conn:
+                rows = [row for row in self.get_rows(conn) if row.finished_at is None and row.shard_index != self.index]
+            if not rows:
+                return None
+
+            for row in rows:
+                lock = LeaseLock(shard_lock_name(self.lock_name, row.shard_index), ttl_seconds=self.lock_ttl,
+                                 engine=self.engine)
+                if lock.acquire():
+                    members = json.loads(row.members) if row.members else self.members
+                    self.taken_over.append(row.shard_index)
+                    logger.warning(f"🧩 Shard {row.shard_index} ({row.owner}) stopped without finishing - "
+                                   f"shard {self.index} takes over its routes")
+                    return row.shard_index, members, lock
+
+            if not can_wait(self.poll_seconds):
+                logger.info(f"🧩 Shards {[row.shard_index for row in rows]} still running - report left to the last one")
+                return None
+            time.sleep(self.poll_seconds)
+
+    def claim_report(self):
+        """Tüm shard'lar bittiyse raporu tek bir shard sahiplenir (koşullu update, ilk gelen alır)"""
+        table = ScrapeShardRun.__table__
+        with self.get_engine().begin() as conn:
+            if any(row.finished_at is None for row in self.get_rows(conn)):
+                return False
+            claimed = conn.execute(
+                update(table)
+                .where(table.c.run_key == self.run_key, table.c.reported_at.is_(None))
+                .values(reported_at=datetime.utcnow())
+            ).rowcount
+        return claimed > 0
+
+    def load_reports(self):
+        """Shard özetleri (index sırasıyla) - her özete shard / owner bilgisi eklenir"""
+        with self.get_engine().connect() as conn:
+            rows = sorted(self.get_rows(conn), key=lambda row: row.shard_index)
+        reports = []
+        for row in rows:
+            report = json.loads(row.summary) if row.summary else {}
+            report.setdefault('shard_index', row.shard_index)
+            report.setdefault('owner', row.owner)
+            reports.append(report)
+        return reports
@@ -0,0 +1,89 @@
+"""
+Ortak fixture'lar - testler geçici SQLite dosyası üzerinde çalışır
+(PostgreSQL'e özel testler TEST_DATABASE_URL verilmezse atlanır)
+"""
+
+from datetime import date, datetime, timedelta
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import create_engine  # noqa: E402
+
+from models_standalone import Base, Route, dispose_db_engine, get_db_engine, get_session  # noqa: E402
+from obilet_parser import project_journey  # noqa: E402
+
+
+@pytest.fixture
+def db_engine(tmp_path, monkeypatch):
+    """Boş şemalı SQLite - paylaşılan engine (get_db_engine) da bunu kullanır"""
+    monkeypatch.setenv('DATABASE_URL', f"sqlite:///{tmp_path / 'test.db'}")
+    dispose_db_engine()
+    engine = get_db_engine()
+    Base.metadata.create_all(engine)
+    yield engine
+    dispose_db_engine()
+
+
+@pytest.fixture
+def pg_engine():
+    """TEST_DATABASE_URL'deki PostgreSQL (yoksa test atlanır) - tablolar yoksa oluşturulur"""
+    url = os.getenv('TEST_DATABASE_URL', '')
+    if not url.startswith('postgresql'):
+        pytest.skip('TEST_DATABASE_URL (PostgreSQL) not set')
+    engine = create_engine(url)
+    Base.metadata.create_all(engine)
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def make_routes(db_engine):
+    """make_routes(n) - n route ekler, id listesini döndürür"""
+    def factory(count):
+        session = get_session()
+        try:
+            routes = [
+                Route(origin_city_name=f"O{i}", origin_obilet_id=i, destination_city_name=f"D{i}",
+                      destination_obilet_id=1000 + i, route_name=f"R{i}")
+                for i in range(count)
+            ]
+            session.add_all(routes)
+            session.commit()
+            return [route.id for route in routes]
+        finally:
+            session.close()
+    return factory
+
+
+def build_journey(journey_id, departure_date, hour=8, price=500.0, seats=10, partner_id=1, total_seats=40):
+    """Obilet cevabındaki tek sefer → JourneyRecord"""
+    departure = datetime.combine(departure_date, datetime.min.time()) + timedelta(hours=hour)
+    return project_journey({
+        'id': journey_id,
+        'partner-id': partner_id,
+        'partner-name': f"P{partner_id}",
+        'bus-type': '2+1',
+        'total-seats': total_seats,
+        'available-seats': seats,
+        'journey': {
+            'departure': departure.strftime('%Y-%m-%dT%H:%M:%S'),
+            'arrival': (departure + timedelta(hours=5)).strftime('%Y-%m-%dT%H:%M:%S'),
+            'original-price': 600,
+            'internet-price': price,
+            'currency': 'TRY',
+        },
+    })
+
+
+@pytest.fixture
+def make_journey():
+    return build_journey
+
+
+@pytest.fixture
+def departure_date():
+    return date.today() + timedelta(days=1)
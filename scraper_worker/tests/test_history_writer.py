@@ -0,0 +1,149 @@
+"""
+PriceHistoryWriter: COPY / executemany yazımı, hata durumunda fallback ve birim bazlı sonuç
+"""
+
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+
+from sqlalchemy import delete, select
+from sqlalchemy.orm import Session
+
+from history_writer import PriceHistoryDeltaFilter, PriceHistoryWriter, format_copy_value
+from models_standalone import PriceHistory, Route
+
+
+def make_row(route_id, departure_date, hour=8, price=500, seats=10, partner_id=1, recorded_at=None):
+    """PRICE_HISTORY_COLUMNS sırasıyla tek satır"""
+    departure_time = datetime.combine(departure_date, datetime.min.time()) + timedelta(hours=hour)
+    return (route_id, f"P{partner_id}", partner_id, Decimal(price), 'TRY', departure_date, 1, seats, 40,
+            Decimal('75.00'), recorded_at or datetime(2026, 1, 1, 12), departure_time)
+
+
+def stored_rows(engine, route_ids=None):
+    ph = PriceHistory.__table__
+    query = select(ph.c.route_id, ph.c.company_name, ph.c.obilet_partner_id, ph.c.price, ph.c.available_seats,
+                   ph.c.departure_date, ph.c.departure_time)
+    if route_ids is not None:
+        query = query.where(ph.c.route_id.in_(route_ids))
+    with engine.connect() as conn:
+        return sorted(tuple(row) for row in conn.execute(query))
+
+
+def test_format_copy_value():
+    assert format_copy_value(None) == '\\N'
+    assert format_copy_value(True) == 't'
+    assert format_copy_value(Decimal('12.50')) == '12.50'
+    assert format_copy_value(date(2026, 1, 2)) == '2026-01-02'
+    assert format_copy_value('a\tb\nc\\d') == 'a\\tb\\nc\\\\d'
+
+
+def test_buffer_flushes_at_threshold(db_engine, make_routes, departure_date):
+    route_id, = make_routes(1)
+    writer = PriceHistoryWriter(db_engine, flush_rows=3, method='executemany')
+
+    writer.add_rows([make_row(route_id, departure_date, hour=h) for h in range(2)])
+    assert stored_rows(db_engine) == []
+
+    writer.add_rows([make_row(route_id, departure_date, hour=h) for h in range(2, 4)])
+    assert len(stored_rows(db_engine)) == 4
+
+    writer.add_rows([make_row(route_id, departure_date, hour=5)])
+    assert writer.flush() == set()
+    assert len(stored_rows(db_engine)) == 5
+    stats = writer.get_stats()
+    assert (stats['rows_written'], stats['rows_failed'], stats['flushes']) == (5, 0, 2)
+
+
+def test_copy_failure_retries_with_executemany(db_engine, make_routes, departure_date):
+    # SQLite'ta COPY yok - COPY hatası executemany ile tekrar yazılmalı, satır kaybı olmamalı
+    route_id, = make_routes(1)
+    writer = PriceHistoryWriter(db_engine, method='copy')
+
+    failed = writer.write([make_row(route_id, departure_date, hour=h) for h in range(3)])
+
+    assert failed == set()
+    assert len(stored_rows(db_engine)) == 3
+    assert writer.get_stats()['rows_written'] == 3
+
+
+def test_failing_route_is_isolated(db_engine, make_routes, departure_date, monkeypatch):
+    good, bad = make_routes(2)
+    delta = PriceHistoryDeltaFilter()
+    writer = PriceHistoryWriter(db_engine, method='executemany', delta=delta)
+    original = PriceHistoryWriter.write_executemany
+
+    def write_executemany(self, rows):
+        if any(row[0] == bad for row in rows):
+            raise RuntimeError('boom')
+        return original(self, rows)
+
+    monkeypatch.setattr(PriceHistoryWriter, 'write_executemany', write_executemany)
+    writer.add_rows([make_row(good, departure_date), make_row(bad, departure_date)])
+
+    assert writer.flush() == {(bad, departure_date)}
+    assert [row[0] for row in stored_rows(db_engine)] == [good]
+    stats = writer.get_stats()
+    assert (stats['rows_written'], stats['rows_failed']) == (1, 1)
+
+    # Yazılamayan seri delta cache'ten silinir - aynı değer bir sonraki denemede tekrar yazılır,
+    # yazılan seri değişmediği için atlanır
+    monkeypatch.setattr(PriceHistoryWriter, 'write_executemany', original)
+    writer.add_rows([make_row(good, departure_date, recorded_at=datetime(2026, 1, 1, 13)),
+                     make_row(bad, departure_date, recorded_at=datetime(2026, 1, 1, 13))])
+    assert writer.flush() == set()
+    assert [row[0] for row in stored_rows(db_engine)] == sorted([good, bad])
+
+
+def test_copy_matches_executemany(pg_engine, departure_date):
+    with Session(pg_engine) as session:
+        routes = [Route(origin_city_name='Test', origin_obilet_id=-900100, destination_city_name=f"Test {i}",
+                        destination_obilet_id=-900101 - i) for i in range(2)]
+        session.add_all(routes)
+        session.commit()
+        copy_route, executemany_route = routes[0].id, routes[1].id
+
+    # COPY text formatında kaçış gerektiren firma adı
+    rows = [make_row(0, departure_date, hour=h, price=450 + h, seats=h) for h in range(5)]
+    rows.append(rows[0][:1] + ('Firma\tA\\B',) + rows[0][2:])
+    try:
+        # write() COPY hatasında executemany'ye düşerdi - yöntemler doğrudan çağrılır
+        PriceHistoryWriter(pg_engine).write_copy([(copy_route,) + row[1:] for row in rows])
+        PriceHistoryWriter(pg_engine).write_executemany([(executemany_route,) + row[1:] for row in rows])
+
+        copied = [row[1:] for row in stored_rows(pg_engine, [copy_route])]
+        inserted = [row[1:] for row in stored_rows(pg_engine, [executemany_route])]
+        assert len(copied) == len(rows)
+        assert copied == inserted
+    finally:
+        with pg_engine.begin() as conn:
+            conn.execute(delete(PriceHistory.__table__).where(
+                PriceHistory.__table__.c.route_id.in_([copy_route, executemany_route])))
+            conn.execute(delete(Route.__table__).where(Route.__table__.c.id.in_([copy_route, executemany_route])))
+
+
+def test_units_complete_when_their_rows_are_written(db_engine, make_routes, departure_date, monkeypatch):
+    buffered, empty, unchanged, bad = make_routes(4)
+    results = []
+    delta = PriceHistoryDeltaFilter()
+    writer = PriceHistoryWriter(db_engine, method='executemany', delta=delta,
+                                on_written=lambda written, failed: results.append((written, failed)))
+    delta.filter_rows([make_row(unchanged, departure_date)])
+
+    # Satırı olmayan / delta'da elenen birim hemen biter, diğerleri flush'ı bekler
+    writer.add_rows([make_row(buffered, departure_date), make_row(unchanged, departure_date)],
+                    units=[(buffered, departure_date), (empty, departure_date), (unchanged, departure_date)])
+    assert results == [([(empty, departure_date), (unchanged, departure_date)], [])]
+
+    original = PriceHistoryWriter.write_executemany
+
+    def write_executemany(self, rows):
+        if any(row[0] == bad for row in rows):
+            raise RuntimeError('boom')
+        return original(self, rows)
+
+    monkeypatch.setattr(PriceHistoryWriter, 'write_executemany', write_executemany)
+    writer.add_rows([make_row(bad, departure_date)], units=[(bad, departure_date)])
+    writer.flush()
+
+    assert results[1] == ([(buffered, departure_date)], [(bad, departure_date)])
+    assert [row[0] for row in stored_rows(db_engine)] == [buffered]
@@ -0,0 +1,194 @@
+"""
+Telegram bildirimleri: digest mesajlarının 4096 karakter sınırında bölünmesi,
+kalıcı hataların (400 / 403) outbox'tan çıkması, drain sonrası geç biten gönderimler
+"""
+
+from datetime import date
+from threading import Event
+from types import SimpleNamespace
+import time
+
+from sqlalchemy import select, text
+
+import notifier
+from models_standalone import PriceAlert, User, get_session, migrate_worker_schema
+from notifier import TELEGRAM_MESSAGE_LIMIT, TelegramDispatcher, build_digest_messages
+
+HEADER = "📊 <b>Fiyat Özeti</b>"
+CONTINUED = "📊 <b>Fiyat Özeti</b> (devam)"
+
+
+def make_alert(alert_id, route_info='İstanbul - Ankara', departure_date=date(2026, 1, 2), alert_type='price_drop',
+               priority='medium', message=None):
+    return SimpleNamespace(id=alert_id, route_id=1, route_info=route_info, departure_date=departure_date,
+                           alert_type=alert_type, priority=priority,
+                           message=message or f"Firma {alert_id}: 500.00 → 450.00 TRY (-10.0%)")
+
+
+def test_single_message_groups_by_route_and_date():
+    alerts = [
+        make_alert(3, route_info='İzmir - Ankara'),
+        make_alert(1),
+        make_alert(2, departure_date=date(2026, 1, 3), alert_type='new_journey', priority='high'),
+    ]
+
+    messages = build_digest_messages(alerts)
+
+    assert len(messages) == 1
+    text, ids = messages[0]
+    assert text.startswith(HEADER)
+    assert ids == [1, 2, 3]
+    assert text.count('🛣') == 3
+    assert text.index('İstanbul - Ankara</b> (02.01.2026)') < text.index('(03.01.2026)') < text.index('İzmir')
+    assert '🏆' in text and '📉' in text
+
+
+def test_long_digest_is_split_under_limit():
+    alerts = [make_alert(i, message=f"Firma {i} " + 'x' * 80) for i in range(200)]
+
+    messages = build_digest_messages(alerts)
+
+    assert len(messages) > 1
+    assert all(len(text) <= TELEGRAM_MESSAGE_LIMIT for text, _ in messages)
+    # Her alert tam bir kez, sırası korunarak
+    assert [alert_id for _, ids in messages for alert_id in ids] == list(range(200))
+    assert messages[0][0].startswith(HEADER) and '(devam)' not in messages[0][0].splitlines()[0]
+    for text, ids in messages[1:]:
+        # Devam mesajı da hangi route olduğunu tekrar söyler
+        assert text.startswith(CONTINUED)
+        assert text.splitlines()[2] == '🛣 <b>İstanbul - Ankara</b> (02.01.2026)'
+        assert all(f"Firma {alert_id} " in text for alert_id in ids)
+
+
+def test_custom_limit():
+    alerts = [make_alert(i) for i in range(10)]
+
+    messages = build_digest_messages(alerts, limit=200)
+
+    assert len(messages) > 2
+    assert all(len(text) <= 200 for text, _ in messages)
+    assert sorted(alert_id for _, ids in messages for alert_id in ids) == list(range(10))
+
+
+def test_digest_escapes_html():
+    alerts = [make_alert(1, route_info='A <b> & B', message='<script> & "x"')]
+
+    text, _ = build_digest_messages(alerts)[0]
+
+    assert 'A &lt;b&gt; &amp; B' in text
+    assert '&lt;script&gt; &amp; "x"' in text
+    assert '<script>' not in text
+
+
+def test_no_alerts_no_messages():
+    assert build_digest_messages([]) == []
+
+
+def add_alerts(route_id, messages):
+    session = get_session()
+    try:
+        user = session.query(User).first()
+        if user is None:
+            user = User(company_name='Test', email='test@example.com', password_hash='x', telegram_id=42)
+            session.add(user)
+            session.flush()
+        session.add_all([
+            PriceAlert(user_id=user.id, route_id=route_id, alert_type='low_availability', title='T', message=message)
+            for message in messages
+        ])
+        session.commit()
+    finally:
+        session.close()
+
+
+def test_permanent_error_takes_alerts_out_of_outbox(db_engine, make_routes, monkeypatch):
+    route_id, = make_routes(1)
+    add_alerts(route_id, ['M0', 'M1', 'M2'])
+
+    responses = {'M0': (200, 'ok'), 'M1': (403, 'Forbidden: bot was blocked by the user')}
+
+    class FakeClient:
+        def post(self, url, json, timeout):
+            status, body = responses[json['text'].rsplit('\n', 1)[-1]]
+            return SimpleNamespace(status_code=status, text=body)
+
+    monkeypatch.setattr(notifier, 'get_http_client', FakeClient)
+    dispatcher = TelegramDispatcher('token')
+    assert dispatcher.poll() == 3
+
+    messages = {}
+    while not dispatcher.queue.empty():
+        message = dispatcher.queue.get()[2]
+        messages[message['text'].rsplit('\n', 1)[-1]] = message
+    dispatcher.deliver(messages['M0'])
+    dispatcher.deliver(messages['M1'])
+    dispatcher._finish(messages['M2'], success=False)  # Retry'lar tükendi - geçici hata
+    dispatcher.flush_sent_marks()
+
+    stats = dispatcher.get_stats()
+    assert (stats['sent'], stats['failed'], stats['rejected'], stats['pending']) == (1, 2, 1, 0)
+
+    with db_engine.connect() as conn:
+        rows = {row.message: row for row in conn.execute(select(PriceAlert.__table__))}
+    assert rows['M0'].is_sent and rows['M0'].sent_at is not None and rows['M0'].send_error is None
+    assert rows['M1'].is_sent and rows['M1'].sent_at is None
+    assert rows['M1'].send_error.startswith('403: Forbidden')
+    assert not rows['M2'].is_sent and rows['M2'].send_error is None
+
+    # Sonraki run sadece geçici hatalı alert'i tekrar dener
+    assert TelegramDispatcher('token').poll() == 1
+
+
+def test_migration_marks_alerts_of_previous_worker_as_sent(db_engine, make_routes):
+    route_id, = make_routes(1)
+    add_alerts(route_id, ['old-1', 'old-2'])
+    # Outbox'tan önceki şema: alert'ler gönderilmiş ama is_sent=False
+    with db_engine.begin() as conn:
+        conn.execute(text('ALTER TABLE price_alerts DROP COLUMN send_error'))
+
+    assert 'price_alerts.send_error' in migrate_worker_schema(db_engine)
+
+    with db_engine.connect() as conn:
+        rows = conn.execute(select(PriceAlert.__table__)).all()
+    assert all(row.is_sent and row.sent_at == row.created_at for row in rows)
+    assert TelegramDispatcher('token').poll() == 0
+
+    # Sonraki migration'lar yeni alert'lere dokunmaz
+    add_alerts(route_id, ['new'])
+    assert migrate_worker_schema(db_engine) == []
+    assert TelegramDispatcher('token').poll() == 1
+
+
+def test_drain_keeps_result_of_worker_still_sending(db_engine, make_routes, monkeypatch):
+    route_id, = make_routes(1)
+    add_alerts(route_id, ['slow'])
+    started, release = Event(), Event()
+
+    class SlowClient:
+        def post(self, url, json, timeout):
+            started.set()
+            release.wait(5)
+            return SimpleNamespace(status_code=200, text='ok')
+
+    monkeypatch.setattr(notifier, 'get_http_client', SlowClient)
+    dispatcher = TelegramDispatcher('token', workers=1, poll_interval=60).start()
+    dispatcher.notify()
+    assert started.wait(5)
+
+    # Worker join'e yetişmedi - mesajı pending / inflight'ta kalır
+    dispatcher.drain(timeout=0, join_timeout=0.1)
+    assert dispatcher.get_stats()['pending'] == 1
+
+    release.set()
+    deadline = time.monotonic() + 5
+    while dispatcher.get_stats()['pending'] and time.monotonic() < deadline:
+        time.sleep(0.05)
+    assert dispatcher.get_stats()['pending'] == 0
+    assert dispatcher.get_stats()['sent'] == 1
+
+    # Geç gelen sonuç sonraki flush'ta yazılır, alert tekrar gönderilmez
+    assert dispatcher.poll() == 0
+    dispatcher.flush_sent_marks()
+    with db_engine.connect() as conn:
+        assert conn.execute(select(PriceAlert.__table__.c.is_sent)).scalar()
+    assert TelegramDispatcher('token').poll() == 0
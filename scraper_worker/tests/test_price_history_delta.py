@@ -0,0 +1,144 @@
+"""
+Delta (change-only) price_history: PriceHistoryDeltaFilter ile yazılan seri
+expand_price_history / get_hourly_price_series ile saatlik seriye geri açılmalı
+"""
+
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+
+from sqlalchemy import inspect, text
+
+from history_writer import PriceHistoryDeltaFilter, PriceHistoryWriter
+from models_standalone import (
+    Base, PriceHistory, get_hourly_price_series, get_missing_worker_schema, get_session, migrate_worker_schema
+)
+
+DEPARTURE_DATE = date(2026, 1, 3)
+START = datetime(2026, 1, 2)
+HOURS = 24
+
+
+def observations(route_id):
+    """
+    İki seri (firma), saatlik gözlem: {(partner_id, saat): (fiyat, boş koltuk)}
+    P1 birkaç saatte bir değişir, P2 hiç değişmez
+    """
+    values = {}
+    for hour in range(HOURS):
+        values[(1, hour)] = (Decimal(500 - 10 * (hour // 5)), 20 - hour // 3)
+        values[(2, hour)] = (Decimal(700), 30)
+    return values
+
+
+def observation_rows(route_id, hour, values):
+    rows = []
+    for partner_id in (1, 2):
+        price, seats = values[(partner_id, hour)]
+        departure_time = datetime.combine(DEPARTURE_DATE, datetime.min.time()) + timedelta(hours=8 + partner_id)
+        rows.append((route_id, f"P{partner_id}", partner_id, price, 'TRY', DEPARTURE_DATE, 1, seats, 40,
+                     None, START + timedelta(hours=hour, minutes=5), departure_time))
+    return rows
+
+
+def write_hourly(writer, route_id, values):
+    for hour in range(HOURS):
+        writer.add_rows(observation_rows(route_id, hour, values))
+    writer.flush()
+
+
+def expanded_values(route_id):
+    session = get_session()
+    try:
+        series = get_hourly_price_series(session, route_id, DEPARTURE_DATE,
+                                         start=START, end=START + timedelta(hours=HOURS - 1))
+        return {
+            (key[1], int((at - START).total_seconds() // 3600)): (Decimal(point.price), point.available_seats)
+            for key, points in series.items()
+            for at, point in points
+        }
+    finally:
+        session.close()
+
+
+def stored_count(engine):
+    with engine.connect() as conn:
+        return conn.execute(text('SELECT COUNT(*) FROM price_history')).scalar()
+
+
+def test_delta_round_trip(db_engine, make_routes):
+    route_id, = make_routes(1)
+    values = observations(route_id)
+    writer = PriceHistoryWriter(db_engine, method='executemany', delta=PriceHistoryDeltaFilter())
+
+    write_hourly(writer, route_id, values)
+
+    # P2 tek nokta, P1 sadece değiştiği saatler
+    changes = 1 + sum(1 for hour in range(1, HOURS) if values[(1, hour)] != values[(1, hour - 1)])
+    assert stored_count(db_engine) == changes + 1
+    assert writer.get_stats()['rows_skipped'] == 2 * HOURS - changes - 1
+    assert expanded_values(route_id) == values
+
+
+def test_delta_heartbeat_round_trip(db_engine, make_routes):
+    route_id, = make_routes(1)
+    values = observations(route_id)
+    writer = PriceHistoryWriter(db_engine, method='executemany', delta=PriceHistoryDeltaFilter(heartbeat_hours=6))
+
+    write_hourly(writer, route_id, values)
+
+    # Değişmeyen P2 de 6 saatte bir yazılır
+    with db_engine.connect() as conn:
+        recorded = [row[0] for row in conn.execute(text(
+            'SELECT recorded_at FROM price_history WHERE obilet_partner_id = 2 ORDER BY recorded_at'))]
+    assert len(recorded) == HOURS // 6
+    assert expanded_values(route_id) == values
+
+
+def test_warm_filter_skips_unchanged_rows_next_run(db_engine, make_routes):
+    route_id, = make_routes(1)
+    values = observations(route_id)
+    write_hourly(PriceHistoryWriter(db_engine, method='executemany', delta=PriceHistoryDeltaFilter()), route_id, values)
+    before = stored_count(db_engine)
+
+    # Yeni process: son noktalar DB'den yüklenir, aynı değerler tekrar yazılmaz
+    delta = PriceHistoryDeltaFilter()
+    delta.warm(db_engine, [DEPARTURE_DATE])
+    next_run = [row[:10] + (row[10] + timedelta(hours=1), row[11])
+                for row in observation_rows(route_id, HOURS - 1, values)]
+    assert delta.filter_rows(next_run) == []
+    assert stored_count(db_engine) == before
+
+    changed = next_run[0][:3] + (next_run[0][3] - 1,) + next_run[0][4:]
+    assert delta.filter_rows([changed, next_run[1]]) == [changed]
+
+
+def test_migration_adds_departure_time(tmp_path, monkeypatch):
+    from models_standalone import dispose_db_engine, get_db_engine
+
+    monkeypatch.setenv('DATABASE_URL', f"sqlite:///{tmp_path / 'legacy.db'}")
+    dispose_db_engine()
+    engine = get_db_engine()
+    try:
+        # departure_time'dan önceki price_history
+        Base.metadata.create_all(engine, tables=[t for t in Base.metadata.sorted_tables if t.name != 'price_history'])
+        with engine.begin() as conn:
+            conn.execute(text(
+                'CREATE TABLE price_history (id INTEGER PRIMARY KEY, route_id INTEGER NOT NULL, '
+                'company_name VARCHAR(200) NOT NULL, obilet_partner_id INTEGER, price NUMERIC(10, 2) NOT NULL, '
+                'currency VARCHAR(3), departure_date DATE NOT NULL, days_before_departure INTEGER, '
+                'available_seats INTEGER, total_seats INTEGER, occupancy_rate NUMERIC(5, 2), '
+                'recorded_at DATETIME NOT NULL)'
+            ))
+
+        assert 'price_history.departure_time' in get_missing_worker_schema(engine)
+
+        applied = migrate_worker_schema(engine)
+        assert 'price_history.departure_time' in applied
+        assert 'ix_price_history_series' in applied
+        assert get_missing_worker_schema(engine) == []
+        assert 'ix_price_history_series' in {i['name'] for i in inspect(engine).get_indexes(PriceHistory.__tablename__)}
+
+        # İdempotent
+        assert migrate_worker_schema(engine) == []
+    finally:
+        dispose_db_engine()
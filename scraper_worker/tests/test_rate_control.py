@@ -0,0 +1,148 @@
+"""
+Rate control: circuit breaker durum geçişleri, AIMD limit ve retry bütçesi
+(zaman parametre olarak verilir - sleep yok)
+"""
+
+from rate_control import AIMDLimiter, CircuitBreaker, RetryBudget, SlidingWindow, backoff_delay
+
+
+def record(breaker, window, blocked, now):
+    window.add(blocked, False, now)
+    breaker.on_result(blocked, window, now)
+
+
+def test_breaker_opens_only_after_min_requests():
+    breaker, window = CircuitBreaker(block_rate=0.5, min_requests=10), SlidingWindow(60)
+
+    for i in range(9):
+        record(breaker, window, True, now=i * 0.1)
+    assert breaker.state == CircuitBreaker.CLOSED
+    assert breaker.before_request(1.0) == 0.0
+
+    record(breaker, window, True, now=1.0)
+    assert breaker.state == CircuitBreaker.OPEN
+    assert breaker.trips == 1
+
+
+def test_breaker_ignores_low_block_rate_and_old_events():
+    breaker, window = CircuitBreaker(block_rate=0.5, min_requests=10), SlidingWindow(60)
+
+    for i in range(20):
+        record(breaker, window, i % 3 == 0, now=float(i))
+    assert breaker.state == CircuitBreaker.CLOSED
+
+    # Pencereden çıkan block'lar sayılmaz
+    window.clear()
+    for i in range(9):
+        record(breaker, window, True, now=float(i))
+    for i in range(10):
+        record(breaker, window, False, now=100.0 + i)
+    record(breaker, window, True, now=110.0)
+    assert window.block_rate(110.0) < 0.5
+    assert breaker.state == CircuitBreaker.CLOSED
+
+
+def test_breaker_half_open_probe_closes_on_success():
+    breaker, window = CircuitBreaker(min_requests=2, cooldown_seconds=30), SlidingWindow(60)
+    record(breaker, window, True, now=0.0)
+    record(breaker, window, True, now=0.0)
+    assert breaker.state == CircuitBreaker.OPEN
+
+    # Cooldown boyunca bekleme süresi döner
+    assert breaker.before_request(10.0) == 20.0
+
+    # Cooldown sonrası tek probe, diğerleri bekler
+    assert breaker.before_request(30.0) == 0.0
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    assert breaker.before_request(30.5) == 1.0
+
+    record(breaker, window, False, now=31.0)
+    assert breaker.state == CircuitBreaker.CLOSED
+    assert window.total == 0
+    assert breaker.before_request(31.0) == 0.0
+
+
+def test_breaker_reopens_with_doubled_cooldown_then_sheds():
+    breaker = CircuitBreaker(min_requests=2, cooldown_seconds=30, max_cooldown_seconds=100, max_trips=3)
+    window = SlidingWindow(60)
+    record(breaker, window, True, now=0.0)
+    record(breaker, window, True, now=0.0)
+
+    # Probe block → cooldown ikiye katlanır
+    assert breaker.before_request(30.0) == 0.0
+    record(breaker, window, True, now=30.0)
+    assert (breaker.state, breaker.trips) == (CircuitBreaker.OPEN, 2)
+    assert breaker.before_request(30.0) == 60.0
+    assert not breaker.shedding
+
+    # max_trips'e ulaşınca istekler hiç atılmaz
+    assert breaker.before_request(90.0) == 0.0
+    record(breaker, window, True, now=90.0)
+    assert breaker.trips == 3
+    assert breaker.shedding
+    assert breaker.opened_until == 190.0  # max_cooldown
+    assert breaker.before_request(1000.0) is None
+    assert breaker.shed == 1
+
+
+def test_breaker_without_max_trips_never_sheds():
+    breaker, window = CircuitBreaker(min_requests=1, cooldown_seconds=1, max_trips=0), SlidingWindow(60)
+    now = 0.0
+    for _ in range(5):
+        record(breaker, window, True, now=now)
+        now = breaker.opened_until
+        assert breaker.before_request(now) == 0.0
+    assert breaker.trips == 5
+    assert not breaker.shedding
+
+
+def test_aimd_limiter():
+    limiter = AIMDLimiter(max_limit=8, min_limit=2, decrease_factor=0.5, decrease_interval=2.0)
+    assert all(limiter.try_acquire() for _ in range(8))
+    assert not limiter.try_acquire()
+
+    # Aynı block dalgası limiti bir kez düşürür
+    limiter.on_block(10.0)
+    limiter.on_block(11.0)
+    assert limiter.limit == 4.0
+    limiter.on_block(12.0)
+    assert limiter.limit == 2.0
+    limiter.on_block(20.0)
+    assert limiter.limit == 2.0  # min_limit
+    assert limiter.min_seen == 2.0
+
+    # Kuyruktaki istekler bitene kadar yeni istek yok
+    for _ in range(6):
+        limiter.release()
+    assert not limiter.try_acquire()
+    limiter.release()
+    assert limiter.try_acquire()
+
+    # Additive increase: her başarı +1/limit
+    limiter.on_success()
+    assert limiter.limit == 2.5
+    for _ in range(100):
+        limiter.on_success()
+    assert limiter.limit == 8
+
+
+def test_retry_budget():
+    budget = RetryBudget(ratio=0.5, min_retries=2)
+    for _ in range(4):
+        budget.on_first_attempt()
+    assert [budget.try_spend() for _ in range(5)] == [True, True, True, True, False]
+    assert (budget.retries, budget.denied) == (4, 1)
+
+    budget.on_first_attempt()
+    budget.on_first_attempt()
+    assert budget.try_spend()
+
+
+def test_retry_budget_unlimited():
+    budget = RetryBudget(ratio=None)
+    assert all(budget.try_spend() for _ in range(1000))
+    assert budget.denied == 0
+
+
+def test_backoff_delay_is_capped():
+    assert all(0 <= backoff_delay(attempt, base=1.0, cap=5.0) <= min(5.0, 2 ** attempt) for attempt in range(10))
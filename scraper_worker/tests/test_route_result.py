@@ -0,0 +1,38 @@
+"""
+DB writer tarafı: scrape sonucunun sync'i ve iş kuyruğu checkpoint'i
+"""
+
+from sqlalchemy import select
+
+from main import ObiletScraper
+from models_standalone import Route, ScrapeWorkUnit, get_session
+from work_queue import new_run_key
+
+
+def test_sync_error_counts_as_failed_route(db_engine, make_routes, make_journey, departure_date, monkeypatch):
+    route_id, = make_routes(1)
+    scraper = ObiletScraper(max_workers=1)
+    session = get_session()
+    try:
+        route = session.get(Route, route_id)
+        session.expunge(route)
+    finally:
+        session.close()
+
+    run_key = new_run_key()
+    scraper.work_queue.enqueue(run_key, [(route_id, departure_date)])
+    assert scraper.work_queue.claim(route_id, departure_date, run_key)
+
+    def sync_journeys_for_route(**kwargs):
+        raise RuntimeError('boom')
+
+    monkeypatch.setattr(scraper, 'sync_journeys_for_route', sync_journeys_for_route)
+    result = {'success': True, 'count': 1, 'journeys': [make_journey('1', departure_date)]}
+
+    assert scraper.process_route_result((route, result, departure_date)) is False
+    assert scraper.failed_routes == 1
+
+    table = ScrapeWorkUnit.__table__
+    with db_engine.connect() as conn:
+        unit = conn.execute(select(table.c.status, table.c.last_error)).one()
+    assert (unit.status, unit.last_error) == ('failed', 'sync error: boom')
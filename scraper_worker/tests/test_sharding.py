@@ -0,0 +1,102 @@
+"""
+Sharding: rendezvous dağılımı, join / takeover (lease lock düşen shard'ın devralınması) ve rapor sahipliği
+"""
+
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+from sqlalchemy import update
+
+from models_standalone import ScrapeRunLock
+from run_lock import LeaseLock
+from sharding import ShardCoordinator, current_run_key, merge_run_reports, select_shard_routes, shard_lock_name
+
+RUN_KEY = '2026-01-02T10:00'
+
+
+def test_routes_are_partitioned_across_members():
+    routes = [SimpleNamespace(id=i) for i in range(1, 301)]
+
+    shards = [select_shard_routes(routes, index, [0, 1, 2]) for index in range(3)]
+
+    assert sorted(route.id for shard in shards for route in shard) == list(range(1, 301))
+    assert all(len(shard) > 60 for shard in shards)
+
+
+def test_missing_member_only_moves_its_routes():
+    routes = [SimpleNamespace(id=i) for i in range(1, 301)]
+    before = {index: {r.id for r in select_shard_routes(routes, index, [0, 1, 2])} for index in range(3)}
+
+    after = {index: {r.id for r in select_shard_routes(routes, index, [0, 1])} for index in range(2)}
+
+    # 0 ve 1'in route'ları yerinde kalır, sadece 2'ninkiler dağılır
+    assert before[0] <= after[0] and before[1] <= after[1]
+    assert (after[0] - before[0]) | (after[1] - before[1]) == before[2]
+
+
+def test_current_run_key_slots():
+    assert current_run_key(datetime(2026, 1, 2, 10, 59, 30)) == '2026-01-02T10:00'
+    assert current_run_key(datetime(2026, 1, 2, 10, 59), slot_minutes=30) == '2026-01-02T10:30'
+
+
+def test_merge_run_reports():
+    merged = merge_run_reports([
+        {'total_routes': 3, 'failed_list': ['a'], 'elapsed': 10, 'started_at': '2026-01-02 10:01'},
+        {'total_routes': 4, 'failed_list': ['b'], 'elapsed': 25, 'started_at': '2026-01-02 10:00', 'target': 'x'},
+    ])
+
+    assert merged['total_routes'] == 7
+    assert merged['failed_list'] == ['a', 'b']
+    assert (merged['elapsed'], merged['started_at'], merged['target']) == (25, '2026-01-02 10:00', 'x')
+    assert len(merged['shards']) == 2
+
+
+def test_finished_shard_takes_over_orphan(db_engine):
+    coordinators = [
+        ShardCoordinator(index, 2, RUN_KEY, owner=f"worker-{index}", join_seconds=0, poll_seconds=0, engine=db_engine)
+        for index in range(2)
+    ]
+    coordinators[0].join()
+    assert coordinators[1].join() == [0, 1]
+
+    # Shard 1 çalışıyor (lock'u tutuyor) ama hiç bitirmeyecek
+    orphan_lock = LeaseLock(shard_lock_name('scraper-run', 1), owner='worker-1', engine=db_engine)
+    assert orphan_lock.try_acquire()
+
+    coordinator = coordinators[0]
+    coordinator.finish({'total_routes': 5})
+    assert coordinator.wait_for_orphan(lambda seconds: False) is None
+    assert not coordinator.claim_report()
+
+    # Heartbeat durdu - lease süresi doldu
+    with db_engine.begin() as conn:
+        conn.execute(update(ScrapeRunLock.__table__).values(expires_at=datetime.utcnow() - timedelta(seconds=1)))
+
+    takeover = coordinator.wait_for_orphan(lambda seconds: False)
+    assert takeover is not None
+    index, members, lock = takeover
+    try:
+        assert (index, members) == (1, [0, 1])
+        assert coordinator.taken_over == [1]
+        assert lock.get_holder()[0] == lock.owner != 'worker-1'
+        assert not orphan_lock.renew()  # Eski sahip lock'u kaybetti
+    finally:
+        lock.release()
+
+    coordinator.finish({'total_routes': 4}, index=1)
+    assert coordinator.wait_for_orphan(lambda seconds: False) is None
+
+    # Rapor tek bir kez sahiplenilir
+    assert coordinator.claim_report()
+    assert not coordinators[1].claim_report()
+    reports = coordinator.load_reports()
+    assert [(r['shard_index'], r['owner'], r['total_routes']) for r in reports] == [(0, 'worker-0', 5), (1, 'worker-1', 4)]
+
+
+def test_late_shard_is_left_out_of_members(db_engine):
+    coordinator = ShardCoordinator(0, 3, RUN_KEY, owner='worker-0', join_seconds=0, engine=db_engine)
+
+    assert coordinator.join() == [0]
+
+    routes = [SimpleNamespace(id=i) for i in range(1, 51)]
+    assert len(coordinator.select_routes(routes)) == 50
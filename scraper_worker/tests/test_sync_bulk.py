@@ -0,0 +1,98 @@
+"""
+Bulk (PostgreSQL set-based) sync ile ORM sync aynı sonucu vermeli:
+aynı scrape dizisi iki ayrı route'a iki yolla uygulanır, sayılar ve son tablo durumu karşılaştırılır
+"""
+
+from sqlalchemy import delete, select
+from sqlalchemy.orm import Session
+
+from main import ObiletScraper
+from models_standalone import Journey, Route, get_session
+
+
+# Her adım: {journey_id: (fiyat, boş koltuk)}
+SNAPSHOTS = [
+    {f"{i}": (100.0 + i, 10) for i in range(10)},
+    {
+        **{f"{i}": (100.0 + i, 10) for i in range(2, 10)},  # 0, 1 silindi
+        '2': (90.0, 10),  # fiyat düştü
+        '3': (120.0, 9),  # fiyat + koltuk
+        '4': (104.0, 3),  # sadece koltuk
+        '10': (150.0, 20),  # yeni
+        '11': (151.0, 20),
+    },
+    {'3': (120.0, 9), '10': (155.0, 20)},
+    {'3': (0.0, 9), '10': (155.0, 20)},  # 0 fiyat: güncellenir, -%100 değişim
+    {'3': (130.0, 9), '10': (0.0, 20)},  # 0'dan: güncellenir, yüzde yok - price change değil
+    {},
+]
+
+
+def apply_snapshot(scraper, session, route_id, prefix, snapshot, departure_date, make_journey, bulk):
+    records = {
+        f"{prefix}{journey_id}": make_journey(f"{prefix}{journey_id}", departure_date, hour=int(journey_id) % 24,
+                                              price=price, seats=seats)
+        for journey_id, (price, seats) in snapshot.items()
+    }
+    sync = (scraper.sync_journeys_bulk if bulk else scraper.sync_journeys_orm)(session, route_id, records, departure_date)
+    session.commit()
+    return {
+        'existing_count': sync['existing_count'],
+        'inserted': sync['inserted'],
+        'updated': sync['updated'],
+        'deleted': sync['deleted'],
+        'inserted_ids': sorted(j.obilet_journey_id[len(prefix):] for j in sync['inserted_journeys']),
+        'price_changes': sorted(
+            (change['journey'].obilet_journey_id[len(prefix):], change['old_price'], change['new_price'])
+            for change in sync['price_changes']
+        ),
+    }
+
+
+def table_state(session, route_id, prefix):
+    rows = session.execute(
+        select(Journey.obilet_journey_id, Journey.internet_price, Journey.available_seats)
+        .where(Journey.route_id == route_id)
+    ).all()
+    return sorted((row.obilet_journey_id[len(prefix):], float(row.internet_price), row.available_seats) for row in rows)
+
+
+def test_bulk_sync_matches_orm_sync(pg_engine, make_journey, departure_date):
+    scraper = ObiletScraper(max_workers=1, sync_mode='bulk')
+    with Session(pg_engine) as session:
+        # Gerçek Obilet id'leriyle çakışmayan (negatif) route'lar
+        routes = [Route(origin_city_name='Test', origin_obilet_id=-900000, destination_city_name=f"Test {i}",
+                        destination_obilet_id=-900001 - i) for i in range(2)]
+        session.add_all(routes)
+        session.commit()
+        orm_route, bulk_route = routes[0].id, routes[1].id
+        assert scraper.use_bulk_sync(session)
+
+        try:
+            for snapshot in SNAPSHOTS:
+                orm = apply_snapshot(scraper, session, orm_route, 'orm-', snapshot, departure_date, make_journey, bulk=False)
+                bulk = apply_snapshot(scraper, session, bulk_route, 'bulk-', snapshot, departure_date, make_journey, bulk=True)
+                assert bulk == orm
+                assert table_state(session, bulk_route, 'bulk-') == table_state(session, orm_route, 'orm-')
+                assert len(table_state(session, bulk_route, 'bulk-')) == len(snapshot)
+        finally:
+            session.rollback()
+            session.execute(delete(Journey).where(Journey.route_id.in_([orm_route, bulk_route])))
+            session.execute(delete(Route).where(Route.id.in_([orm_route, bulk_route])))
+            session.commit()
+
+
+def test_orm_sync_zero_price(db_engine, make_routes, make_journey, departure_date):
+    route_id, = make_routes(1)
+    scraper = ObiletScraper(max_workers=1)
+    session = get_session()
+    try:
+        steps = [apply_snapshot(scraper, session, route_id, '', {'1': (price, 10)}, departure_date, make_journey, bulk=False)
+                 for price in (100.0, 0.0, 200.0)]
+        assert table_state(session, route_id, '') == [('1', 200.0, 10)]
+    finally:
+        session.close()
+
+    assert [step['updated'] for step in steps] == [0, 1, 1]
+    assert steps[1]['price_changes'] == [('1', 100.0, 0.0)]
+    assert steps[2]['price_changes'] == []
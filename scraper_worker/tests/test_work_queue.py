@@ -0,0 +1,166 @@
+"""
+Kalıcı iş kuyruğu: claim / checkpoint, yarıda kalan run'ın devamı, run sonu (close_run) ve migration
+"""
+
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import select, text, update
+
+from models_standalone import (
+    WORKER_TABLES, Base, ScrapeWorkUnit, get_missing_worker_schema, migrate_worker_schema
+)
+from work_queue import WorkQueue, new_run_key
+
+DEPARTURE_DATE = date(2026, 1, 5)
+
+
+def unit_states(engine):
+    table = ScrapeWorkUnit.__table__
+    with engine.connect() as conn:
+        rows = conn.execute(select(table.c.route_id, table.c.status, table.c.last_error, table.c.attempt)).all()
+    return {row.route_id: (row.status, row.last_error, row.attempt) for row in rows}
+
+
+def test_claim_and_checkpoint(db_engine, make_routes):
+    route_ids = make_routes(3)
+    keys = [(route_id, DEPARTURE_DATE) for route_id in route_ids]
+    queue, other = WorkQueue('w1', engine=db_engine), WorkQueue('w2', engine=db_engine)
+    run_key = new_run_key()
+
+    assert queue.enqueue(run_key, keys + keys[:1]) == keys
+
+    # Birim tek worker'da
+    assert queue.claim(*keys[0], run_key)
+    assert not other.claim(*keys[0], run_key)
+    assert queue.claim(*keys[0], run_key)  # Kendi claim'imiz
+    assert not queue.claim(*keys[0], 'another-run')
+
+    # Süresi dolan claim (ölen worker) devralınır, eski sahibin checkpoint'i yok sayılır
+    with db_engine.begin() as conn:
+        conn.execute(update(ScrapeWorkUnit.__table__).values(claimed_at=datetime.utcnow() - timedelta(hours=1)))
+    assert other.claim(*keys[0], run_key)
+    queue.checkpoint([(*keys[0], 'failed', 'stale', None)])
+    assert unit_states(db_engine)[route_ids[0]][0] == 'claimed'
+
+    other.checkpoint([(*keys[0], 'done', None, 'abc')])
+    assert unit_states(db_engine)[route_ids[0]] == ('done', None, 0)
+    assert queue.load_unfinished() == keys[1:]
+    assert queue.load_unfinished(since_date=DEPARTURE_DATE + timedelta(days=1)) == []
+
+    assert (queue.get_stats()['claimed'], queue.get_stats()['conflicts']) == (2, 1)
+    assert (other.get_stats()['claimed'], other.get_stats()['conflicts']) == (1, 1)
+
+
+def test_interrupted_run_resumes_without_done_units(db_engine, make_routes):
+    route_ids = make_routes(3)
+    keys = [(route_id, DEPARTURE_DATE) for route_id in route_ids]
+    queue = WorkQueue('w1', engine=db_engine)
+    run_key = new_run_key()
+    queue.enqueue(run_key, keys)
+    queue.claim(*keys[0], run_key)
+    queue.checkpoint([(*keys[0], 'done', None, 'abc')])
+    queue.claim(*keys[1], run_key)
+
+    # Process öldü - yeni process aynı run_key ile devam eder
+    resumed = WorkQueue('w2', engine=db_engine)
+    assert resumed.find_interrupted_run() == run_key
+    assert resumed.find_interrupted_run(max_age_minutes=0) is None
+    assert resumed.enqueue(run_key, keys) == keys[1:]
+    assert resumed.get_stats()['resumed'] == 1
+    assert resumed.claim(*keys[1], run_key)  # Ölü worker'ın claim'i enqueue'da sıfırlandı
+
+    # Farklı run_key'de 'done' birim tekrar kuyruğa girer
+    assert resumed.enqueue(new_run_key(datetime.utcnow() + timedelta(seconds=1)), keys) == keys
+
+
+def test_close_run(db_engine, make_routes):
+    route_ids = make_routes(4)
+    keys = [(route_id, DEPARTURE_DATE) for route_id in route_ids]
+    queue = WorkQueue('w1', engine=db_engine)
+    run_key = new_run_key()
+    queue.enqueue(run_key, keys)
+
+    queue.claim(*keys[0], run_key)
+    queue.checkpoint([(*keys[0], 'done', None, 'abc')])
+    queue.claim(*keys[1], run_key)  # Sonucu gelmedi
+    queue.claim(*keys[2], run_key)
+    queue.checkpoint([(*keys[2], 'pending', 'price history write failed', None)])
+    # keys[3] hiç başlamadı (run deadline)
+
+    queue.close_run(run_key, keys)
+
+    states = unit_states(db_engine)
+    assert states[route_ids[0]][:2] == ('done', None)
+    assert states[route_ids[1]][:2] == ('failed', 'no result')
+    assert states[route_ids[2]][:2] == ('failed', 'price history write failed')
+    assert states[route_ids[3]][:2] == ('deferred', 'not started')
+    assert sorted(queue.load_failed(run_key)) == [
+        (route_ids[1], DEPARTURE_DATE, 'no result'),
+        (route_ids[2], DEPARTURE_DATE, 'price history write failed'),
+    ]
+    assert queue.load_failed(run_key, keys[2:]) == [(route_ids[2], DEPARTURE_DATE, 'price history write failed')]
+
+    # Kapanan run yarıda kalmış sayılmaz, bitmeyenler sonraki run'da önce alınır
+    assert queue.find_interrupted_run() is None
+    assert sorted(queue.load_unfinished()) == sorted(keys[1:])
+
+    # Yeni run'da kuyruğa giren birimin eski hatası temizlenir
+    queue.enqueue(new_run_key(datetime.utcnow() + timedelta(seconds=1)), keys)
+    assert all(last_error is None for _, last_error, _ in unit_states(db_engine).values())
+
+
+def test_units_over_max_attempts_are_not_prioritised(db_engine, make_routes):
+    route_ids = make_routes(2)
+    keys = [(route_id, DEPARTURE_DATE) for route_id in route_ids]
+    queue = WorkQueue('w1', max_attempts=2, engine=db_engine)
+
+    for _ in range(2):
+        run_key = new_run_key()
+        queue.enqueue(run_key, keys)
+        queue.claim(*keys[0], run_key)
+        queue.close_run(run_key, keys)
+
+    assert unit_states(db_engine)[route_ids[0]] == ('failed', 'no result', 2)
+    assert queue.load_unfinished() == [keys[1]]
+
+
+def test_prune(db_engine, make_routes):
+    route_id, = make_routes(1)
+    queue = WorkQueue('w1', engine=db_engine)
+    queue.enqueue(new_run_key(), [(route_id, DEPARTURE_DATE), (route_id, DEPARTURE_DATE + timedelta(days=1))])
+
+    queue.prune(DEPARTURE_DATE + timedelta(days=1))
+
+    assert queue.load_unfinished() == [(route_id, DEPARTURE_DATE + timedelta(days=1))]
+
+
+def test_migration_creates_work_units(tmp_path, monkeypatch):
+    from models_standalone import dispose_db_engine, get_db_engine
+
+    monkeypatch.setenv('DATABASE_URL', f"sqlite:///{tmp_path / 'legacy.db'}")
+    dispose_db_engine()
+    engine = get_db_engine()
+    try:
+        worker_tables = [ScrapeWorkUnit.__tablename__] + [model.__tablename__ for model in WORKER_TABLES]
+        Base.metadata.create_all(engine, tables=[t for t in Base.metadata.sorted_tables if t.name not in worker_tables])
+        assert get_missing_worker_schema(engine) == worker_tables
+        assert migrate_worker_schema(engine) == worker_tables
+        assert get_missing_worker_schema(engine) == []
+
+        # İlk sürümdeki tablo: kuyruk kolonları sonradan eklenir
+        with engine.begin() as conn:
+            conn.execute(text(f"DROP TABLE {ScrapeWorkUnit.__tablename__}"))
+            conn.execute(text(
+                f"CREATE TABLE {ScrapeWorkUnit.__tablename__} (route_id INTEGER NOT NULL, departure_date DATE NOT NULL, "
+                "status VARCHAR(20) NOT NULL, reason VARCHAR(50), updated_at DATETIME NOT NULL, "
+                "PRIMARY KEY (route_id, departure_date))"
+            ))
+        missing = get_missing_worker_schema(engine)
+        assert f"{ScrapeWorkUnit.__tablename__}.claimed_by" in missing
+
+        applied = migrate_worker_schema(engine)
+        assert set(missing) <= set(applied)
+        assert get_missing_worker_schema(engine) == []
+        assert migrate_worker_schema(engine) == []
+    finally:
+        dispose_db_engine()
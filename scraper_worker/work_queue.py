@@ -0,0 +1,275 @@
+"""
+SeferTakip - Persistent Work Queue
+(route, kalkış günü) iş birimleri scrape_work_units tablosunda - container run ortasında ölse de
+sonraki run kaldığı yerden devam eder, ScrapingBee credit'i tekrar harcanmaz
+
+- enqueue: run'ın birimleri run_key ile kuyruğa alınır; aynı run_key'de 'done' olanlar atlanır -
+  yarıda kalan run'ın anahtarıyla (find_interrupted_run) yeniden başlayan run sadece bitmeyenleri yapar
+- claim: birim scrape edilmeden önce koşullu UPDATE ile alınır (PostgreSQL + SQLite'ta atomik) -
+  aynı birimi iki worker / shard scrape etmez; süresi dolan claim (ölen worker) tekrar alınabilir
+- checkpoint: sync sonrası birim 'done' (parmak iziyle) / 'failed' (hatayla) / 'deferred' olur;
+  sync edilip Price History'si yazılamayan birim hatasıyla 'pending'e döner
+- Bitmeyen birimler (pending / claimed / failed / deferred) sonraki run'da önce scrape edilir -
+  max_attempts kez art arda bitmeyen birim öne alınmaz (normal sırasında scrape edilir)
+"""
+
+from datetime import datetime, timedelta
+from threading import Lock
+import logging
+
+from sqlalchemy import and_, bindparam, delete, func, insert, or_, select, update
+from sqlalchemy.exc import IntegrityError
+
+from models_standalone import ScrapeWorkUnit, get_db_engine
+
+logger = logging.getLogger(__name__)
+
+UNFINISHED = ('pending', 'claimed', 'failed', 'deferred')
+CLAIMABLE = ('pending', 'failed', 'deferred')
+
+
+def new_run_key(now=None):
+    """Yeni run anahtarı (UTC zaman damgası - sıralanabilir)"""
+    return (now or datetime.utcnow()).strftime('%Y-%m-%dT%H:%M:%S.%f')
+
+
+class WorkQueue:
+    """scrape_work_units üzerinde claim / checkpoint (thread-safe, sayaçlar lock'lu)"""
+
+    def __init__(self, owner, claim_ttl_seconds=900, max_attempts=3, engine=None):
+        self.owner = owner
+        self.claim_ttl = timedelta(seconds=claim_ttl_seconds)
+        self.max_attempts = max_attempts
+        self.engine = engine
+        self.lock = Lock()
+
+        # Statistics
+        self.resumed = 0  # Aynı run_key'de önceden bitmiş, atlanan birimler
+        self.claimed = 0
+        self.conflicts = 0  # Başka worker'da olan birimler
+        self.checkpoints = 0
+
+    def get_engine(self):
+        return self.engine or get_db_engine()
+
+    def load_unfinished(self, since_date=None):
+        """Bitmemiş birimler (route_id, departure_date) - eskiden yeniye, max_attempts'i aşanlar hariç"""
+        engine = self.get_engine()
+        table = ScrapeWorkUnit.__table__
+        query = select(table.c.route_id, table.c.departure_date).where(
+            table.c.status.in_(UNFINISHED),
+            table.c.attempt < self.max_attempts
+        )
+        if since_date is not None:
+            query = query.where(table.c.departure_date >= since_date)
+        with engine.connect() as conn:
+            rows = conn.execute(query.order_by(table.c.updated_at, table.c.departure_date)).all()
+        return [(row.route_id, row.departure_date) for row in rows]
+
+    def find_interrupted_run(self, max_age_minutes=60):
+        """
+        Yarıda kalan (pending / claimed birimi olan) en son run'ın anahtarı - yoksa ya da
+        max_age_minutes'tan eskiyse None. Normal biten run close_run ile kapanır, burada çıkmaz
+        """
+        engine = self.get_engine()
+        table = ScrapeWorkUnit.__table__
+        since = new_run_key(datetime.utcnow() - timedelta(minutes=max_age_minutes))
+        with engine.connect() as conn:
+            return conn.execute(
+                select(func.max(table.c.run_key))
+                .where(table.c.status.in_(('pending', 'claimed')), table.c.run_key >= since)
+            ).scalar()
+
+    def enqueue(self, run_key, keys):
+        """
+        keys: bu run'ın (route_id, departure_date) birimleri (sırası korunur)
+        Aynı run_key'de 'done' olanlar dışındakiler 'pending' olur - çağıran bu birimlerin
+        sahibi (run / shard lock'u bizde), başka sahipteki eski claim'ler ölü worker'ındır
+        Dönen liste: scrape edilecek birimler
+        """
+        keys = list(dict.fromkeys(keys))
+        if not keys:
+            return []
+
+        for attempt in range(2):
+            try:
+                pending = self._enqueue(run_key, keys)
+                break
+            except IntegrityError:
+                # Aynı birimi eşzamanlı ekleyen başka bir run - mevcut satırlar üzerinden tekrar
+                if attempt:
+                    raise
+
+        resumed = len(keys) - len(pending)
+        with self.lock:
+            self.resumed += resumed
+        if resumed:
+            logger.info(f"♻️  Work queue: resuming run {run_key} - {resumed} units already done, {len(pending)} left")
+        return pending
+
+    def _enqueue(self, run_key, keys):
+        table = ScrapeWorkUnit.__table__
+        now = datetime.utcnow()
+        wanted = set(keys)
+
+        with self.get_engine().begin() as conn:
+            existing = {}
+            for departure_date in {d for _, d in keys}:
+                route_ids = [route_id for route_id, d in keys if d == departure_date]
+                rows = conn.execute(
+                    select(table.c.route_id, table.c.departure_date, table.c.run_key, table.c.status, table.c.attempt)
+                    .where(table.c.departure_date == departure_date, table.c.route_id.in_(route_ids))
+                ).all()
+                existing.update({(row.route_id, row.departure_date): row for row in rows})
+
+            done = {key for key, row in existing.items() if row.run_key == run_key and row.status == 'done'}
+            inserts = [
+                {'route_id': route_id, 'departure_date': d, 'run_key': run_key, 'status': 'pending',
+                 'attempt': 0, 'updated_at': now}
+                for route_id, d in keys if (route_id, d) not in existing
+            ]
+            updates = [
+                {'b_route_id': route_id, 'b_departure_date': d, 'b_attempt': 0 if row.status == 'done' else row.attempt}
+                for (route_id, d), row in existing.items()
+                if (route_id, d) in wanted and (route_id, d) not in done
+            ]
+
+            if inserts:
+                conn.execute(insert(table), inserts)
+            if updates:
+                conn.execute(
+                    update(table)
+                    .where(table.c.route_id == bindparam('b_route_id'), table.c.departure_date == bindparam('b_departure_date'))
+                    .values(run_key=run_key, status='pending', attempt=bindparam('b_attempt'), reason=None,
+                            last_error=None, claimed_by=None, claimed_at=None, updated_at=now),
+                    updates
+                )
+
+        return [key for key in keys if key not in done]
+
+    def claim(self, route_id, departure_date, run_key):
+        """Birimi al - başka worker'daysa (ya da bu run'da bittiyse) False"""
+        table = ScrapeWorkUnit.__table__
+        now = datetime.utcnow()
+        with self.get_engine().begin() as conn:
+            claimed = conn.execute(
+                update(table)
+                .where(
+                    table.c.route_id == route_id,
+                    table.c.departure_date == departure_date,
+                    table.c.run_key == run_key,
+                    or_(
+                        table.c.status.in_(CLAIMABLE),
+                        and_(table.c.status == 'claimed',
+                             or_(table.c.claimed_by == self.owner, table.c.claimed_at < now - self.claim_ttl))
+                    )
+                )
+                .values(status='claimed', claimed_by=self.owner, claimed_at=now,
+                        attempt=table.c.attempt + 1, updated_at=now)
+            ).rowcount
+
+        with self.lock:
+            if claimed:
+                self.claimed += 1
+            else:
+                self.conflicts += 1
+        return claimed > 0
+
+    def checkpoint(self, entries):
+        """
+        entries: (route_id, departure_date, status, last_error, fingerprint)
+        Sadece bizim claim'imizdeki birimler güncellenir (claim süresi dolup başkası aldıysa dokunulmaz)
+        """
+        if not entries:
+            return
+        table = ScrapeWorkUnit.__table__
+        now = datetime.utcnow()
+        params = [
+            {'b_route_id': route_id, 'b_departure_date': d, 'b_status': status,
+             'b_error': last_error[:200] if last_error else None, 'b_fingerprint': fingerprint}
+            for route_id, d, status, last_error, fingerprint in entries
+        ]
+        done = [p for p in params if p['b_status'] == 'done']
+        other = [p for p in params if p['b_status'] != 'done']
+
+        where = and_(
+            table.c.route_id == bindparam('b_route_id'),
+            table.c.departure_date == bindparam('b_departure_date'),
+            table.c.claimed_by == self.owner
+        )
+        with self.get_engine().begin() as conn:
+            if done:
+                conn.execute(
+                    update(table).where(where).values(
+                        status='done', attempt=0, reason=None, last_error=None,
+                        fingerprint=bindparam('b_fingerprint'), claimed_by=None, claimed_at=None, updated_at=now
+                    ),
+                    [{k: v for k, v in p.items() if k not in ('b_status', 'b_error')} for p in done]
+                )
+            if other:
+                conn.execute(
+                    update(table).where(where).values(
+                        status=bindparam('b_status'), reason=None, last_error=bindparam('b_error'),
+                        claimed_by=None, claimed_at=None, updated_at=now
+                    ),
+                    [{k: v for k, v in p.items() if k != 'b_fingerprint'} for p in other]
+                )
+
+        with self.lock:
+            self.checkpoints += len(entries)
+
+    def close_run(self, run_key, keys):
+        """
+        Run sonu: bu run'ın başlamamış birimleri 'deferred', sonucu gelmemiş claim'leri ve hatayla
+        'pending'e dönenleri (Price History yazılamadı) 'failed' - kapanan run yarıda kalmış sayılmaz
+        (find_interrupted_run), birimler sonraki run'da önce alınır
+        """
+        table = ScrapeWorkUnit.__table__
+        now = datetime.utcnow()
+        keys = list(keys)
+        with self.get_engine().begin() as conn:
+            for departure_date in {d for _, d in keys}:
+                route_ids = [route_id for route_id, d in keys if d == departure_date]
+                where = and_(table.c.run_key == run_key, table.c.departure_date == departure_date,
+                             table.c.route_id.in_(route_ids))
+                conn.execute(
+                    update(table).where(where, table.c.status == 'pending', table.c.last_error.isnot(None))
+                    .values(status='failed', updated_at=now)
+                )
+                conn.execute(
+                    update(table).where(where, table.c.status == 'pending')
+                    .values(status='deferred', last_error='not started', updated_at=now)
+                )
+                conn.execute(
+                    update(table).where(where, table.c.status == 'claimed', table.c.claimed_by == self.owner)
+                    .values(status='failed', last_error='no result', claimed_by=None, claimed_at=None, updated_at=now)
+                )
+
+    def load_failed(self, run_key, keys=None):
+        """Bu run'da başarısız biten birimler: (route_id, departure_date, last_error)"""
+        table = ScrapeWorkUnit.__table__
+        with self.get_engine().connect() as conn:
+            rows = conn.execute(
+                select(table.c.route_id, table.c.departure_date, table.c.last_error)
+                .where(table.c.run_key == run_key, table.c.status == 'failed')
+                .order_by(table.c.updated_at)
+            ).all()
+        if keys is not None:
+            keys = set(keys)
+            rows = [row for row in rows if (row.route_id, row.departure_date) in keys]
+        return [(row.route_id, row.departure_date, row.last_error) for row in rows]
+
+    def prune(self, before_date):
+        """Kalkış günü geçmiş birimler"""
+        table = ScrapeWorkUnit.__table__
+        with self.get_engine().begin() as conn:
+            conn.execute(delete(table).where(table.c.departure_date < before_date))
+
+    def get_stats(self):
+        with self.lock:
+            return {
+                'resumed': self.resumed,
+                'claimed': self.claimed,
+                'conflicts': self.conflicts,
+                'checkpoints': self.checkpoints,
+            }